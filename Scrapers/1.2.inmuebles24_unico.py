@@ -1,16 +1,25 @@
+import argparse
 import os
 import pandas as pd
 import datetime as dt
-import re
 import time
-from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+import inmuebles24
+from busquedas import agregar_argumentos, de_argumentos, ultimo_listado
+from canario import ExtraccionDegradada, MonitorLlenado, cargar_base
+from caracteristicas import FeatureStore
+from ingesta import Ingesta
+from plazos import DEADLINE_S, Presupuesto
+from registros import listing_id
+
 DDIR = 'data/'
+FEATURES = FeatureStore(DDIR)   # pestañas en formato largo
+INGESTA = Ingesta(DDIR)         # normalización, duplicados y deal score por fila
 
 def close_cookie_banner(driver):
     """
@@ -26,237 +35,19 @@ def close_cookie_banner(driver):
         pass
 
 def scrape_property_detail(driver, html):
-    soup = BeautifulSoup(html, "html.parser")
-    data = {}
-
-    # 1. Tipo de inmueble, área, recámaras y estacionamientos
-    h2 = soup.find("h2", class_="title-type-sup-property")
-    if h2:
-        tokens = [t.strip() for t in h2.get_text(separator="·").split("·") if t.strip()]
-
-        data["tipo_propiedad"] = tokens[0] if len(tokens) > 0 else ""
-        print("tipo_propiedad:", data["tipo_propiedad"])
-        time.sleep(0.05)
-
-        data["area_m2"] = tokens[1] if len(tokens) > 1 else ""
-        print("area_m2:", data["area_m2"])
-        time.sleep(0.05)
-
-        if len(tokens) > 2:
-            match = re.search(r"(\d+)", tokens[2])
-            data["recamaras"] = match.group(1) if match else ""
-        else:
-            data["recamaras"] = ""
-        print("recamaras:", data["recamaras"])
-        time.sleep(0.05)
-
-        if len(tokens) > 3:
-            match = re.search(r"(\d+)", tokens[3])
-            data["estacionamientos"] = match.group(1) if match else ""
-        else:
-            data["estacionamientos"] = ""
-        print("estacionamientos:", data["estacionamientos"])
-        time.sleep(0.05)
-    else:
-        data["tipo_propiedad"] = data["area_m2"] = data["recamaras"] = data["estacionamientos"] = ""
-        print("tipo_propiedad:", data["tipo_propiedad"])
-        print("area_m2:", data["area_m2"])
-        print("recamaras:", data["recamaras"])
-        print("estacionamientos:", data["estacionamientos"])
-        time.sleep(0.05)
-
-    # 2. Operación, precio y mantenimiento
-    price_container = soup.find("div", class_="price-container-property")
-    if price_container:
-        price_value_div = price_container.find("div", class_="price-value")
-        if price_value_div:
-            text = price_value_div.get_text(" ", strip=True)
-            if "venta" in text.lower():
-                data["operacion"] = "venta"
-            elif "renta" in text.lower():
-                data["operacion"] = "renta"
-            else:
-                data["operacion"] = ""
-            print("operacion:", data["operacion"])
-            time.sleep(0.05)
-
-            span_precio = price_value_div.find("span")
-            data["precio"] = span_precio.get_text(strip=True) if span_precio else ""
-            print("precio:", data["precio"])
-            time.sleep(0.05)
-        else:
-            data["operacion"] = data["precio"] = ""
-            print("operacion:", data["operacion"])
-            print("precio:", data["precio"])
-            time.sleep(0.05)
-
-        extra_div = price_container.find("div", class_="price-extra")
-        if extra_div:
-            span_mant = extra_div.find("span", class_="price-expenses")
-            data["mantenimiento"] = span_mant.get_text(strip=True) if span_mant else ""
-        else:
-            data["mantenimiento"] = ""
-        print("mantenimiento:", data["mantenimiento"])
-        time.sleep(0.05)
-    else:
-        data["operacion"] = data["precio"] = data["mantenimiento"] = ""
-        print("operacion:", data["operacion"])
-        print("precio:", data["precio"])
-        print("mantenimiento:", data["mantenimiento"])
-        time.sleep(0.05)
-
-    # 3. Dirección
-    location_div = soup.find("div", class_="section-location-property")
-    if location_div:
-        h4 = location_div.find("h4")
-        data["direccion"] = h4.get_text(strip=True) if h4 else ""
-    else:
-        data["direccion"] = ""
-    print("direccion:", data["direccion"])
-    time.sleep(0.05)
-
-    # Extraer la URL del mapa estático
-    map_container = soup.find("div", class_="static-map-container")
-    if map_container:
-        img = map_container.find("img", id="static-map")
-        if img:
-            url = img.get("src", "")
-            if url.startswith("//"):
-                url = "https:" + url
-            data["ubicacion_url"] = url
-        else:
-            data["ubicacion_url"] = ""
-    else:
-        data["ubicacion_url"] = ""
-    print("ubicacion_url:", data["ubicacion_url"])
-    time.sleep(0.05)
-
-    # 4. Título principal
-    h1 = soup.find("h1", class_="title-property")
-    data["titulo"] = h1.get_text(strip=True) if h1 else ""
-    print("titulo:", data["titulo"])
-    time.sleep(0.05)
-
-    # 5. Descripción completa
-    desc_section = soup.find("section", class_="article-section-description")
-    if desc_section:
-        long_desc = desc_section.find("div", id="longDescription")
-        data["descripcion"] = long_desc.get_text(" ", strip=True) if long_desc else ""
-    else:
-        data["descripcion"] = ""
-    print("descripcion:", data["descripcion"])
-    time.sleep(0.05)
-
-    # 7. Información del anunciante
-    anunciante = soup.find("h3", attrs={"data-qa": "linkMicrositioAnunciante"})
-    data["anunciante"] = anunciante.get_text(strip=True) if anunciante else ""
-    print("anunciante:", data["anunciante"])
-    time.sleep(0.05)
-
-    # 8. Códigos del anuncio
-    codes_section = soup.find("section", id="reactPublisherCodes")
-    if codes_section:
-        lis = codes_section.find_all("li")
-        codigo_anunciante = ""
-        codigo_inmuebles24 = ""
-        for li in lis:
-            text = li.get_text(" ", strip=True)
-            if "Cód. del anunciante" in text:
-                parts = text.split(":")
-                codigo_anunciante = parts[1].strip() if len(parts) > 1 else ""
-            elif "Cód. Inmuebles24" in text:
-                parts = text.split(":")
-                codigo_inmuebles24 = parts[1].strip() if len(parts) > 1 else ""
-        data["codigo_anunciante"] = codigo_anunciante
-        data["codigo_inmuebles24"] = codigo_inmuebles24
-    else:
-        data["codigo_anunciante"] = data["codigo_inmuebles24"] = ""
-    print("codigo_anunciante:", data["codigo_anunciante"])
-    time.sleep(0.05)
-    print("codigo_inmuebles24:", data["codigo_inmuebles24"])
-    time.sleep(0.05)
-
-    # 9. Tiempo de publicación
-    user_views = soup.find("div", id="user-views")
-    if user_views:
-        p = user_views.find("p")
-        data["tiempo_publicacion"] = p.get_text(strip=True) if p else ""
-    else:
-        data["tiempo_publicacion"] = ""
-    print("tiempo_publicacion:", data["tiempo_publicacion"])
-    time.sleep(0.05)
-
-    # 10. Información del listado de iconos
-    features_ul = soup.find("ul", id="section-icon-features-property")
-    if features_ul:
-        lis = features_ul.find_all("li", class_="icon-feature")
-        data["area_total"] = ""
-        data["area_cubierta"] = ""
-        data["banos_icon"] = ""
-        data["estacionamientos_icon"] = ""
-        data["recamaras_icon"] = ""
-        data["medio_banos_icon"] = ""
-        data["antiguedad_icon"] = ""
-
-        for li in lis:
-            icon = li.find("i")
-            if not icon:
-                continue
-
-            classes = icon.get("class", [])
-            # Obtenemos el texto con un espacio en lugar de saltos de línea
-            raw_text = li.get_text(" ", strip=True)
-
-            # Opcional: unificar múltiples espacios en uno solo.
-            # Esto NO elimina palabras como "baños" ni hace replaces específicos,
-            # solo evita que haya muchos espacios o tabs.
-            text = re.sub(r"\s+", " ", raw_text).strip()
-
-            # DEBUG para ver qué valor se está capturando
-            print("DEBUG => classes:", classes, "| text:", repr(text))
-
-            # Asignamos a cada campo sin reemplazar nada específico.
-            if "icon-stotal" in classes:
-                data["area_total"] = text
-            elif "icon-scubierta" in classes:
-                data["area_cubierta"] = text
-            elif "icon-bano" in classes:
-                data["banos_icon"] = text
-            elif "icon-cochera" in classes:
-                data["estacionamientos_icon"] = text
-            elif "icon-dormitorio" in classes:
-                data["recamaras_icon"] = text
-            elif "icon-toilete" in classes:
-                data["medio_banos_icon"] = text
-            elif "icon-antiguedad" in classes:
-                data["antiguedad_icon"] = text
-    else:
-        data["area_total"] = data["area_cubierta"] = data["banos_icon"] = ""
-        data["estacionamientos_icon"] = data["recamaras_icon"] = data["medio_banos_icon"] = data["antiguedad_icon"] = ""
-
-    print("area_total:", data["area_total"])
-    time.sleep(0.05)
-    print("area_cubierta:", data["area_cubierta"])
-    time.sleep(0.05)
-    print("banos_icon:", data["banos_icon"])
-    time.sleep(0.05)
-    print("estacionamientos_icon:", data["estacionamientos_icon"])
-    time.sleep(0.05)
-    print("recamaras_icon:", data["recamaras_icon"])
-    time.sleep(0.05)
-    print("medio_banos_icon:", data["medio_banos_icon"])
-    time.sleep(0.05)
-    #print("antiguedad_icon:", data["antiguedad_icon"])
-    #time.sleep(0.05)
-
+    """Campos fijos de la ficha (parser compartido en inmuebles24.py)."""
+    data = inmuebles24.scrape_property_detail(html)
+    for campo, valor in data.items():
+        print(f"{campo}:", valor)
     return data
 
 
-def extract_information_after_click(driver):
+def extract_information_after_click(driver, presupuesto=None):
     info_botones = {}
+    presupuesto = presupuesto or Presupuesto(DEADLINE_S)
     try:
         # Ubicar el contenedor principal
-        container = WebDriverWait(driver, 10).until(
+        container = WebDriverWait(driver, presupuesto.recortar(10)).until(
             EC.presence_of_element_located((By.ID, "reactGeneralFeatures"))
         )
         
@@ -265,6 +56,9 @@ def extract_information_after_click(driver):
         print(f"🔎 Se encontraron {len(buttons)} botones. Intentando extraer datos...\n")
 
         for button in buttons:
+            if presupuesto.agotado:
+                print("⏱️ Plazo de la URL agotado, se omiten las pestañas restantes.")
+                break
             try:
                 span_btn = button.find_element(By.TAG_NAME, "span")
                 button_text = span_btn.text.strip()
@@ -275,7 +69,7 @@ def extract_information_after_click(driver):
                 
                 # Esperar hasta que el contenido aparezca después del clic
                 try:
-                    details_container = WebDriverWait(container, 5).until(
+                    details_container = WebDriverWait(container, presupuesto.recortar(5)).until(
                         EC.presence_of_element_located((By.XPATH, ".//div[2]"))  # Usamos XPath para evitar clases cambiantes
                     )
                 except:
@@ -286,7 +80,7 @@ def extract_information_after_click(driver):
 
                 # Extraer la información dentro del <span>
                 features = [elem.text.strip() for elem in details_container.find_elements(By.TAG_NAME, "span") if elem.text.strip()]
-                info_botones[button_text] = "; ".join(features)
+                info_botones[button_text] = features
                 
                 print(f"📌 Información extraída de '{button_text}': {features}\n")
 
@@ -304,7 +98,7 @@ def save(data_dict):
     os.makedirs(out_dir, exist_ok=True)
     fname = os.path.join(out_dir, "inmuebles24_terrenos_guadalajara_detalle.csv")
 
-    df_new = pd.DataFrame([data_dict])
+    df_new = INGESTA.procesar(pd.DataFrame([data_dict]))   # + precio_valor, lat, lon, cluster_id, deal_score…
     try:
         df_existing = pd.read_csv(fname, encoding="utf-8")
     except FileNotFoundError:
@@ -320,9 +114,22 @@ def save(data_dict):
 
 
 def main():
+    ap = argparse.ArgumentParser()
+    agregar_argumentos(ap, ciudad="guadalajara", tipo="terrenos")
+    ap.add_argument("--csv", help="CSV de listados con columna 'url' (def.: el más reciente de la búsqueda)")
+    args = ap.parse_args()
+    fuente = args.csv or ultimo_listado(DDIR, de_argumentos(args))
+    if not fuente:
+        print(f"No hay listados de '{de_argumentos(args).slug}' en {DDIR}; corre 1.1 o planificador.py primero.")
+        return
+
     # Leer el archivo CSV que contiene las URLs en una columna "url"
-    urls_df = pd.read_csv("data/2025-04-25/inmuebles24-guadalajara-terrenos-venta.csv")
-    urls = urls_df["url"].tolist()
+    print(f"Listados: {fuente}")
+    urls_df = pd.read_csv(fuente)
+    urls = urls_df["url"].dropna().drop_duplicates().tolist()
+    # tasa de llenado móvil: si el sitio cambia el markup, se detiene en vez de guardar vacíos
+    monitor = MonitorLlenado(cargar_base(DDIR)["detalle"],
+                             campos=("titulo", "precio", "direccion", "descripcion"))
     
     #for URL in urls:
     for i, URL in enumerate(urls, start=1):
@@ -339,11 +146,14 @@ def main():
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
         driver = webdriver.Chrome(options=options)
-        driver.set_page_load_timeout(60)
+        # Un solo plazo para toda la URL: carga, espera y pestañas
+        presupuesto = Presupuesto(DEADLINE_S)
+        driver.set_page_load_timeout(presupuesto.recortar(60))
         
+        data = None
         try:
             driver.get(URL)
-            WebDriverWait(driver, 30).until(
+            WebDriverWait(driver, presupuesto.recortar(30)).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "h2.title-type-sup-property"))
             )
             # Incrementar un poco el tiempo de espera para evitar bloqueos
@@ -351,13 +161,15 @@ def main():
             
             html = driver.page_source
             data = scrape_property_detail(driver, html)
+            data["url"] = URL
             
             # Extraer información adicional mediante los botones
-            botones_data = extract_information_after_click(driver)
-            data.update(botones_data)
+            botones_data = extract_information_after_click(driver, presupuesto)
             
-            # Guardar todos los datos en un único CSV
+            # Campos fijos al CSV; pestañas en formato largo (tab_features.csv)
             save(data)
+            FEATURES.agregar(listing_id(URL), botones_data)
+            FEATURES.flush()
             
         except Exception as e:
             print(f"Error al cargar la página {URL}: {e}")
@@ -365,11 +177,21 @@ def main():
         finally:
             # Cerrar el navegador al terminar cada URL
             driver.quit()
+
+        try:
+            monitor.observar(data)
+        except ExtraccionDegradada as e:
+            print(f"Extracción degradada, se detiene el crawl: {e}")
+            break
         
         # Agregar un pequeño retraso adicional antes de la siguiente URL
         time.sleep(2)
 
+    INGESTA.guardar()
+
 if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
     main()
 
 
@@ -409,7 +231,7 @@ if __name__ == "__main__":
 
                 # Extraer la información dentro del <span>
                 features = [elem.text.strip() for elem in details_container.find_elements(By.TAG_NAME, "span") if elem.text.strip()]
-                info_botones[button_text] = "; ".join(features)
+                info_botones[button_text] = features
                 
                 print(f"📌 Información extraída de '{button_text}': {features}\n")
 
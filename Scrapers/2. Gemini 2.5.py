@@ -1,5 +1,5 @@
+import argparse
 import os
-import pandas as pd
 import datetime as dt
 import time
 import re
@@ -9,9 +9,14 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from busquedas import Busqueda, agregar_argumentos, de_argumentos
+from canario import ExtraccionDegradada, MonitorLlenado, cargar_base
+from caracteristicas import FeatureStore
+from ingesta import Ingesta
+from registros import PropertyRecord, listing_id, to_frame
+
 # --- CONFIGURACIÓN ---
 BASE_URL = "https://www.inmuebles24.com"
-SEARCH_URL_TEMPLATE = "https://www.inmuebles24.com/departamentos-en-venta-en-zapopan-pagina-{}.html"
 MAX_PAGES = 75
 DATA_DIR_BASE = 'data/inmuebles24/'
 
@@ -23,10 +28,10 @@ def setup_driver():
     print("Driver configurado exitosamente.")
     return driver
 
-def scrape_listing_page_urls(driver, page_number):
+def scrape_listing_page_urls(driver, page_number, busqueda: Busqueda):
     """Obtiene todas las URLs de propiedades de una página de listado."""
     page_urls = []
-    url = SEARCH_URL_TEMPLATE.format(page_number)
+    url = busqueda.url_listado(page_number)
     print(f"\nObteniendo URLs de la página de listado: {url}")
     try:
         driver.uc_open_with_reconnect(url, 4)
@@ -46,6 +51,7 @@ def scrape_property_details(driver, property_url):
     """Función completa que extrae todas las variables de la página de una propiedad."""
     print(f"  -> Scrapeando detalles de: {property_url}")
     property_data = {'url_fuente': property_url}
+    tabs = {}
     try:
         driver.uc_open_with_reconnect(property_url, 4)
         WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "h1.title-property")))
@@ -136,8 +142,7 @@ def scrape_property_details(driver, property_url):
                         time.sleep(0.5)
                         details_container = block.find_element(By.TAG_NAME, "div")
                         features = [span.text.strip() for span in details_container.find_elements(By.TAG_NAME, "span") if span.text.strip()]
-                        clean_button_text = re.sub(r'[^a-z0-9_]', '', button_text.lower().replace(' ', '_'))
-                        property_data[clean_button_text] = "; ".join(features)
+                        tabs[button_text] = features
                 except Exception:
                     pass
         except Exception as e:
@@ -147,7 +152,7 @@ def scrape_property_details(driver, property_url):
         print(f"  -> ERROR al obtener detalles de {property_url}: {e}")
         return None
         
-    return property_data
+    return PropertyRecord.from_dict(property_data, extra=tabs)
 
 def save_data(all_properties_data, base_dir):
     if not all_properties_data:
@@ -157,26 +162,48 @@ def save_data(all_properties_data, base_dir):
     out_dir = os.path.join(base_dir, today_str)
     os.makedirs(out_dir, exist_ok=True)
     fname = os.path.join(out_dir, f"reporte_detallado_{today_str}.csv")
-    df = pd.DataFrame(all_properties_data)
+    # pestañas dinámicas → tab_features.csv en formato largo (ver caracteristicas.py)
+    store = FeatureStore(base_dir)
+    for rec in all_properties_data:
+        store.agregar(listing_id(rec.url), rec.extra)
+    store.flush(today_str)
+    # el registro normaliza url_fuente → url; se conserva el nombre histórico en el CSV
+    # numéricos + cluster de duplicados + deal score contra los agregados acumulados
+    ingesta = Ingesta(base_dir)
+    df = ingesta.procesar(to_frame(all_properties_data, incluir_extra=False))
+    ingesta.guardar()
+    df = df.rename(columns={"url": "url_fuente"})
     df.to_csv(fname, index=False, encoding="utf-8")
     print(f"\n¡Éxito! {len(df)} registros guardados en: {fname}")
 
 def main():
+    ap = argparse.ArgumentParser()
+    agregar_argumentos(ap)
+    ap.add_argument("--paginas", type=int, default=MAX_PAGES)
+    args = ap.parse_args()
+    busqueda = de_argumentos(args, args.paginas)
+
     driver = setup_driver()
     all_properties_data = []
+    # tasa de llenado móvil: si el sitio cambia el markup, se detiene en vez de guardar vacíos
+    monitor = MonitorLlenado(cargar_base(DATA_DIR_BASE)["detalle"], campos=PropertyRecord.CAMPOS)
     try:
-        for i in range(1, MAX_PAGES + 1):
-            property_urls_on_page = scrape_listing_page_urls(driver, i)
+        for i in range(1, busqueda.paginas + 1):
+            property_urls_on_page = scrape_listing_page_urls(driver, i, busqueda)
             if not property_urls_on_page:
                 print(f"No se obtuvieron más URLs en la página {i}. Terminando proceso.")
                 break
             for url in property_urls_on_page:
                 details = scrape_property_details(driver, url)
                 if details:
+                    # registro compacto: la lista completa vive en memoria hasta save_data
                     all_properties_data.append(details)
+                monitor.observar(details.to_dict() if details else None)
                 time.sleep(2)
             print(f"Fin de la página de listado {i}. Pausa de 5 segundos.")
             time.sleep(5)
+    except ExtraccionDegradada as e:
+        print(f"Extracción degradada, se detiene el crawl: {e}")
     finally:
         print("Cerrando el driver y guardando datos...")
         if driver:
@@ -184,4 +211,6 @@ def main():
         save_data(all_properties_data, DATA_DIR_BASE)
 
 if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
     main()
\ No newline at end of file
@@ -5,92 +5,126 @@ Scraper unificado Inmuebles24 – versión Playwright async (producción)
 • 1ª fase: listados  ➜  CSV_A
 • 2ª fase: detalles  ➜  CSV_B  (con pestañas dinámicas)
 • Concurrencia configurable, reintentos exponenciales, cierre correcto de “pages”
+• Plazo total por URL y copia especulativa (hedge) cuando un detalle supera el p90
+• Pool de identidades (proxy/UA/sesión) con cuarentena de las bloqueadas
+• Canario de selectores antes del crawl y monitor de llenado durante los detalles
 """
 
 from __future__ import annotations
-import argparse, asyncio, os, re, datetime as dt
+import argparse, asyncio, datetime as dt
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 import pandas as pd
-from bs4 import BeautifulSoup
-from tenacity import retry, wait_exponential, stop_after_attempt
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 
+from busquedas import Busqueda, agregar_argumentos, de_argumentos
+from canario import (SELECTORES, CanarioFallido, ExtraccionDegradada, MonitorLlenado,
+                     cargar_base, extraer_listado, verificar)
+from fetch_http import looks_blocked
+from identidades import Identidad, IdentityPool
+from ingesta import Ingesta
+from caracteristicas import FeatureStore
+from inmuebles24 import parse_static, scrape_tabs
+from registros import PropertyRecord, listing_id, to_frame
+from plazos import DEADLINE_S, LatencyTracker, Presupuesto, con_reintentos, hedged
+
 # ───────────────────── CONFIG ─────────────────────
 BASE_DIR    = Path(__file__).resolve().parent
 DATA_DIR    = BASE_DIR / "data"; DATA_DIR.mkdir(parents=True, exist_ok=True)
-CITY_SLUG   = "zapopan"
-UA          = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
-               "(KHTML, like Gecko) Chrome/125 Safari/537.36")
 CONCURRENCY = 4                       # pestañas de detalle simultáneas
-PROXY_URL   = os.getenv("PROXY_URL", "")  # si usas proxy rotativo
-
-# ─────────── helpers BeautifulSoup ────────────
-def parse_static(html: str) -> Dict[str, str]:
-    """Extrae los campos *no dinámicos* de la página de propiedad."""
-    soup = BeautifulSoup(html, "html.parser")
-    sel  = soup.select_one
-    out: Dict[str, str] = {}
-
-    # TODO ─── sustituye / amplía estos ejemplos por todos tus campos
-    out["titulo"]  = sel("h1.title-property").get_text(strip=True) if sel("h1.title-property") else ""
-    out["precio"]  = sel("div.price-value span").get_text(strip=True) if sel("div.price-value span") else ""
-    out["direccion"] = sel("div.section-location-property h4").get_text(strip=True) if sel("div.section-location-property h4") else ""
-    # … añade aquí los ~20 campos restantes con la misma estructura try/except …
-
-    return out
-
-
-def scrape_tabs(page_html: str) -> Dict[str, str]:
-    """Devuelve texto de pestañas ‘Características’, ‘Servicios’, ‘Amenidades’…"""
-    soup, info = BeautifulSoup(page_html, "html.parser"), {}
-    nav = soup.select_one("#reactGeneralFeatures")
-    if not nav:
-        return info
-
-    for btn in nav.select("button[role='tab']"):
-        label = btn.get_text(strip=True).lower()
-        panel = btn.find_next("div", attrs={"role": "tabpanel"})
-        if not label or not panel:
-            continue
-        feats = [
-            re.sub(r"\s+", " ", t.get_text(" ", strip=True))
-            for t in panel.find_all(["span", "li", "p"])
-            if t.get_text(strip=True)
-        ]
-        key = "tab_" + re.sub(r"[^a-z0-9_]+", "", label.replace(" ", "_"))
-        info[key] = "; ".join(feats)
-    return info
+POOL        = IdentityPool.from_env()  # PROXY_URLS="http://h1:8000,http://h2:8000"
+TRACKER     = LatencyTracker()         # latencias de detalle → umbral de hedge (p90)
+BASE_URL    = "https://www.inmuebles24.com"
+MUESTRA     = 4                        # anuncios que revisa el canario
+
 
+class Bloqueado(Exception):
+    """La página devolvió el aviso de Cloudflare para esta identidad."""
 
 # ───────────── Playwright helpers ──────────────
 async def new_browser(pw) -> Browser:
     launch_args = ["--no-sandbox"]
-    if PROXY_URL:
-        return await pw.chromium.launch(headless=True, args=launch_args, proxy={"server": PROXY_URL})
+    if any(i.proxy for i in POOL.identidades):
+        # Chromium exige un proxy global para poder asignar uno por contexto
+        return await pw.chromium.launch(headless=True, args=launch_args,
+                                        proxy={"server": "http://per-context"})
     return await pw.chromium.launch(headless=True, args=launch_args)
 
 
+async def context_for(browser: Browser, ident: Identidad,
+                      cache: Dict[str, tuple]) -> BrowserContext:
+    """Un contexto por identidad; se recrea cuando la identidad cambia de sesión."""
+    sesion, ctx = cache.get(ident.ident_id, (None, None))
+    if ctx is not None and sesion == ident.sesion:
+        return ctx
+    if ctx is not None:
+        await ctx.close()
+    kwargs = {"user_agent": ident.user_agent}
+    if ident.proxy:
+        kwargs["proxy"] = {"server": ident.proxy}
+    ctx = await browser.new_context(**kwargs)
+    cache[ident.ident_id] = (ident.sesion, ctx)
+    return ctx
+
+
+async def identity_page(browser: Browser) -> Tuple[Page, Identidad]:
+    """Pestaña para canario y listados en el contexto de una identidad del pool.
+
+    `browser.new_page()` usaría el contexto por defecto, que con PROXY_URL(S)
+    sale por el proxy ficticio de `new_browser`.  La identidad queda reservada
+    hasta `POOL.soltar(ident)`.
+    """
+    ident = await POOL.adquirir_async()
+    if ident is None:
+        raise CanarioFallido("ninguna identidad sana para abrir el canario")
+    ctx = await context_for(browser, ident, {})
+    return await ctx.new_page(), ident
+
+
+# ──────────────── FASE 0 – CANARIO ─────────────
+async def run_canary(page: Page, busqueda: Busqueda) -> str:
+    """Prueba los selectores en la página 1 y unos anuncios; devuelve el juego a usar.
+
+    Lanza `CanarioFallido` si ni el principal ni el de respaldo alcanzan la base.
+    """
+    async def html_de(url: str) -> str | None:
+        try:
+            await page.goto(url, timeout=45_000)
+            await page.wait_for_load_state("domcontentloaded")
+            html = await page.content()
+        except Exception as e:
+            print(f"   ⚠️  canario: {e}")
+            return None
+        return None if looks_blocked(html) else html
+
+    listado = await html_de(busqueda.url_listado(1))
+    hrefs = list(dict.fromkeys(f["url"] for conj in SELECTORES
+                               for f in (extraer_listado(listado, conj) if listado else []) if f["url"]))
+    detalles = [h for h in [await html_de(BASE_URL + h) for h in hrefs[:MUESTRA]] if h]
+    ver = verificar([listado] if listado else [], detalles, cargar_base(DATA_DIR))
+    print(f"[CANARIO] {len(detalles)} anuncios · selectores {ver.conjunto!r}  ({ver.resumen()})")
+    return ver.conjunto
+
+
 # ──────────────── FASE 1 – LISTADOS ─────────────
-async def run_listings(page: Page, pages_to_scrape: int) -> Path | None:
+async def run_listings(page: Page, busqueda: Busqueda, conjunto: str = "principal") -> Path | None:
     today   = dt.date.today().isoformat()
     out_dir = DATA_DIR / today; out_dir.mkdir(exist_ok=True)
-    csv_path = out_dir / f"listings_{CITY_SLUG}.csv"
+    csv_path = out_dir / f"listings_{busqueda.slug}.csv"
+    pages_to_scrape = busqueda.paginas
 
     listings: List[Dict[str, str]] = []
     for i in range(1, pages_to_scrape + 1):
-        url = f"https://www.inmuebles24.com/departamentos-en-venta-en-{CITY_SLUG}-pagina-{i}.html"
+        url = busqueda.url_listado(i)
         print(f"[LIST] {i}/{pages_to_scrape} → {url}")
         try:
             await page.goto(url, timeout=45_000)
             # espera explícita a que aparezcan cards
-            await page.wait_for_selector("div.postingCardLayout-module__posting-card-layout", timeout=20_000)
-            soup = BeautifulSoup(await page.content(), "html.parser")
-            for card in soup.select("div.postingCardLayout-module__posting-card-layout"):
-                a = card.select_one("h3[data-qa='POSTING_CARD_DESCRIPTION'] a[href]")
-                if a and "href" in a.attrs:
-                    listings.append({"url": "https://www.inmuebles24.com" + a["href"]})
+            await page.wait_for_selector(SELECTORES[conjunto]["listado"]["_tarjeta"], timeout=20_000)
+            for card in extraer_listado(await page.content(), conjunto):
+                if card["url"]:
+                    listings.append({"url": BASE_URL + card["url"]})
         except Exception as e:
             print(f"⚠️  error listados: {e}")
             # guarda depuración
@@ -109,55 +143,114 @@ async def run_listings(page: Page, pages_to_scrape: int) -> Path | None:
 
 
 # ─────────────── FASE 2 – DETALLES ──────────────
-@retry(wait=wait_exponential(multiplier=2), stop=stop_after_attempt(3))
-async def fetch_detail(ctx: BrowserContext, url: str) -> Dict[str, str]:
-    """Visita una URL y devuelve sus datos; cierra la pestaña luego."""
+async def fetch_detail(ctx: BrowserContext, url: str, presupuesto: Presupuesto,
+                       conjunto: str = "principal") -> PropertyRecord:
+    """Visita una URL y devuelve sus datos; cierra la pestaña luego.
+
+    Todos los timeouts se recortan al presupuesto que le queda a la URL.
+    """
     page = await ctx.new_page()                 # ←  await obligatorio
     try:
-        await page.goto(url, timeout=45_000)
-        await page.wait_for_selector("h2.title-type-sup-property", timeout=25_000)
+        await page.goto(url, timeout=presupuesto.ms(45_000))
+        if looks_blocked(await page.content()):
+            raise Bloqueado(url)                # otra identidad lo reintentará
+        await page.wait_for_selector(SELECTORES[conjunto]["detalle"]["subtitulo"], timeout=presupuesto.ms(25_000))
 
         # clic en pestañas para que se cargue su HTML
         for tab in await page.query_selector_all("#reactGeneralFeatures button[role='tab']"):
             try:
-                await tab.click(timeout=2_500)
+                await tab.click(timeout=presupuesto.ms(2_500))
                 await asyncio.sleep(0.25)
             except Exception:
                 pass
 
         html  = await page.content()
-        data  = parse_static(html)
-        data.update(scrape_tabs(html))
+        data  = parse_static(html, conjunto)
         data["url"] = url
-        return data
+        return PropertyRecord.from_dict(data, extra=scrape_tabs(html))
 
     finally:
         await page.close()                      # ← libera memoria
 
 
-async def run_details(browser: Browser, csv_listings: Path):
+async def run_details(browser: Browser, csv_listings: Path, conjunto: str = "principal"):
     out_csv = csv_listings.parent / "detalles_completos.csv"
     urls = pd.read_csv(csv_listings)["url"].dropna().tolist()
     done = set(pd.read_csv(out_csv)["url"]) if out_csv.exists() else set()
 
-    ctx   = await browser.new_context(user_agent=UA)
+    ctxs: Dict[str, tuple] = {}
     sem   = asyncio.Semaphore(CONCURRENCY)
-    rows  = []
+    rows: List[PropertyRecord] = []
+    monitor = MonitorLlenado(cargar_base(DATA_DIR)["detalle"], campos=PropertyRecord.CAMPOS)
+    parar   = asyncio.Event()               # el monitor detectó que la extracción se degradó
+
+    async def attempt(u: str, presupuesto: Presupuesto, usadas: set) -> PropertyRecord:
+        """Un intento con una identidad distinta de las ya usadas para esta URL."""
+        ident = await POOL.adquirir_async(excluir=usadas, timeout=presupuesto.recortar(60))
+        if ident is None:
+            raise RuntimeError("sin identidades sanas")
+        usadas.add(ident.ident_id)
+        t0 = asyncio.get_running_loop().time()
+        try:
+            ctx  = await context_for(browser, ident, ctxs)
+            data = await fetch_detail(ctx, u, presupuesto, conjunto)
+        except asyncio.CancelledError:
+            POOL.soltar(ident)                  # perdió la carrera del hedge
+            raise
+        except Bloqueado:
+            POOL.liberar(ident, ok=False, bloqueado=True)
+            raise
+        except Exception:
+            POOL.liberar(ident, ok=False, latencia=asyncio.get_running_loop().time() - t0)
+            raise
+        POOL.liberar(ident, ok=True, latencia=asyncio.get_running_loop().time() - t0)
+        return data
+
+    def observar(rec: PropertyRecord | None):
+        if parar.is_set():
+            return
+        try:
+            monitor.observar(rec.to_dict() if rec else None)
+        except ExtraccionDegradada as e:
+            print(f"✖︎ Extracción degradada, se detiene el crawl: {e}")
+            parar.set()
 
     async def worker(u):
         async with sem:
+            if parar.is_set():
+                return
+            presupuesto, usadas = Presupuesto(DEADLINE_S), set()
             try:
-                rows.append(await fetch_detail(ctx, u))
+                rec = await con_reintentos(
+                    lambda: hedged(lambda: attempt(u, presupuesto, usadas), TRACKER, presupuesto),
+                    presupuesto)
             except Exception as e:
-                print(f"⚠️  detalle falló: {e}  {u}")
+                print(f"⚠️  detalle falló: {e!r}  {u}")
+                rec = None
+            else:
+                rows.append(rec)
+            observar(rec)
 
     tasks = [worker(u) for u in urls if u not in done and "clasificado" in u]
-    print(f"[DET] Scraping {len(tasks)} URLs con concurrencia {CONCURRENCY}…")
+    print(f"[DET] Scraping {len(tasks)} URLs con concurrencia {CONCURRENCY} "
+          f"y {len(POOL.identidades)} identidades…")
     await asyncio.gather(*tasks)
-    await ctx.close()
+    for _, ctx in ctxs.values():
+        await ctx.close()
+    for fila in POOL.resumen():
+        print("   ", fila)
+    print("    latencias:", TRACKER.resumen())
 
     if rows:
-        df_new = pd.DataFrame(rows)
+        # pestañas → formato largo; el CSV de detalle sólo lleva columnas fijas
+        store = FeatureStore(DATA_DIR)
+        for r in rows:
+            store.agregar(listing_id(r.url), r.extra)
+        store.flush(csv_listings.parent.name)
+        # numéricos + cluster de duplicados + deal score contra los agregados acumulados
+        ingesta = Ingesta(DATA_DIR)
+        df_new  = ingesta.procesar(to_frame(rows, incluir_extra=False), csv_listings.parent.name)
+        ingesta.guardar()
         df_final = (pd.concat([pd.read_csv(out_csv), df_new], ignore_index=True)
                     if out_csv.exists() else df_new)
         df_final.to_csv(out_csv, index=False)
@@ -170,19 +263,32 @@ async def run_details(browser: Browser, csv_listings: Path):
 async def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--pages", type=int, default=3, help="Páginas de listado a scrapear")
+    agregar_argumentos(parser)
     args = parser.parse_args()
 
     async with async_playwright() as pw:
         browser = await new_browser(pw)
-        page    = await browser.new_page()
-
-        csv_a = await run_listings(page, args.pages)
+        busqueda = de_argumentos(args, args.pages)
+        ident = None
+        try:
+            page, ident = await identity_page(browser)
+            conjunto = await run_canary(page, busqueda)
+            csv_a = await run_listings(page, busqueda, conjunto)
+        except CanarioFallido as e:
+            print(f"✖︎ Canario: {e}\n  · revisa los selectores (canario.py) antes del crawl completo.")
+            await browser.close()
+            return
+        finally:
+            if ident is not None:
+                POOL.soltar(ident)
         if csv_a and csv_a.exists():
-            await run_details(browser, csv_a)
+            await run_details(browser, csv_a, conjunto)
 
         await browser.close()
     print("✨ Proceso completado.")
 
 
 if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
     asyncio.run(main())
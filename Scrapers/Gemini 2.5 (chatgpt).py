@@ -3,8 +3,11 @@
 """
 Scraper Inmuebles24  –  modo “tranquilo” (SeleniumBase, 1 hilo)
 
-• Reintenta suavemente y abandona si Cloudflare devuelve “Attention Required”.
-• No usa ningún proxy: pensado para tests manuales IP-única.
+• Ante “Attention Required” de Cloudflare pone la identidad (UA/proxy) en
+  cuarentena y sigue con otra; sólo para cuando no queda ninguna sana.
+• Sin PROXY_URLS rota sólo el UA: pensado para tests manuales IP-única.
+• Canario de selectores antes del crawl (cambia al juego de respaldo o aborta)
+  y monitor de llenado que lo detiene si la extracción empieza a fallar.
 """
 
 from __future__ import annotations
@@ -13,20 +16,30 @@ from pathlib import Path
 from typing import Dict, List
 
 import pandas as pd
-from bs4 import BeautifulSoup
 
 from seleniumbase import Driver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from busquedas import Busqueda, agregar_argumentos, de_argumentos
+from canario import (SELECTORES, CanarioFallido, ExtraccionDegradada, MonitorLlenado,
+                     cargar_base, extraer_detalle, extraer_listado, verificar)
+from caracteristicas import FeatureStore
+from identidades import Identidad, IdentityPool
+from estadisticas import COLUMNAS as COLUMNAS_ZONA
+from ingesta import Ingesta
+from normalizar import COLUMNAS as COLUMNAS_NORM
+from registros import PropertyRecord, listing_id
+
 # ─────────────── Config básica ────────────────
 BASE_URL  = "https://www.inmuebles24.com"
-CITY_SLUG = "zapopan"
-SEARCH_TMPL = f"{BASE_URL}/departamentos-en-venta-en-{CITY_SLUG}-pagina-{{}}.html"
 
 DATA_DIR  = Path("data/inmuebles24")
 DATA_DIR.mkdir(parents=True, exist_ok=True)
+FEATURES  = FeatureStore(DATA_DIR)   # pestañas en formato largo
+INGESTA   = Ingesta(DATA_DIR)   # normalización, duplicados y deal score
+MUESTRA   = 3                   # anuncios que revisa el canario
 
 UAS = [
     # pequeña rotación – añade más si quieres
@@ -34,81 +47,89 @@ UAS = [
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124 Safari/537.36",
 ]
 
-def new_driver() -> Driver:
-    ua = random.choice(UAS)
-    print(f"→ UA elegido: {ua}")
-    drv = Driver(headless=True, uc=True, block_images=True)
-    drv.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": ua})
+POOL = IdentityPool.from_env(UAS, max_en_vuelo=1)
+
+def new_driver(ident: Identidad) -> Driver:
+    print(f"→ Identidad {ident.ident_id}: {ident.user_agent}")
+    proxy = ident.proxy.split("://", 1)[-1] or None     # SeleniumBase: user:pass@host:port
+    drv = Driver(headless=True, uc=True, block_images=True, proxy=proxy)
+    drv.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": ident.user_agent})
     drv.set_page_load_timeout(60)
     return drv
 
 # ──────────────── helpers de bloqueo ─────────────
+class Bloqueado(Exception):
+    """Cloudflare bloqueó la identidad actual."""
+
 def looks_blocked(html: str) -> bool:
     head = html[:2_048].lower()
     return ("attention required" in head and "cloudflare" in head) or "sorry, you have been blocked" in head
 
+def rotate_driver(drv: Driver, ident: Identidad):
+    """Cuarentena para la identidad bloqueada y driver nuevo con otra sana.
+
+    Devuelve (None, None) si no queda ninguna identidad disponible.
+    """
+    POOL.liberar(ident, ok=False, bloqueado=True)
+    drv.quit()
+    nueva = POOL.adquirir_espera(timeout=120)
+    if nueva is None:
+        return None, None
+    return new_driver(nueva), nueva
+
 # ────────────── Listados ────────────────────────
-def scrape_listing_urls(drv: Driver, page_num: int) -> List[str] | None:
-    url = SEARCH_TMPL.format(page_num)
+def scrape_listing_urls(drv: Driver, page_num: int, busqueda: Busqueda,
+                        conjunto: str = "principal") -> List[str]:
+    url = busqueda.url_listado(page_num)
     print(f"[LIST] {page_num} → {url}")
     try:
         drv.uc_open_with_reconnect(url, 4)
         html = drv.page_source
         if looks_blocked(html):
-            print("⚠️  Cloudflare dice 'Attention Required' → paro suave.")
-            return None
+            print("⚠️  Cloudflare dice 'Attention Required' → rotando identidad.")
+            raise Bloqueado(url)
         WebDriverWait(drv, 20).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR,
-                                            "div.postingCardLayout-module__posting-card-layout"))
+            EC.presence_of_element_located((By.CSS_SELECTOR, SELECTORES[conjunto]["listado"]["_tarjeta"]))
         )
-        soup = BeautifulSoup(html, "html.parser")
-        urls = [BASE_URL + a["href"]
-                for a in soup.select("div.postingCardLayout-module__posting-card-layout a[href]")
-                if "/propiedades/" in a["href"]]
+        urls = [BASE_URL + card["url"] for card in extraer_listado(html, conjunto)
+                if "/propiedades/" in card["url"]]
         print(f"   • {len(urls)} URLs encontradas")
         return urls
+    except Bloqueado:
+        raise
     except Exception as e:
         print(f"   ⚠️  Error en página {page_num}: {e}")
         return []
 
 # ───────────── Detalle (estático + tabs) ─────────────
-def parse_static(soup: BeautifulSoup) -> Dict[str, str]:
-    out: Dict[str, str] = {}
-    sel = lambda css: soup.select_one(css)
+def parse_static(html: str, conjunto: str = "principal") -> Dict[str, str]:
+    out = extraer_detalle(html, conjunto)
+    out.pop("pestanas", None)
 
     try:
-        h2 = sel("h2.title-type-sup-property")
-        toks = [t.strip() for t in h2.get_text("·").split("·") if t.strip()] if h2 else []
+        toks = [t.strip() for t in out.pop("subtitulo").split("·") if t.strip()]
         out["tipo_propiedad"]     = toks[0] if len(toks) > 0 else ""
         out["area_m2"]            = toks[1] if len(toks) > 1 else ""
         out["recamaras"]          = re.search(r"\d+", toks[2]).group() if len(toks) > 2 else ""
         out["estacionamientos"]   = re.search(r"\d+", toks[3]).group() if len(toks) > 3 else ""
     except: pass
 
-    try: out["titulo"]  = sel("h1.title-property").get_text(strip=True)
-    except: out["titulo"] = ""
-
-    try:
-        price_div = sel("div.price-value span")
-        out["precio"] = price_div.get_text(strip=True) if price_div else ""
-    except: out["precio"] = ""
-
     return out
 
-def scrape_detail(drv: Driver, url: str) -> Dict[str, str] | None:
+def scrape_detail(drv: Driver, url: str, conjunto: str = "principal") -> Dict[str, str] | None:
     print(f"[DET] → {url}")
     try:
         drv.uc_open_with_reconnect(url, 4)
         html = drv.page_source
         if looks_blocked(html):
-            print("   ⚠️  Detalle bloqueado por Cloudflare – salto.")
-            return None
+            print("   ⚠️  Detalle bloqueado por Cloudflare → rotando identidad.")
+            raise Bloqueado(url)
         WebDriverWait(drv, 20).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "h1.title-property"))
+            EC.presence_of_element_located((By.CSS_SELECTOR, SELECTORES[conjunto]["detalle"]["titulo"]))
         )
-        soup = BeautifulSoup(html, "html.parser")
-        data = parse_static(soup)
+        data = parse_static(html, conjunto)
         data["url"] = url
+        tabs: Dict[str, List[str]] = {}
 
         # Tabs dinámicas
         try:
@@ -120,61 +141,129 @@ def scrape_detail(drv: Driver, url: str) -> Dict[str, str] | None:
                 drv.execute_script("arguments[0].click()", btn)
                 time.sleep(0.4)
                 panel = btn.find_element(By.XPATH, "..//div[contains(@role,'tabpanel')]")
-                feats = [s.text.strip() for s in panel.find_elements(By.TAG_NAME, "span") if s.text.strip()]
-                key = re.sub(r"[^a-z0-9_]", "", label.lower().replace(" ", "_"))
-                data[key] = "; ".join(feats)
+                tabs[label] = [s.text.strip() for s in panel.find_elements(By.TAG_NAME, "span") if s.text.strip()]
         except Exception:
             pass
 
+        FEATURES.agregar(listing_id(url), tabs)
         return data
+    except Bloqueado:
+        raise
     except Exception as e:
         print(f"   ⚠️  Error detalle: {e}")
         return None
 
+# ───────────── Canario de selectores ─────────────
+def run_canary(drv: Driver, busqueda: Busqueda) -> str:
+    """Página 1 + unos anuncios → juego de selectores a usar (o `CanarioFallido`)."""
+    def html_de(url: str) -> str | None:
+        try:
+            drv.uc_open_with_reconnect(url, 4)
+            html = drv.page_source
+        except Exception as e:
+            print(f"   ⚠️  canario: {e}")
+            return None
+        return None if looks_blocked(html) else html
+
+    listado = html_de(busqueda.url_listado(1))
+    hrefs = list(dict.fromkeys(f["url"] for conj in SELECTORES
+                               for f in (extraer_listado(listado, conj) if listado else []) if f["url"]))
+    detalles = [h for h in (html_de(BASE_URL + h) for h in hrefs[:MUESTRA]) if h]
+    ver = verificar([listado] if listado else [], detalles, cargar_base(DATA_DIR))
+    print(f"[CANARIO] {len(detalles)} anuncios · selectores {ver.conjunto!r}  ({ver.resumen()})")
+    return ver.conjunto
+
 # ──────────────── Guardado incremental ────────────
+# columnas fijas del reporte: se agrega fila a fila, así que todas deben coincidir con la cabecera
+COLUMNAS_REPORTE = PropertyRecord.CAMPOS + COLUMNAS_NORM + ("cluster_id",) + COLUMNAS_ZONA
+
 def save_row(row: Dict[str, str]):
     today = dt.date.today().isoformat()
     out_dir = DATA_DIR / today
     out_dir.mkdir(exist_ok=True)
     fpath = out_dir / f"reporte_detallado_{today}.csv"
 
-    mode = "a" if fpath.exists() else "w"
-    pd.DataFrame([row]).to_csv(fpath, mode=mode, header=not fpath.exists(),
-                               index=False, encoding="utf-8")
+    nuevo = not fpath.exists()
+    df = INGESTA.procesar(pd.DataFrame([row])).reindex(columns=list(COLUMNAS_REPORTE))
+    df.to_csv(fpath, mode="w" if nuevo else "a", header=nuevo, index=False, encoding="utf-8")
+    FEATURES.flush(today)
 
 # ─────────────────────────── MAIN ────────────────────────────
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--max-pages", type=int, default=3, help="cuántas páginas de listados")
     ap.add_argument("--from-page", type=int, default=1, help="página inicial")
+    agregar_argumentos(ap)
     args = ap.parse_args()
+    busqueda = de_argumentos(args, args.max_pages)
 
-    drv = new_driver()
+    ident = POOL.adquirir()     # el driver conserva su identidad hasta que la bloqueen
+    drv = new_driver(ident)
     try:
+        try:
+            conjunto = run_canary(drv, busqueda)
+        except CanarioFallido as e:
+            print(f"✖︎ Canario: {e}\n  · revisa los selectores (canario.py) antes del crawl completo.")
+            return
+
         # ---------- LISTADOS ----------
         all_urls: List[str] = []
-        for p in range(args.from_page, args.from_page + args.max_pages):
-            urls = scrape_listing_urls(drv, p)
-            if urls is None:   # bloqueo
-                break
+        p = args.from_page
+        while p < args.from_page + args.max_pages:
+            t0 = time.monotonic()
+            try:
+                urls = scrape_listing_urls(drv, p, busqueda, conjunto)
+            except Bloqueado:
+                drv, ident = rotate_driver(drv, ident)
+                if drv is None:
+                    print("⚠️  Ninguna identidad sana → paro suave.")
+                    break
+                continue            # reintenta la misma página
+            POOL.registrar(ident, ok=bool(urls), latencia=time.monotonic() - t0)
             all_urls.extend(urls)
+            p += 1
             time.sleep(random.uniform(2, 5))
-        if not all_urls:
+        if not all_urls or drv is None:
             print("Sin URLs para procesar, termina.")
             return
         print(f"→ Total URLs a detalle: {len(all_urls)}")
 
         # ---------- DETALLES ----------
-        for i, u in enumerate(all_urls, 1):
-            print(f"[{i}/{len(all_urls)}]", end=" ")
-            row = scrape_detail(drv, u)
+        monitor = MonitorLlenado(cargar_base(DATA_DIR)["detalle"],
+                                 campos=("titulo", "precio", "direccion", "descripcion"))
+        i = 0
+        while i < len(all_urls):
+            u = all_urls[i]
+            print(f"[{i + 1}/{len(all_urls)}]", end=" ")
+            t0 = time.monotonic()
+            try:
+                row = scrape_detail(drv, u, conjunto)
+            except Bloqueado:
+                drv, ident = rotate_driver(drv, ident)
+                if drv is None:
+                    print("⚠️  Ninguna identidad sana → paro suave.")
+                    break
+                continue
+            POOL.registrar(ident, ok=row is not None, latencia=time.monotonic() - t0)
             if row:
                 save_row(row)
+            try:
+                monitor.observar(row)
+            except ExtraccionDegradada as e:
+                print(f"✖︎ Extracción degradada, se detiene el crawl: {e}")
+                break
+            i += 1
             time.sleep(random.uniform(3, 7))
 
     finally:
-        drv.quit()
+        INGESTA.guardar()
+        if drv is not None:
+            drv.quit()
+        for fila in POOL.resumen():
+            print("   ", fila)
         print("✔︎ Fin. Driver cerrado.")
 
 if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
     main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice de amenidades en bitset para filtrar "alberca + gimnasio + elevador" en ms.
+
+• Vocabulario: cada feature distinta de las pestañas (ver caracteristicas.py),
+  normalizada sin acentos ni mayúsculas → un bit.
+• Cada anuncio ocupa `palabras` enteros uint64 (ancho fijo); se guardan por
+  palabra (matriz palabras × anuncios) para que cada filtro sólo recorra,
+  de forma contigua, las palabras donde caen sus bits.
+• `filtrar(todas=…, alguna=…, ninguna=…)` se resuelve con AND/OR/NOT
+  vectorizados de numpy sobre toda la historia a la vez.
+
+    python amenidades.py data/inmuebles24 --construir
+    python amenidades.py data/inmuebles24 --todas alberca gimnasio --ninguna "sin elevador"
+    python amenidades.py --bench
+"""
+
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from caracteristicas import FeatureStore
+from normalizar import plegar as clave
+
+ARCHIVO_INDICE = "amenidades_index.npz"
+
+
+class AmenityIndex:
+    def __init__(self, vocab: Optional[List[str]] = None):
+        self.vocab: List[str] = list(vocab or [])
+        self.bit: Dict[str, int] = {v: i for i, v in enumerate(self.vocab)}
+        self.ids: List[str] = []
+        self.fila: Dict[str, int] = {}
+        self.bits = np.zeros((1, 0), dtype=np.uint64)     # palabras × anuncios
+
+    # ─ construcción
+    @property
+    def palabras(self) -> int:
+        return self.bits.shape[0]
+
+    def _bit_de(self, texto: str) -> int:
+        k = clave(texto)
+        b = self.bit.get(k)
+        if b is None:
+            b = self.bit[k] = len(self.vocab)
+            self.vocab.append(k)
+        return b
+
+    def _asegurar_capacidad(self, filas: int, bits: int):
+        palabras = max(1, (bits + 63) // 64)
+        p0, f0 = self.bits.shape
+        if filas > f0 or palabras > p0:
+            nuevo = np.zeros((max(palabras, p0), max(filas, f0 * 2 if filas > f0 else f0)), dtype=np.uint64)
+            nuevo[:p0, :f0] = self.bits
+            self.bits = nuevo
+
+    def agregar(self, lid: str, features: Iterable[str]):
+        """Fija (reemplaza) las amenidades de un anuncio."""
+        bs = [self._bit_de(f) for f in features]
+        i = self.fila.get(lid)
+        if i is None:
+            i = self.fila[lid] = len(self.ids)
+            self.ids.append(lid)
+        self._asegurar_capacidad(len(self.ids), len(self.vocab))
+        self.bits[:, i] = 0
+        for b in bs:
+            self.bits[b >> 6, i] |= np.uint64(1) << np.uint64(b & 63)
+
+    def compactar(self):
+        self.bits = np.ascontiguousarray(self.bits[:, :len(self.ids)])
+
+    @classmethod
+    def construir(cls, store: FeatureStore, fechas: Optional[Iterable[str]] = None,
+                  base: Optional["AmenityIndex"] = None,
+                  grupos: Optional[Sequence[str]] = None) -> "AmenityIndex":
+        """Índice desde el almacén largo; con `base` sólo aplica las fechas nuevas."""
+        idx = base or cls()
+        for lid, por_grupo in store.features_de(fechas).items():
+            feats = [f for g, fs in por_grupo.items() if not grupos or g in grupos for f in fs]
+            idx.agregar(lid, feats)
+        idx.compactar()
+        return idx
+
+    # ─ consulta
+    def _mascara(self, nombres: Sequence[str]) -> Optional[np.ndarray]:
+        """Máscara por palabra; None si algún nombre no existe en el vocabulario."""
+        m = np.zeros(self.palabras, dtype=np.uint64)
+        for n in nombres:
+            b = self.bit.get(clave(n))
+            if b is None:
+                return None
+            m[b >> 6] |= np.uint64(1) << np.uint64(b & 63)
+        return m
+
+    def _alguno(self, m: np.ndarray) -> np.ndarray:
+        """Anuncios con al menos un bit de `m` encendido."""
+        hit = np.zeros(len(self.ids), dtype=bool)
+        for w in np.flatnonzero(m):
+            hit |= (self.bits[w] & m[w]) != 0
+        return hit
+
+    def filtrar(self, todas: Sequence[str] = (), alguna: Sequence[str] = (),
+                ninguna: Sequence[str] = ()) -> np.ndarray:
+        """Máscara booleana de anuncios que cumplen AND(todas) ∧ OR(alguna) ∧ ¬OR(ninguna)."""
+        n = len(self.ids)
+        ok = np.ones(n, dtype=bool)
+        if todas:
+            m = self._mascara(todas)
+            if m is None:
+                return np.zeros(n, dtype=bool)
+            for w in np.flatnonzero(m):
+                ok &= (self.bits[w] & m[w]) == m[w]
+        if alguna:
+            ms = [x for x in (self._mascara([a]) for a in alguna) if x is not None]
+            if not ms:
+                return np.zeros(n, dtype=bool)
+            ok &= self._alguno(np.bitwise_or.reduce(ms))
+        if ninguna:
+            ms = [x for x in (self._mascara([a]) for a in ninguna) if x is not None]
+            if ms:
+                ok &= ~self._alguno(np.bitwise_or.reduce(ms))
+        return ok
+
+    def buscar(self, **kwargs) -> List[str]:
+        """Igual que `filtrar` pero devuelve los listing_id."""
+        return [self.ids[i] for i in np.flatnonzero(self.filtrar(**kwargs))]
+
+    def columna(self):
+        """Serie de pandas listing_id → bitset (tupla de uint64) para unir a otros frames."""
+        import pandas as pd
+        return pd.Series([tuple(r) for r in self.bits.T.tolist()], index=self.ids, name="amenidades_bits")
+
+    # ─ persistencia
+    def guardar(self, path: Union[str, Path]):
+        np.savez_compressed(path, bits=self.bits, ids=np.array(self.ids, dtype=object),
+                            vocab=json.dumps(self.vocab, ensure_ascii=False))
+
+    @classmethod
+    def cargar(cls, path: Union[str, Path]) -> "AmenityIndex":
+        with np.load(path, allow_pickle=True) as z:
+            idx = cls(json.loads(str(z["vocab"])))
+            idx.ids = list(z["ids"])
+            idx.bits = z["bits"]
+        idx.fila = {lid: i for i, lid in enumerate(idx.ids)}
+        return idx
+
+
+# ─────────────────────────── BENCH ──────────────────────────
+def _bench(n: int = 2_000_000, v: int = 150):
+    import time
+    rng = np.random.default_rng(0)
+    idx = AmenityIndex([f"amenidad {k}" for k in range(v)])
+    idx.bit = {a: i for i, a in enumerate(idx.vocab)}
+    idx.ids = [str(k) for k in range(n)]
+    idx.bits = rng.integers(0, 2**63, size=((v + 63) // 64, n), dtype=np.uint64)
+    for args in ({"todas": ["amenidad 1", "amenidad 70", "amenidad 140"]},
+                 {"todas": ["amenidad 3"], "alguna": ["amenidad 9", "amenidad 99"],
+                  "ninguna": ["amenidad 120"]}):
+        t0 = time.perf_counter()
+        hits = int(idx.filtrar(**args).sum())
+        print(f"{n:,} anuncios · {args} → {hits:,} en {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    ap = argparse.ArgumentParser(description="Índice bitset de amenidades")
+    ap.add_argument("data_dir", nargs="?", help="directorio base (p. ej. data/inmuebles24)")
+    ap.add_argument("--construir", action="store_true", help="(re)construye el índice desde tab_features")
+    ap.add_argument("--todas", nargs="*", default=[])
+    ap.add_argument("--alguna", nargs="*", default=[])
+    ap.add_argument("--ninguna", nargs="*", default=[])
+    ap.add_argument("--bench", action="store_true")
+    args = ap.parse_args()
+
+    if args.bench:
+        _bench()
+    elif args.data_dir:
+        path = Path(args.data_dir) / ARCHIVO_INDICE
+        if args.construir or not path.exists():
+            idx = AmenityIndex.construir(FeatureStore(args.data_dir))
+            idx.guardar(path)
+            print(f"Índice: {len(idx.ids):,} anuncios × {len(idx.vocab)} amenidades → {path}")
+        else:
+            idx = AmenityIndex.cargar(path)
+        if args.todas or args.alguna or args.ninguna:
+            ids = idx.buscar(todas=args.todas, alguna=args.alguna, ninguna=args.ninguna)
+            print(f"{len(ids):,} anuncios:", " ".join(ids[:50]))
+    else:
+        ap.print_help()
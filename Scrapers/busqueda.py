@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice de texto completo (SQLite FTS5) sobre titulo/descripcion de toda la historia.
+
+• Una fila por listing_id en `anuncios` (último precio, zona, cluster, fechas)
+  y su texto en la tabla FTS5 `textos`, unidas por rowid.
+• El texto se indexa ya plegado (sin acentos) y con un stemming ligero de
+  español (plurales y género: "remodeladas" → "remodelad"); la consulta pasa
+  por el mismo proceso, así "Remodelado" encuentra "remodeladas". El tokenizer
+  de FTS5 es `unicode61 remove_diacritics 2` por si llega texto sin plegar.
+• Alta incremental desde la ingesta (ingesta.py): un re-crawl con el mismo
+  texto sólo actualiza precio/fechas, no re-indexa.
+• `buscar()` ordena por bm25 (titulo pesa más) y filtra por precio, zona y
+  moneda en la misma consulta; por defecto un resultado por cluster_id.
+
+    python busqueda.py data/inmuebles24 --reindexar          # backfill de los CSV
+    python busqueda.py data/inmuebles24 "roof garden" "pet friendly" --max 4500000
+    python busqueda.py --bench
+"""
+
+from __future__ import annotations
+import hashlib, re, sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+from normalizar import plegar
+
+ARCHIVO_INDICE = "busqueda.sqlite"
+MIN_RAIZ   = 4            # `raiz` no deja raíces de menos letras al quitar la vocal final
+ANALIZADOR = 2            # versión de `analizar`; al cambiar, los textos ya indexados se marcan para re-indexar
+PESOS_BM25     = (5.0, 1.0)                 # titulo, descripcion
+
+_RE_TOKEN  = re.compile(r"[a-z0-9]+")
+_RE_QUERY  = re.compile(r'"([^"]+)"|(\S+)')
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS anuncios (
+    id            INTEGER PRIMARY KEY,
+    listing_id    TEXT UNIQUE NOT NULL,
+    url           TEXT,
+    titulo        TEXT,
+    precio_valor  REAL,
+    moneda        TEXT,
+    superficie_m2 REAL,
+    zona          TEXT,
+    cluster_id    TEXT,
+    huella        INTEGER,
+    primera_fecha TEXT,
+    ultima_fecha  TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_anuncios_zona   ON anuncios(zona, precio_valor);
+CREATE INDEX IF NOT EXISTS ix_anuncios_precio ON anuncios(precio_valor);
+CREATE VIRTUAL TABLE IF NOT EXISTS textos USING fts5(
+    titulo, descripcion, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+# ───────────────────── análisis de texto ─────────────────────
+def raiz(palabra: str) -> str:
+    """Stemmer ligero de español (Savoy): primero el plural, luego la vocal final de género/número.
+
+    Singular y plural dan la misma raíz ('casa'/'casas' → 'casa', 'bano'/'banos'
+    → 'bano', 'amplio'/'amplias' → 'ampli'); la vocal final sólo se quita si
+    quedan al menos MIN_RAIZ letras.
+    """
+    if len(palabra) > 3 and palabra[-1] == "s":
+        if palabra.endswith("eses"):
+            return palabra[:-2]
+        if palabra.endswith("ces"):
+            return palabra[:-3] + "z"
+        if palabra[-2] in "oae":
+            palabra = palabra[:-1]
+    if len(palabra) > MIN_RAIZ and palabra[-1] in "oae":
+        return palabra[:-1]
+    return palabra
+
+
+def analizar(texto: Any) -> str:
+    if not isinstance(texto, str) or not texto:
+        return ""
+    return " ".join(raiz(t) for t in _RE_TOKEN.findall(plegar(texto)))
+
+
+def consulta_fts(q: str) -> str:
+    """'roof garden "pet friendly" OR alberca' → expresión FTS5 con términos analizados.
+
+    Las frases entre comillas se conservan como frase; OR / NOT pasan tal cual;
+    el resto de términos se combinan con AND implícito.
+    """
+    partes: List[str] = []
+    for frase, termino in _RE_QUERY.findall(q):
+        if termino in ("OR", "NOT", "AND"):
+            partes.append(termino)
+            continue
+        tokens = analizar(frase or termino).split()
+        if tokens:
+            partes.append('"' + " ".join(tokens) + '"')
+    return " ".join(partes)
+
+
+def consulta_de_argumentos(terminos: Sequence[str]) -> str:
+    """Argumentos de la CLI → consulta: un argumento con espacios llegó entre comillas y es una frase."""
+    return " ".join(f'"{t}"' if " " in t.strip() and '"' not in t else t for t in terminos)
+
+
+def _h64(texto: str) -> int:
+    # SQLite INTEGER es con signo
+    return int.from_bytes(hashlib.blake2b(texto.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def _f(x: Any) -> Optional[float]:
+    return float(x) if isinstance(x, (int, float)) and x == x else None
+
+
+def _s(x: Any) -> Optional[str]:
+    return x if isinstance(x, str) and x else None
+
+
+# ───────────────────── índice ─────────────────────
+class IndiceTexto:
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = sqlite3.connect(self.path)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.executescript(_ESQUEMA)
+        self._grid = None
+        version = self.con.execute("PRAGMA user_version").fetchone()[0]
+        if version < ANALIZADOR:
+            with self.con:                      # raíces viejas: la próxima alta (o --reindexar) los re-analiza
+                n = self.con.execute("UPDATE anuncios SET huella = NULL").rowcount
+                self.con.execute(f"PRAGMA user_version = {ANALIZADOR}")
+            if n:
+                print(f"ℹ︎ {self.path}: analizador v{ANALIZADOR}, {n} textos pendientes de re-indexar (--reindexar)")
+
+    @classmethod
+    def abrir(cls, base_dir: Union[str, Path]) -> "IndiceTexto":
+        return cls(Path(base_dir) / ARCHIVO_INDICE)
+
+    def cerrar(self):
+        self.con.close()
+
+    def __len__(self) -> int:
+        return self.con.execute("SELECT count(*) FROM anuncios").fetchone()[0]
+
+    # ─ alta
+    def _zona(self, fila: Dict[str, Any]) -> Optional[str]:
+        if _s(fila.get("zona")):
+            return fila["zona"]
+        if self._grid is None:
+            from estadisticas import CELDA_KM
+            from geo import GridIndex
+            self._grid = GridIndex(CELDA_KM)
+        from estadisticas import zona_de
+        return zona_de(fila, self._grid)
+
+    def agregar(self, filas: Iterable[Dict[str, Any]], fecha: str) -> int:
+        """Alta/actualización por listing_id en una transacción. Devuelve textos (re)indexados."""
+        from registros import listing_id
+        cur = self.con.cursor()
+        reindexados = 0
+        with self.con:
+            for fila in filas:
+                url = _s(fila.get("url")) or _s(fila.get("url_fuente"))
+                if not url:
+                    continue
+                lid = listing_id(url)
+                titulo = _s(fila.get("titulo")) or _s(fila.get("nombre")) or ""
+                descripcion = _s(fila.get("descripcion")) or ""
+                huella = _h64(titulo + "\x1f" + descripcion)
+                valores = (url, titulo, _f(fila.get("precio_valor")), _s(fila.get("moneda")),
+                           _f(fila.get("superficie_m2")), self._zona(fila), _s(fila.get("cluster_id")))
+                previo = cur.execute("SELECT id, huella FROM anuncios WHERE listing_id = ?", (lid,)).fetchone()
+                if previo is None:
+                    cur.execute("INSERT INTO anuncios (listing_id, url, titulo, precio_valor, moneda, superficie_m2, "
+                                "zona, cluster_id, huella, primera_fecha, ultima_fecha) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (lid, *valores, huella, fecha, fecha))
+                    rowid = cur.lastrowid
+                else:
+                    rowid = previo[0]
+                    cur.execute("UPDATE anuncios SET url = ?, titulo = ?, precio_valor = ?, moneda = ?, "
+                                "superficie_m2 = ?, zona = ?, cluster_id = coalesce(?, cluster_id), huella = ?, "
+                                "ultima_fecha = max(ultima_fecha, ?) WHERE id = ?",
+                                (*valores, huella, fecha, rowid))
+                    if previo[1] == huella:
+                        continue
+                    cur.execute("DELETE FROM textos WHERE rowid = ?", (rowid,))
+                cur.execute("INSERT INTO textos (rowid, titulo, descripcion) VALUES (?, ?, ?)",
+                            (rowid, analizar(titulo), analizar(descripcion)))
+                reindexados += 1
+        return reindexados
+
+    def agregar_frame(self, df, fecha: str) -> int:
+        return self.agregar(df.to_dict("records"), fecha) if not df.empty else 0
+
+    def optimizar(self):
+        """Fusiona los segmentos de FTS5 (tras un backfill grande)."""
+        with self.con:
+            self.con.execute("INSERT INTO textos(textos) VALUES ('optimize')")
+
+    # ─ consulta
+    def buscar(self, q: str, precio_min: Optional[float] = None, precio_max: Optional[float] = None,
+               zonas: Optional[Sequence[str]] = None, moneda: Optional[str] = "MXN",
+               limite: int = 20, por_cluster: bool = True) -> List[Dict[str, Any]]:
+        """Anuncios que casan con `q`, ordenados por relevancia (bm25) y filtrados."""
+        expr = consulta_fts(q)
+        if not expr:
+            return []
+        where, params = ["textos MATCH ?"], [expr]
+        if precio_min is not None:
+            where.append("a.precio_valor >= ?")
+            params.append(precio_min)
+        if precio_max is not None:
+            where.append("a.precio_valor <= ?")
+            params.append(precio_max)
+        if moneda and (precio_min is not None or precio_max is not None):
+            where.append("a.moneda = ?")
+            params.append(moneda)
+        if zonas:
+            where.append(f"a.zona IN ({','.join('?' * len(zonas))})")
+            params.extend(zonas)
+        # se piden de más para poder colapsar duplicados del mismo cluster
+        params.append(limite * 4 if por_cluster else limite)
+        sql = (f"SELECT a.listing_id, a.url, a.titulo, a.precio_valor, a.moneda, a.superficie_m2, a.zona, "
+               f"a.cluster_id, a.ultima_fecha, bm25(textos, {PESOS_BM25[0]}, {PESOS_BM25[1]}) AS score "
+               f"FROM textos JOIN anuncios a ON a.id = textos.rowid "
+               f"WHERE {' AND '.join(where)} ORDER BY score LIMIT ?")
+        cols = ("listing_id", "url", "titulo", "precio_valor", "moneda", "superficie_m2", "zona",
+                "cluster_id", "ultima_fecha", "score")
+        out: List[Dict[str, Any]] = []
+        vistos: set = set()
+        for fila in self.con.execute(sql, params):
+            d = dict(zip(cols, fila))
+            if por_cluster:
+                c = d["cluster_id"] or d["listing_id"]
+                if c in vistos:
+                    continue
+                vistos.add(c)
+            out.append(d)
+            if len(out) >= limite:
+                break
+        return out
+
+    COLUMNAS_EXPORTAR = ("listing_id", "url", "titulo", "precio_valor", "moneda", "superficie_m2", "zona",
+                         "cluster_id", "primera_fecha", "ultima_fecha")
+
+    def exportar(self, desde: Optional[str] = None, q: Optional[str] = None,
+                 precio_min: Optional[float] = None, precio_max: Optional[float] = None,
+                 zonas: Optional[Sequence[str]] = None) -> Iterable[Dict[str, Any]]:
+        """Inventario (último estado por anuncio) en streaming; `desde` filtra por `ultima_fecha`."""
+        where, params = [], []
+        if q:
+            expr = consulta_fts(q)
+            if not expr:
+                return
+            where.append("a.id IN (SELECT rowid FROM textos WHERE textos MATCH ?)")
+            params.append(expr)
+        for cond, v in (("a.ultima_fecha >= ?", desde), ("a.precio_valor >= ?", precio_min),
+                        ("a.precio_valor <= ?", precio_max)):
+            if v is not None:
+                where.append(cond)
+                params.append(v)
+        if zonas:
+            where.append(f"a.zona IN ({','.join('?' * len(zonas))})")
+            params.extend(zonas)
+        sql = (f"SELECT {', '.join('a.' + c for c in self.COLUMNAS_EXPORTAR)} FROM anuncios a "
+               f"{'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY a.id")
+        for fila in self.con.execute(sql, params):
+            yield dict(zip(self.COLUMNAS_EXPORTAR, fila))
+
+
+# ─────────────────────────── BENCH ──────────────────────────
+def _bench(n: int = 300_000):
+    import itertools, random, tempfile, time
+    rnd = random.Random(0)
+    # vocabulario tipo Zipf + frases de amenidad con frecuencias realistas
+    comunes = [f"pal{i}" for i in range(5000)]
+    acum = list(itertools.accumulate(1 / (i + 1) for i in range(len(comunes))))
+    frases = {"roof garden": 0.06, "pet friendly": 0.05, "alberca": 0.15, "gimnasio": 0.12,
+              "remodelada": 0.04, "vista panorámica": 0.03, "jardín": 0.10, "asador": 0.05,
+              "terraza": 0.10, "casa club": 0.02}
+    zonas = [f"{i}:{j}" for i in range(20) for j in range(20)]
+
+    def texto(m: int) -> str:
+        palabras = rnd.choices(comunes, cum_weights=acum, k=m)
+        palabras += [f for f, p in frases.items() if rnd.random() < p]
+        rnd.shuffle(palabras)
+        return " ".join(palabras)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        idx = IndiceTexto.abrir(tmp)
+        t_alta = 0.0
+        lote: List[Dict[str, Any]] = []
+        for k in range(n):
+            lote.append({"url": f"https://www.inmuebles24.com/propiedades/clasificado/d-{k}.html",
+                         "titulo": texto(6), "descripcion": texto(80),
+                         "precio_valor": float(rnd.randrange(800_000, 12_000_000, 1000)),
+                         "moneda": "MXN", "zona": rnd.choice(zonas)})
+            if len(lote) == 10_000 or k == n - 1:
+                t0 = time.perf_counter()
+                idx.agregar(lote, "2025-06-01")
+                t_alta += time.perf_counter() - t0
+                ultimo, lote = lote, []
+        t0 = time.perf_counter()
+        idx.optimizar()
+        t_alta += time.perf_counter() - t0
+        consultas = [("roof garden", {}), ('"pet friendly" alberca', {"precio_max": 3_000_000}),
+                     ("remodeladas", {"zonas": zonas[:5]}), ("jardin OR asador", {"precio_min": 5e6}),
+                     ("panoramica terraza gimnasio", {"precio_min": 2e6, "precio_max": 4e6, "zonas": zonas[:40]})]
+        print(f"{n:,} anuncios indexados en {t_alta:.1f}s ({n / t_alta:,.0f}/s)")
+        for q, filtros in consultas:
+            idx.buscar(q, **filtros)                        # calienta caché de páginas
+            t0 = time.perf_counter()
+            for _ in range(5):
+                res = idx.buscar(q, **filtros)
+            print(f"  {q!r:32} {filtros!s:50.50} {len(res):>3} res · {(time.perf_counter() - t0) / 5 * 1e3:7.1f} ms")
+        # re-crawl al día siguiente: sin cambios de texto → no se re-indexa
+        t0 = time.perf_counter()
+        r = idx.agregar(ultimo, "2025-06-02")
+        print(f"re-ingesta de {len(ultimo):,} sin cambios de texto: {r} re-indexados, "
+              f"{time.perf_counter() - t0:.2f}s")
+        idx.cerrar()
+
+
+# ─────────────────────────── MAIN ──────────────────────────
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    ap = argparse.ArgumentParser(description="Búsqueda de texto completo sobre el histórico de anuncios")
+    ap.add_argument("data_dir", nargs="?")
+    ap.add_argument("q", nargs="*", help="términos; frases entre comillas, OR / NOT")
+    ap.add_argument("--min", type=float, dest="precio_min")
+    ap.add_argument("--max", type=float, dest="precio_max")
+    ap.add_argument("--zona", action="append", help="zona de estadisticas.py (repetible)")
+    ap.add_argument("--limite", type=int, default=20)
+    ap.add_argument("--reindexar", action="store_true", help="recorre <data_dir>/<fecha>/*.csv")
+    ap.add_argument("--bench", action="store_true")
+    args = ap.parse_args()
+
+    if args.bench:
+        _bench()
+    elif args.data_dir and args.reindexar:
+        import pandas as pd
+        from diff_snapshots import DERIVADOS
+        from normalizar import normalizar_frame
+        idx = IndiceTexto.abrir(args.data_dir)
+        for dia in sorted(p for p in Path(args.data_dir).iterdir() if p.is_dir()):
+            for csv in sorted(dia.glob("*.csv")):
+                if csv.name in DERIVADOS:
+                    continue
+                df = pd.read_csv(csv)
+                if not ({"url", "url_fuente"} & set(df.columns)) or not ({"titulo", "descripcion", "nombre"} & set(df.columns)):
+                    continue
+                n = idx.agregar_frame(df if "precio_valor" in df else normalizar_frame(df), dia.name)
+                print(f"{csv}: {n} textos indexados")
+        idx.optimizar()
+        print(f"{len(idx):,} anuncios en {idx.path}")
+    elif args.data_dir and args.q:
+        idx = IndiceTexto.abrir(args.data_dir)
+        for r in idx.buscar(consulta_de_argumentos(args.q), args.precio_min, args.precio_max, args.zona, limite=args.limite):
+            precio = f"{r['precio_valor']:,.0f}" if r["precio_valor"] else "-"
+            print(f"{r['score']:8.2f}  {precio:>14}  {r['zona'] or '-':>10}  {(r['titulo'] or '')[:60]:60}  {r['url']}")
+    else:
+        ap.print_help()
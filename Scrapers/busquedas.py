@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Definición de búsquedas (sitio, ciudad, tipo de propiedad, operación).
+
+Sustituye a los `CITY_SLUG = "zapopan"` / `departamentos-en-venta` fijos en
+cada script. Un archivo JSON describe la matriz de trabajos:
+
+    {
+      "paginas": 5,
+      "matriz": {"ciudades": ["guadalajara", "zapopan"],
+                 "tipos": ["departamentos", "casas", "terrenos"],
+                 "operaciones": ["venta"]},
+      "busquedas": [{"ciudad": "tlaquepaque", "tipo": "casas", "operacion": "renta", "paginas": 2}]
+    }
+
+`matriz` se expande al producto cartesiano; `busquedas` añade casos sueltos.
+Cada búsqueda sabe construir sus URLs de listado y el nombre del CSV de
+listados que escribe 1.1 y lee 1.2 (`inmuebles24-<ciudad>-<tipo>-<operacion>.csv`).
+
+    python busquedas.py busquedas.json          # lista los trabajos
+"""
+
+from __future__ import annotations
+import itertools, json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from urllib.parse import urlparse
+
+SITIOS = {"inmuebles24": "https://www.inmuebles24.com"}
+PAGINAS = 3
+
+
+@dataclass(frozen=True)
+class Busqueda:
+    ciudad: str
+    tipo: str = "departamentos"
+    operacion: str = "venta"
+    sitio: str = "inmuebles24"
+    paginas: int = PAGINAS
+
+    @property
+    def slug(self) -> str:
+        return f"{self.ciudad}-{self.tipo}-{self.operacion}"
+
+    @property
+    def archivo_listado(self) -> str:
+        return f"{self.sitio}-{self.slug}.csv"
+
+    def base(self, base_url: Optional[str] = None) -> str:
+        return (base_url or SITIOS[self.sitio]).rstrip("/")
+
+    def host(self, base_url: Optional[str] = None) -> str:
+        return urlparse(self.base(base_url)).netloc
+
+    def url_listado(self, pagina: int, base_url: Optional[str] = None) -> str:
+        return f"{self.base(base_url)}/{self.tipo}-en-{self.operacion}-en-{self.ciudad}-pagina-{pagina}.html"
+
+
+def expandir(cfg: Dict[str, Any]) -> List[Busqueda]:
+    """Config (dict del JSON) → búsquedas sin repetir, en orden estable."""
+    paginas = int(cfg.get("paginas", PAGINAS))
+    sitio = cfg.get("sitio", "inmuebles24")
+    out: Dict[Busqueda, None] = {}
+    m = cfg.get("matriz")
+    if m:
+        for ciudad, tipo, op in itertools.product(m.get("ciudades", []), m.get("tipos", ["departamentos"]),
+                                                  m.get("operaciones", ["venta"])):
+            out[Busqueda(ciudad, tipo, op, m.get("sitio", sitio), paginas)] = None
+    for b in cfg.get("busquedas", []):
+        out[Busqueda(b["ciudad"], b.get("tipo", "departamentos"), b.get("operacion", "venta"),
+                     b.get("sitio", sitio), int(b.get("paginas", paginas)))] = None
+    for b in out:
+        if b.sitio not in SITIOS:
+            raise ValueError(f"sitio desconocido: {b.sitio!r} (conocidos: {', '.join(SITIOS)})")
+    return list(out)
+
+
+def cargar_busquedas(path: Union[str, Path]) -> List[Busqueda]:
+    return expandir(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def ultimo_listado(data_dir: Union[str, Path], busqueda: Busqueda) -> Optional[Path]:
+    """CSV de listados más reciente de la búsqueda (`<data_dir>/<fecha>/<archivo_listado>`)."""
+    candidatos = sorted(Path(data_dir).glob(f"*/{busqueda.archivo_listado}"))
+    return candidatos[-1] if candidatos else None
+
+
+# ─ argumentos comunes de los scripts
+def agregar_argumentos(ap, ciudad: str = "zapopan", tipo: str = "departamentos", operacion: str = "venta"):
+    ap.add_argument("--ciudad", default=ciudad, help=f"slug de ciudad (def. {ciudad})")
+    ap.add_argument("--tipo", default=tipo, help="departamentos | casas | terrenos | …")
+    ap.add_argument("--operacion", default=operacion, help="venta | renta")
+
+
+def de_argumentos(args, paginas: int = PAGINAS) -> Busqueda:
+    return Busqueda(args.ciudad, args.tipo, args.operacion, paginas=paginas)
+
+
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    ap = argparse.ArgumentParser(description="Expande un archivo de búsquedas")
+    ap.add_argument("archivo")
+    args = ap.parse_args()
+    for b in cargar_busquedas(args.archivo):
+        print(f"{b.slug:40} {b.paginas:>3} págs  {b.url_listado(1)}")
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Canario de selectores: valida los extractores sobre una muestra antes de
+lanzar el crawl completo, y vigila la tasa de llenado mientras corre.
+
+Cuando Inmuebles24 cambia su markup, los scripts no fallan: siguen visitando
+cientos de URLs y guardan filas vacías (o agotan cada WebDriverWait). Aquí:
+
+• Los selectores viven como datos (`SELECTORES`): un juego "principal" con
+  las clases actuales y uno de "respaldo" anclado en data-qa, ids, etiquetas
+  y `[class*=…]`, que sobrevive a los renombres de clases CSS.
+• `verificar(listados, detalles)` extrae una muestra de HTML con cada juego
+  y compara la tasa de llenado por campo contra la línea base guardada en
+  `<data>/canario_base.json` (`--calibrar`); devuelve el primer juego que
+  pasa o lanza `CanarioFallido` si ninguno lo hace (`MuestraInsuficiente`
+  si ni siquiera hubo HTML que revisar).
+• `MonitorLlenado` lleva la tasa de llenado en una ventana móvil de los
+  últimos registros y lanza `ExtraccionDegradada` en cuanto un campo cae por
+  debajo de la base, para detener el crawl en vez de llenar el CSV de vacíos.
+
+Un campo falla si su tasa < base × (1 − TOLERANCIA); sólo cuentan los campos
+con base ≥ MIN_BASE (los opcionales no disparan nada).
+
+    python canario.py data --calibrar --base-url http://127.0.0.1:8024   # guarda la base
+    python canario.py data --base-url http://127.0.0.1:8024              # sólo verifica
+    python canario.py --demo                                             # contra servidor_local
+"""
+
+from __future__ import annotations
+import datetime as dt, json
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from bs4 import BeautifulSoup
+
+ARCHIVO_BASE = "canario_base.json"
+TOLERANCIA = 0.3          # caída relativa admitida frente a la base
+MIN_BASE = 0.2            # campos con base menor se consideran opcionales
+VENTANA = 40              # registros en la ventana móvil del monitor
+MINIMO = 15               # registros antes de que el monitor opine
+MUESTRA_MIN = {"listado": 1, "detalle": 2}   # páginas de HTML por tipo para calibrar o verificar
+
+# ───────────────────── juegos de selectores ─────────────────────
+# "css" → texto del nodo; "css@attr" → atributo.  `_tarjeta` delimita cada card.
+# Los nombres de detalle siguen a PropertyRecord salvo `subtitulo` (tipo · m² ·
+# rec. · estac., lo desglosa cada script) y `pestanas` (sólo indica presencia).
+SELECTORES: Dict[str, Dict[str, Dict[str, str]]] = {
+    "principal": {
+        "listado": {
+            "_tarjeta": "div.postingCardLayout-module__posting-card-layout",
+            "url": "h3[data-qa='POSTING_CARD_DESCRIPTION'] a@href",
+            "precio": "div[data-qa='POSTING_CARD_PRICE']",
+            "direccion": "div.postingLocations-module__location-address",
+            "ubicacion": "h2[data-qa='POSTING_CARD_LOCATION']",
+            "features": "h3[data-qa='POSTING_CARD_FEATURES']",
+        },
+        "detalle": {
+            "titulo": "h1.title-property",
+            "subtitulo": "h2.title-type-sup-property",
+            "precio": "div.price-container-property div.price-value span",
+            "direccion": "div.section-location-property h4",
+            "ubicacion_url": "div.static-map-container img#static-map@src",
+            "descripcion": "section.article-section-description #longDescription",
+            "anunciante": "h3[data-qa='linkMicrositioAnunciante']",
+            "codigo_anunciante": "#reactPublisherCodes li",
+            "pestanas": "#reactGeneralFeatures button[role='tab']",
+        },
+    },
+    "respaldo": {
+        "listado": {
+            "_tarjeta": "div:has(> h3[data-qa='POSTING_CARD_DESCRIPTION'])",
+            "url": "[data-qa='POSTING_CARD_DESCRIPTION'] a@href",
+            "precio": "[data-qa='POSTING_CARD_PRICE']",
+            "direccion": "[class*='ocation']",
+            "ubicacion": "[data-qa='POSTING_CARD_LOCATION']",
+            "features": "[data-qa='POSTING_CARD_FEATURES']",
+        },
+        "detalle": {
+            "titulo": "h1",
+            "subtitulo": "h1 ~ h2",
+            "precio": "[class*='price'] span",
+            "direccion": "[class*='location'] h4",
+            "ubicacion_url": "img[src*='staticmap']@src",
+            "descripcion": "#longDescription",
+            "anunciante": "[data-qa='linkMicrositioAnunciante']",
+            "codigo_anunciante": "#reactPublisherCodes li",
+            "pestanas": "[role='tab']",
+        },
+    },
+}
+
+# base por defecto mientras no se calibre (los campos que no pueden faltar)
+LINEA_BASE: Dict[str, Dict[str, float]] = {
+    "listado": {"url": 1.0, "precio": 0.9, "ubicacion": 0.9},
+    "detalle": {"titulo": 1.0, "precio": 0.9, "direccion": 0.9, "descripcion": 0.9},
+}
+
+
+class CanarioFallido(RuntimeError):
+    """Ningún juego de selectores alcanza la línea base sobre la muestra."""
+
+
+class MuestraInsuficiente(CanarioFallido):
+    """No hubo HTML suficiente (listado bloqueado, timeouts…) para juzgar los selectores."""
+
+
+class ExtraccionDegradada(RuntimeError):
+    """La tasa de llenado móvil de un campo cayó por debajo de la base."""
+
+    def __init__(self, campo: str, tasa: float, base: float):
+        super().__init__(f"campo {campo!r}: llenado {tasa:.0%} en los últimos registros (base {base:.0%})")
+        self.campo, self.tasa, self.base = campo, tasa, base
+
+
+# ───────────────────── extracción genérica ─────────────────────
+def _valor(nodo, css: str) -> str:
+    css, _, attr = css.partition("@")
+    el = nodo.select_one(css) if css else nodo
+    if el is None:
+        return ""
+    return str(el.get(attr) or "").strip() if attr else el.get_text(" ", strip=True)
+
+
+def _campos(conjunto: str, tipo: str) -> Dict[str, str]:
+    return {c: css for c, css in SELECTORES[conjunto][tipo].items() if not c.startswith("_")}
+
+
+def extraer_listado(html: str, conjunto: str = "principal") -> List[Dict[str, str]]:
+    """Una fila por card del listado (url relativa tal cual viene en el href)."""
+    sel = SELECTORES[conjunto]["listado"]
+    soup = BeautifulSoup(html, "html.parser")
+    campos = _campos(conjunto, "listado")
+    return [{c: _valor(card, css) for c, css in campos.items()} for card in soup.select(sel["_tarjeta"])]
+
+
+def extraer_detalle(html: str, conjunto: str = "principal") -> Dict[str, str]:
+    soup = BeautifulSoup(html, "html.parser")
+    return {c: _valor(soup, css) for c, css in _campos(conjunto, "detalle").items()}
+
+
+def tasas_llenado(registros: Sequence[Optional[Dict[str, str]]], campos: Iterable[str]) -> Dict[str, float]:
+    """Fracción de registros con cada campo no vacío; `None` cuenta como registro vacío."""
+    campos = list(campos)
+    if not registros:
+        return {c: 0.0 for c in campos}
+    return {c: sum(1 for r in registros if r and r.get(c)) / len(registros) for c in campos}
+
+
+def _muestra_listado(htmls: Sequence[str], conjunto: str) -> List[Optional[Dict[str, str]]]:
+    filas: List[Optional[Dict[str, str]]] = []
+    for html in htmls:
+        cards = extraer_listado(html, conjunto)
+        filas.extend(cards or [None])      # página sin cards = un registro vacío
+    return filas
+
+
+# ───────────────────── línea base ─────────────────────
+def cargar_base(data_dir: Union[str, Path, None]) -> Dict[str, Dict[str, float]]:
+    p = Path(data_dir) / ARCHIVO_BASE if data_dir else None
+    if p and p.exists():
+        return json.loads(p.read_text(encoding="utf-8"))["tasas"]
+    return LINEA_BASE
+
+
+def _exigir_muestra(listados: Sequence[str], detalles: Sequence[str], tipos: Sequence[str]):
+    n = {"listado": len(listados), "detalle": len(detalles)}
+    cortos = [f"{t} {n[t]}/{MUESTRA_MIN[t]}" for t in tipos if n[t] < MUESTRA_MIN[t]]
+    if cortos:
+        raise MuestraInsuficiente("muestra insuficiente: " + ", ".join(cortos))
+
+
+def calibrar(data_dir: Union[str, Path], listados: Sequence[str], detalles: Sequence[str],
+             conjunto: str = "principal") -> Dict[str, Dict[str, float]]:
+    """Mide la tasa de llenado de una muestra sana y la guarda como base.
+
+    Sin muestra suficiente lanza `MuestraInsuficiente` antes de escribir: una
+    base en ceros apagaría para siempre el canario y `MonitorLlenado`.
+    """
+    _exigir_muestra(listados, detalles, ("listado", "detalle"))
+    tasas = {
+        "listado": tasas_llenado(_muestra_listado(listados, conjunto), _campos(conjunto, "listado")),
+        "detalle": tasas_llenado([extraer_detalle(h, conjunto) for h in detalles], _campos(conjunto, "detalle")),
+    }
+    p = Path(data_dir) / ARCHIVO_BASE
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(json.dumps({"fecha": dt.date.today().isoformat(), "conjunto": conjunto,
+                             "muestra": {"listado": len(listados), "detalle": len(detalles)},
+                             "tasas": tasas}, ensure_ascii=False, indent=1), encoding="utf-8")
+    return tasas
+
+
+def _fallidos(tasas: Dict[str, float], base: Dict[str, float], tolerancia: float) -> List[Tuple[str, float, float]]:
+    return [(c, tasas.get(c, 0.0), b) for c, b in base.items()
+            if b >= MIN_BASE and tasas.get(c, 0.0) < b * (1 - tolerancia)]
+
+
+# ───────────────────── canario ─────────────────────
+@dataclass
+class Veredicto:
+    conjunto: Optional[str]                           # juego elegido (None = ninguno pasa)
+    tasas: Dict[str, Dict[str, Dict[str, float]]] = field(default_factory=dict)   # conjunto → tipo → campo
+    fallidos: Dict[str, List[Tuple[str, str, float, float]]] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.conjunto is not None
+
+    def resumen(self) -> str:
+        lineas = []
+        for conj, fallos in self.fallidos.items():
+            estado = "ok" if not fallos else ", ".join(f"{t}.{c} {v:.0%}<{b:.0%}" for t, c, v, b in fallos)
+            lineas.append(f"{conj}: {estado}")
+        return " | ".join(lineas)
+
+
+def verificar(listados: Sequence[str], detalles: Sequence[str],
+              base: Optional[Dict[str, Dict[str, float]]] = None,
+              conjuntos: Sequence[str] = ("principal", "respaldo"),
+              tolerancia: float = TOLERANCIA, abortar: bool = True,
+              tipos: Sequence[str] = ("listado", "detalle")) -> Veredicto:
+    """Prueba cada juego de selectores sobre la muestra de HTML y elige el primero que pasa.
+
+    Cada tipo de `tipos` necesita `MUESTRA_MIN` páginas o se lanza
+    `MuestraInsuficiente` (aun con `abortar=False`): un listado bloqueado o
+    con timeout es justo el caso que el canario debe detener.  Para revisar
+    sólo detalles, pasar `tipos=("detalle",)`.
+    """
+    _exigir_muestra(listados, detalles, tipos)
+    base = base or LINEA_BASE
+    ver = Veredicto(None)
+    for conj in conjuntos:
+        tasas: Dict[str, Dict[str, float]] = {}
+        fallos: List[Tuple[str, str, float, float]] = []
+        for tipo in tipos:
+            regs = (_muestra_listado(listados, conj) if tipo == "listado"
+                    else [extraer_detalle(h, conj) for h in detalles])
+            tasas[tipo] = tasas_llenado(regs, _campos(conj, tipo))
+            fallos += [(tipo, c, v, b) for c, v, b in _fallidos(tasas[tipo], base.get(tipo, {}), tolerancia)]
+        ver.tasas[conj], ver.fallidos[conj] = tasas, fallos
+        if not fallos:
+            ver.conjunto = conj
+            break
+    if abortar and not ver.ok:
+        raise CanarioFallido("selectores sin llenado suficiente → " + ver.resumen())
+    return ver
+
+
+def muestrear(fetch: Callable[[str], Optional[str]], urls_listado: Sequence[str], n_detalles: int = 5,
+              base_url: str = "https://www.inmuebles24.com") -> Tuple[List[str], List[str]]:
+    """Baja unas páginas de listado y los primeros `n_detalles` anuncios que aparezcan en ellas.
+
+    Las URLs de detalle se toman con cualquiera de los juegos, para que un
+    rediseño del listado no deje también sin muestra de detalles.
+    """
+    listados = [h for h in (fetch(u) for u in urls_listado) if h]
+    hrefs: Dict[str, None] = {}
+    for html in listados:
+        for conj in SELECTORES:
+            for fila in extraer_listado(html, conj):
+                if fila.get("url"):
+                    hrefs[fila["url"]] = None
+    urls = [h if h.startswith("http") else base_url.rstrip("/") + h for h in hrefs][:n_detalles]
+    detalles = [h for h in (fetch(u) for u in urls) if h]
+    return listados, detalles
+
+
+# ───────────────────── monitor durante el crawl ─────────────────────
+class MonitorLlenado:
+    """Tasa de llenado por campo sobre los últimos `ventana` registros.
+
+    `observar(None)` registra un fallo de extracción (timeout, excepción):
+    cuenta como registro vacío.  `campos` limita la vigilancia a los que el
+    script realmente guarda.
+    """
+
+    def __init__(self, base: Dict[str, float], ventana: int = VENTANA, minimo: int = MINIMO,
+                 tolerancia: float = TOLERANCIA, campos: Optional[Iterable[str]] = None):
+        campos = set(campos) if campos is not None else set(base)
+        self.base = {c: b for c, b in base.items() if b >= MIN_BASE and c in campos}
+        self.umbral = {c: b * (1 - tolerancia) for c, b in self.base.items()}
+        self.minimo = min(minimo, ventana)
+        self._ventana: deque = deque(maxlen=ventana)
+        self._llenos = dict.fromkeys(self.base, 0)
+        self.vistos = 0
+
+    def tasas(self) -> Dict[str, float]:
+        n = len(self._ventana) or 1
+        return {c: k / n for c, k in self._llenos.items()}
+
+    def observar(self, registro: Optional[Dict[str, object]]) -> None:
+        llenos = frozenset(c for c in self.base if registro and registro.get(c))
+        if len(self._ventana) == self._ventana.maxlen:
+            for c in self._ventana[0]:
+                self._llenos[c] -= 1
+        self._ventana.append(llenos)
+        for c in llenos:
+            self._llenos[c] += 1
+        self.vistos += 1
+        if len(self._ventana) < self.minimo:
+            return
+        n = len(self._ventana)
+        for c, k in self._llenos.items():
+            if k / n < self.umbral[c]:
+                raise ExtraccionDegradada(c, k / n, self.base[c])
+
+
+# ───────────────────── CLI / demo ─────────────────────
+def _fetch_http(timeout: float = 20) -> Callable[[str], Optional[str]]:
+    from fetch_http import fetch
+    def f(url: str) -> Optional[str]:
+        r = fetch(url, timeout=timeout)
+        return r.html if r.ok else None
+    return f
+
+
+def _demo() -> None:
+    import time
+    from busquedas import Busqueda
+    from servidor_local import SitioSimulado, servidor_local
+
+    b = Busqueda("zapopan", paginas=2)
+    sitio = SitioSimulado(paginas=5)
+    fetch = _fetch_http()
+    with servidor_local(sitio) as base_url:
+        lst, det = muestrear(fetch, [b.url_listado(p, base_url) for p in (1, 2)], 6, base_url)
+        import tempfile
+        tmp = Path(tempfile.mkdtemp())
+        base = calibrar(tmp, lst, det)
+        print(f"base calibrada con {len(lst)} listados y {len(det)} detalles → {tmp / ARCHIVO_BASE}")
+
+        for variante in ("actual", "rediseno", "roto"):
+            sitio.variante = variante
+            t0 = time.perf_counter()
+            lst, det = muestrear(fetch, [b.url_listado(p, base_url) for p in (1, 2)], 6, base_url)
+            try:
+                v = verificar(lst, det, base)
+                print(f"{variante:9} → usa {v.conjunto!r:12} ({time.perf_counter() - t0:.2f} s)  [{v.resumen()}]")
+            except CanarioFallido as e:
+                print(f"{variante:9} → ABORTA  ({time.perf_counter() - t0:.2f} s)  {e}")
+
+        # el sitio cambia a mitad de crawl: el monitor corta a los pocos registros
+        sitio.variante = "actual"
+        mon = MonitorLlenado(base["detalle"])
+        for i in range(200):
+            if i == 60:
+                sitio.variante = "roto"
+            html = fetch(f"{base_url}/propiedades/clasificado/veclapin-depto-{900_000 + i}.html")
+            try:
+                mon.observar(extraer_detalle(html, "principal") if html else None)
+            except ExtraccionDegradada as e:
+                print(f"monitor: cambio en el registro 60, crawl detenido en el {mon.vistos} → {e}")
+                break
+        else:
+            print("monitor: no detectó el cambio")
+
+
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    ap = argparse.ArgumentParser(description="Canario de selectores de Inmuebles24")
+    ap.add_argument("data", nargs="?", default=str(Path(__file__).resolve().parent / "data"),
+                    help="carpeta donde vive canario_base.json")
+    ap.add_argument("--calibrar", action="store_true", help="guarda la muestra actual como línea base")
+    ap.add_argument("--base-url", default=None, help="otro host (p. ej. servidor_local)")
+    ap.add_argument("--ciudad", default="zapopan")
+    ap.add_argument("--detalles", type=int, default=5, help="anuncios a muestrear")
+    ap.add_argument("--demo", action="store_true", help="rediseño y rotura simulados en servidor_local")
+    args = ap.parse_args()
+
+    if args.demo:
+        _demo()
+        raise SystemExit(0)
+
+    from busquedas import Busqueda, SITIOS
+    b = Busqueda(args.ciudad)
+    base_url = args.base_url or SITIOS[b.sitio]
+    lst, det = muestrear(_fetch_http(), [b.url_listado(p, base_url) for p in (1, 2)], args.detalles, base_url)
+    try:
+        if args.calibrar:
+            print(json.dumps(calibrar(args.data, lst, det), ensure_ascii=False, indent=1))
+        else:
+            print("✔︎", verificar(lst, det, cargar_base(args.data)).resumen())
+    except CanarioFallido as e:
+        raise SystemExit(f"✖︎ {e}")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Almacén en formato largo para las pestañas de #reactGeneralFeatures.
+
+En vez de una columna por etiqueta de pestaña (CSV anchos y casi vacíos),
+cada característica es una fila  (listing_id, grupo, feature)  con grupo y
+feature codificados como enteros contra un diccionario común:
+
+    <DATA_DIR>/diccionario_features.csv     id,texto           (sólo crece; id = hash del texto)
+    <DATA_DIR>/<fecha>/tab_features.csv     listing_id,grupo,feature
+
+La vista ancha de siempre (una columna por pestaña con "; ".join) se
+reconstruye bajo demanda con `FeatureStore.vista_ancha()`.
+
+    python caracteristicas.py data/inmuebles24 --ancho 2025-06-01
+"""
+
+from __future__ import annotations
+import csv, datetime as dt, hashlib, re, threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+SEP = "; "
+ARCHIVO_DIC   = "diccionario_features.csv"
+ARCHIVO_TABS  = "tab_features.csv"
+
+Tabs = Dict[str, Union[List[str], str]]
+
+
+def clean_label(label: str) -> str:
+    """Misma normalización que usaban las columnas anchas (`clean_button_text`)."""
+    label = re.sub(r"^tab_", "", label.strip().lower())
+    return re.sub(r"[^a-z0-9_]+", "", label.replace(" ", "_"))
+
+
+def split_features(valor: Union[List[str], str, None]) -> List[str]:
+    if not valor or not isinstance(valor, (str, list, tuple)):
+        return []                               # NaN de CSVs antiguos, None…
+    items = valor.split(";") if isinstance(valor, str) else valor
+    return [t for t in (re.sub(r"\s+", " ", x).strip() for x in items) if t]
+
+
+# ───────────────────── diccionario ─────────────────────
+def id_texto(texto: str) -> int:
+    """Id estable de un texto (48 bits de blake2b): igual en todos los procesos."""
+    return int.from_bytes(hashlib.blake2b(texto.encode("utf-8"), digest_size=6).digest(), "big")
+
+
+class Diccionario:
+    """Texto ↔ entero, persistido como CSV de sólo-añadir.
+
+    Los textos nuevos toman `id_texto(texto)`, no un contador: dos procesos
+    que agregan al mismo archivo asignan el mismo id a la misma etiqueta y
+    nunca el mismo id a etiquetas distintas.  Los ids secuenciales de
+    diccionarios anteriores se respetan tal como están en el archivo.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.ids: Dict[str, int] = {}
+        self.textos: Dict[int, str] = {}
+        self._nuevos: List[Tuple[int, str]] = []
+        self._cargar()
+
+    def _cargar(self):
+        if not self.path.exists():
+            return
+        with self.path.open(encoding="utf-8", newline="") as fh:
+            for fila in csv.DictReader(fh):
+                if fila["id"] == "id":                  # encabezado repetido por dos creadores a la vez
+                    continue
+                self.ids.setdefault(fila["texto"], int(fila["id"]))
+                self.textos[int(fila["id"])] = fila["texto"]
+
+    def id(self, texto: str) -> int:
+        i = self.ids.get(texto)
+        if i is None:
+            i = self.ids[texto] = id_texto(texto)
+            self.textos[i] = texto
+            self._nuevos.append((i, texto))
+        return i
+
+    def texto(self, i: int) -> str:
+        if i not in self.textos:                        # lo agregó otro proceso después de abrir
+            self._cargar()
+        return self.textos[i]
+
+    def flush(self):
+        if not self._nuevos:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8", newline="") as fh:
+            w = csv.writer(fh)
+            if fh.tell() == 0:
+                w.writerow(["id", "texto"])
+            w.writerows(self._nuevos)
+        self._nuevos.clear()
+
+
+# ───────────────────── almacén ─────────────────────
+class FeatureStore:
+    def __init__(self, base_dir: Union[str, Path]):
+        self.base = Path(base_dir)
+        self.dic = Diccionario(self.base / ARCHIVO_DIC)
+        self._buf: List[Tuple[str, int, int]] = []
+        self._lock = threading.Lock()
+
+    def agregar(self, lid: str, tabs: Optional[Tabs]) -> int:
+        """Encola las características de un anuncio; devuelve cuántas filas añadió."""
+        if not tabs:
+            return 0
+        n = 0
+        with self._lock:
+            for grupo, valor in tabs.items():
+                g = self.dic.id(clean_label(grupo))
+                for feat in dict.fromkeys(split_features(valor)):
+                    self._buf.append((lid, g, self.dic.id(feat)))
+                    n += 1
+        return n
+
+    def flush(self, fecha: Optional[str] = None) -> Optional[Path]:
+        """Añade lo encolado a `<fecha>/tab_features.csv` (el diccionario va primero)."""
+        with self._lock:
+            if not self._buf:
+                return None
+            self.dic.flush()
+            out = self.base / (fecha or dt.date.today().isoformat()) / ARCHIVO_TABS
+            out.parent.mkdir(parents=True, exist_ok=True)
+            nuevo = not out.exists()
+            with out.open("a", encoding="utf-8", newline="") as fh:
+                w = csv.writer(fh)
+                if nuevo:
+                    w.writerow(["listing_id", "grupo", "feature"])
+                w.writerows(self._buf)
+            self._buf.clear()
+            return out
+
+    # ─ lectura
+    def fechas(self) -> List[str]:
+        return sorted(p.parent.name for p in self.base.glob(f"*/{ARCHIVO_TABS}"))
+
+    def filas(self, fechas: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, str, int, int]]:
+        """(fecha, listing_id, grupo_id, feature_id) de las particiones pedidas."""
+        for f in (fechas or self.fechas()):
+            path = self.base / f / ARCHIVO_TABS
+            if not path.exists():
+                continue
+            with path.open(encoding="utf-8", newline="") as fh:
+                lector = csv.reader(fh)
+                next(lector, None)
+                for lid, g, feat in lector:
+                    yield f, lid, int(g), int(feat)
+
+    def features_de(self, fechas: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, List[str]]]:
+        """{listing_id: {grupo: [features]}} decodificado (el último día gana)."""
+        out: Dict[str, Dict[str, Dict[str, None]]] = {}
+        visto: Dict[str, str] = {}
+        for fecha, lid, g, feat in self.filas(fechas):
+            if visto.get(lid) != fecha:         # nueva captura del anuncio → reemplaza
+                out[lid], visto[lid] = {}, fecha
+            out[lid].setdefault(self.dic.texto(g), {})[self.dic.texto(feat)] = None
+        return {lid: {g: list(fs) for g, fs in grupos.items()} for lid, grupos in out.items()}
+
+    def vista_ancha(self, fechas: Optional[Iterable[str]] = None, prefijo: str = ""):
+        """DataFrame ancho listing_id × grupo con las features unidas por "; "."""
+        import pandas as pd
+        filas = [
+            {"listing_id": lid, **{prefijo + g: SEP.join(fs) for g, fs in grupos.items()}}
+            for lid, grupos in self.features_de(fechas).items()
+        ]
+        return pd.DataFrame(filas)
+
+
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    ap = argparse.ArgumentParser(description="Características de pestañas en formato largo")
+    ap.add_argument("data_dir", help="directorio base (p. ej. data/inmuebles24)")
+    ap.add_argument("--ancho", nargs="*", metavar="FECHA",
+                    help="imprime la vista ancha de esas fechas (todas si se omite)")
+    args = ap.parse_args()
+    store = FeatureStore(args.data_dir)
+    if args.ancho is not None:
+        print(store.vista_ancha(args.ancho or None).to_string(max_rows=50))
+    else:
+        n = sum(1 for _ in store.filas())
+        print(f"{len(store.fechas())} días, {n:,} filas, {len(store.dic.textos):,} textos distintos")
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Consolidación del histórico `data/<fecha>/*.csv` de los cinco scrapers en un
+solo almacén con esquema canónico.
+
+• Descubre los CSV por nombre (ver FUENTES) bajo una o varias raíces y los
+  mapea a las columnas de `PropertyRecord` (+ listing_id, fecha, fuente):
+  url_fuente → url, nombre → titulo, habitaciones → recamaras, …
+• Columnas anchas de pestañas de CSV antiguos (`tab_amenidades`,
+  `caracteristicas_generales`, …) → formato largo en `tab_features.csv`.
+• Columnas derivadas (precio_valor, deal_score, cluster_id…) se descartan:
+  se recalculan al ingerir.
+• listing_id sale de la url o, si no la hay (1.2 no la guardaba), de
+  `codigo_inmuebles24`.  Las filas sin ninguno de los dos y las líneas que
+  el CSV no deja leer se descartan y se reportan (stderr y manifiesto).
+• Cada archivo se lee en trozos (`--chunk` filas) en un proceso del pool; el
+  proceso principal ingiere los resultados en orden cronológico (duplicados,
+  estadísticas por zona y búsqueda dependen del orden de llegada).
+• Idempotente: `manifiesto_consolidacion.jsonl` registra ruta, tamaño y mtime
+  de cada archivo procesado; volver a correr sólo toma archivos nuevos o
+  modificados.
+
+Salida (un data_dir más, usable por diff_snapshots, busqueda, amenidades…):
+
+    <salida>/<fecha>/detalles-<fuente>-<h>.csv     esquema canónico
+    <salida>/<fecha>/listings-<fuente>-<h>.csv
+    <salida>/<fecha>/tab_features.csv
+    <salida>/manifiesto_consolidacion.jsonl
+
+    python consolidar.py data Scrapers/data --salida data/consolidado
+    python consolidar.py --demo
+"""
+
+from __future__ import annotations
+import csv, hashlib, json, os, re, sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from caracteristicas import FeatureStore, clean_label, split_features
+from registros import PropertyRecord, listing_id
+
+ARCHIVO_MANIFIESTO = "manifiesto_consolidacion.jsonl"
+CHUNK              = 20_000
+
+# (fuente, patrón del nombre de archivo, tipo de registro)
+FUENTES: Tuple[Tuple[str, "re.Pattern[str]", str], ...] = (
+    ("scrap_inmuebles", re.compile(r"^inmuebles24-.+\.csv$"),              "listado"),
+    ("inmuebles24_unico", re.compile(r"^inmuebles24_.+_detalle\.csv$"),    "detalle"),
+    ("reporte_detallado", re.compile(r"^reporte_detallado_.+\.csv$"),      "detalle"),
+    ("o3_listings", re.compile(r"^listings_.+\.csv$"),                     "listado"),
+    ("o3_detalles", re.compile(r"^detalles_completos\.csv$"),              "detalle"),
+)
+
+# nombres históricos → columna canónica
+MAPEO = {
+    "url_fuente": "url",
+    "nombre": "titulo",
+    "ubicacion": "direccion",
+    "tipo": "operacion",
+    "habitaciones": "recamaras",
+    "baños": "banos_icon",
+}
+# columnas que añaden normalizar / estadisticas / duplicados: se recalculan
+DERIVADAS = {"precio_valor", "moneda", "superficie_m2", "recamaras_n", "lat", "lon", "zona",
+             "precio_m2", "deal_score", "ref_mediana_m2", "ref_p25_m2", "bajo_p25", "ref_n",
+             "ref_nivel", "cluster_id", "listing_id", "fecha", "fuente",
+             "pagina"}                          # nº de página de listado (planificador.py)
+CANONICO = ("listing_id", "fecha", "fuente") + PropertyRecord.CAMPOS
+URL_CODIGO = "https://www.inmuebles24.com/propiedades/clasificado/inmueble-{}.html"
+
+_RE_FECHA = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+csv.field_size_limit(sys.maxsize)
+
+
+@dataclass(frozen=True)
+class Archivo:
+    ruta: str
+    fuente: str
+    tipo: str
+    fecha: str
+    tamano: int
+    mtime_ns: int
+
+    @property
+    def clave(self) -> str:
+        return f"{self.ruta}|{self.tamano}|{self.mtime_ns}"
+
+    def salida(self, destino: Path) -> Path:
+        h = hashlib.blake2b(self.ruta.encode(), digest_size=4).hexdigest()
+        prefijo = "detalles" if self.tipo == "detalle" else "listings"
+        return destino / self.fecha / f"{prefijo}-{self.fuente}-{h}.csv"
+
+
+# ───────────────────── descubrimiento ─────────────────────
+def clasificar(nombre: str) -> Optional[Tuple[str, str]]:
+    for fuente, patron, tipo in FUENTES:
+        if patron.match(nombre):
+            return fuente, tipo
+    return None
+
+
+def descubrir(raices: Sequence[Union[str, Path]], excluir: Optional[Path] = None) -> List[Archivo]:
+    """CSV `<raíz>/**/<AAAA-MM-DD>/<archivo conocido>.csv`, en orden (fecha, ruta)."""
+    excluir = excluir.resolve() if excluir else None
+    vistos, out = set(), []
+    for raiz in raices:
+        for p in Path(raiz).rglob("*.csv"):
+            if not _RE_FECHA.match(p.parent.name):
+                continue
+            rp = p.resolve()
+            if rp in vistos or (excluir and excluir in rp.parents):
+                continue
+            tipo = clasificar(p.name)
+            if tipo is None:
+                continue
+            vistos.add(rp)
+            st = p.stat()
+            out.append(Archivo(str(rp), tipo[0], tipo[1], p.parent.name, st.st_size, st.st_mtime_ns))
+    return sorted(out, key=lambda a: (a.fecha, a.ruta))
+
+
+# ───────────────────── trabajador (un archivo) ─────────────────────
+def canonizar(df, fecha: str, fuente: str):
+    """Trozo crudo → (trozo canónico, filas largas de pestañas (lid, grupo, feature))."""
+    import pandas as pd
+    df = df.loc[:, [c for c in df.columns if not str(c).startswith("Unnamed")]]
+    ren = {c: MAPEO[c] for c in df.columns if c in MAPEO and MAPEO[c] not in df.columns}
+    df = df.rename(columns=ren).drop(columns=[c for c in df.columns if c in MAPEO and c not in ren])
+    vacia = pd.Series([""] * len(df), index=df.index)
+    urls = df["url"] if "url" in df else vacia
+    # 1.2 no guardaba url: el "Cód. Inmuebles24" es el mismo número que cierra la URL del anuncio
+    codigos = [str(c).strip() for c in (df["codigo_inmuebles24"] if "codigo_inmuebles24" in df else vacia)]
+    lids = [listing_id(u) if u else c for u, c in zip(urls, codigos)]
+    if "url" not in df or not all(urls):
+        # url sintética que listing_id() resuelve al mismo código, para duplicados/estadísticas/búsqueda
+        df = df.assign(url=[u or (URL_CODIGO.format(c) if c else "") for u, c in zip(urls, codigos)])
+    tabs: List[Tuple[str, str, str]] = []
+    anchas = [c for c in df.columns if c not in PropertyRecord._CONJUNTO and c not in DERIVADAS]
+    for c in anchas:
+        grupo = clean_label(str(c))
+        for lid, valor in zip(lids, df[c]):
+            if lid:
+                tabs.extend((lid, grupo, f) for f in dict.fromkeys(split_features(valor)))
+    out = df.reindex(columns=PropertyRecord.CAMPOS, fill_value="")
+    out.insert(0, "fuente", fuente)
+    out.insert(0, "fecha", fecha)
+    out.insert(0, "listing_id", lids)
+    return out[[bool(l) for l in lids]], tabs
+
+
+def procesar_archivo(arch: Archivo, destino: str, chunk: int = CHUNK) -> Dict[str, Union[int, str]]:
+    """Escribe la partición canónica y un CSV temporal de pestañas; memoria acotada a un trozo.
+
+    Cuenta las filas descartadas: `malas` (líneas que el parser de CSV no
+    pudo leer) y `sin_id` (sin url ni código de anuncio).  El motor C de
+    pandas no informa las líneas que salta, así que ante la primera línea
+    mala el archivo se relee con el motor python, que sí las cuenta.
+    """
+    import pandas as pd
+    out = arch.salida(Path(destino))
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp, tmp_tabs = out.with_suffix(".tmp"), out.with_suffix(".tabs.tmp")
+    malas: List[List[str]] = []
+    for motor, si_mala in (("c", "error"), ("python", malas.append)):
+        filas = n_tabs = sin_id = 0
+        try:
+            with tmp.open("w", encoding="utf-8", newline="") as fh, \
+                 tmp_tabs.open("w", encoding="utf-8", newline="") as fh_tabs:
+                w_tabs = csv.writer(fh_tabs)
+                lector = pd.read_csv(arch.ruta, chunksize=chunk, dtype=str, keep_default_na=False,
+                                     encoding="utf-8", engine=motor, on_bad_lines=si_mala)
+                for i, trozo in enumerate(lector):
+                    canon, tabs = canonizar(trozo, arch.fecha, arch.fuente)
+                    canon.to_csv(fh, index=False, header=(i == 0))
+                    w_tabs.writerows(tabs)
+                    filas += len(canon)
+                    sin_id += len(trozo) - len(canon)
+                    n_tabs += len(tabs)
+                if fh.tell() == 0:              # CSV vacío: sólo cabecera
+                    csv.writer(fh).writerow(CANONICO)
+        except pd.errors.ParserError:
+            continue
+        break
+    tmp.replace(out)
+    return {"ruta": arch.ruta, "salida": str(out), "tabs": str(tmp_tabs), "filas": filas, "n_tabs": n_tabs,
+            "sin_id": sin_id, "malas": len(malas)}
+
+
+# ───────────────────── manifiesto ─────────────────────
+def leer_manifiesto(destino: Path) -> Dict[str, Dict]:
+    path = destino / ARCHIVO_MANIFIESTO
+    if not path.exists():
+        return {}
+    with path.open(encoding="utf-8") as fh:
+        return {d["clave"]: d for d in map(json.loads, fh) if d.get("clave")}
+
+
+def _registrar(destino: Path, arch: Archivo, res: Dict):
+    with (destino / ARCHIVO_MANIFIESTO).open("a", encoding="utf-8") as fh:
+        fh.write(json.dumps({"clave": arch.clave, **asdict(arch), "salida": res["salida"],
+                             "filas": res["filas"], "n_tabs": res["n_tabs"], "sin_id": res["sin_id"],
+                             "malas": res["malas"]}, ensure_ascii=False) + "\n")
+
+
+# ───────────────────── orquestación ─────────────────────
+def _tabs_por_anuncio(path: Path) -> Iterator[Tuple[str, Dict[str, List[str]]]]:
+    """Agrupa el CSV temporal (ya viene ordenado por columna, no por anuncio)."""
+    por_lid: Dict[str, Dict[str, List[str]]] = {}
+    with path.open(encoding="utf-8", newline="") as fh:
+        for lid, grupo, feat in csv.reader(fh):
+            por_lid.setdefault(lid, {}).setdefault(grupo, []).append(feat)
+    yield from por_lid.items()
+
+
+def consolidar(raices: Sequence[Union[str, Path]], destino: Union[str, Path], procesos: Optional[int] = None,
+               chunk: int = CHUNK, ingerir: bool = True) -> List[Dict]:
+    """Procesa los archivos nuevos/modificados; devuelve una fila de resumen por archivo."""
+    import pandas as pd
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    hechos = leer_manifiesto(destino)
+    pendientes = [a for a in descubrir(raices, excluir=destino) if a.clave not in hechos]
+    if not pendientes:
+        return []
+    store = FeatureStore(destino)
+    ingesta = None
+    if ingerir:
+        from ingesta import Ingesta
+        ingesta = Ingesta(destino)
+    resumen: List[Dict] = []
+    with ProcessPoolExecutor(max_workers=procesos or os.cpu_count()) as pool:
+        futuros = [pool.submit(procesar_archivo, a, str(destino), chunk) for a in pendientes]
+        # los procesos avanzan en paralelo; aquí se consume en orden cronológico
+        for arch, fut in zip(pendientes, futuros):
+            res = fut.result()
+            tabs = Path(res["tabs"])
+            for lid, grupos in _tabs_por_anuncio(tabs):
+                store.agregar(lid, grupos)
+            store.flush(arch.fecha)
+            tabs.unlink()
+            if ingesta is not None and arch.tipo == "detalle":
+                for trozo in pd.read_csv(res["salida"], chunksize=chunk, dtype=str, keep_default_na=False):
+                    ingesta.procesar(trozo, arch.fecha)
+                ingesta.guardar()               # estado consistente con el manifiesto
+            _registrar(destino, arch, res)
+            resumen.append({"fecha": arch.fecha, "fuente": arch.fuente, "filas": res["filas"],
+                            "tabs": res["n_tabs"], "sin_id": res["sin_id"], "malas": res["malas"],
+                            "archivo": Path(arch.ruta).name})
+            if res["sin_id"] or res["malas"]:
+                print(f"⚠️  {arch.ruta}: {res['sin_id']:,} filas sin url ni código de anuncio y "
+                      f"{res['malas']:,} líneas ilegibles descartadas", file=sys.stderr)
+    return resumen
+
+
+# ─────────────────────────── DEMO ──────────────────────────
+def _demo(n_dias: int = 4, por_archivo: int = 3_000):
+    """Histórico sintético con los cinco formatos; se consolida dos veces."""
+    import random, tempfile, time
+    import pandas as pd
+    rnd = random.Random(0)
+    url = lambda k: f"https://www.inmuebles24.com/propiedades/clasificado/depto-{k}.html"
+    desc = lambda k: f"Departamento {k % 97} con roof garden, alberca y gimnasio cerca de Andares, listo para habitar"
+    with tempfile.TemporaryDirectory() as tmp:
+        raiz, destino = Path(tmp) / "data", Path(tmp) / "data" / "consolidado"
+        for d in range(n_dias):
+            dia = raiz / f"2025-05-{d + 1:02d}"
+            dia.mkdir(parents=True)
+            ks = [rnd.randrange(20_000) for _ in range(por_archivo)]
+            pd.DataFrame({"nombre": [f"Depto {k}" for k in ks], "descripcion": [f"Depto {k}" for k in ks],
+                          "ubicacion": "Zapopan, Jalisco", "url": [url(k) for k in ks],
+                          "precio": [f"MN {rnd.randrange(2, 9)},500,000" for _ in ks], "tipo": "venta",
+                          "habitaciones": "2 rec.", "baños": "2 baños"}
+                         ).to_csv(dia / "inmuebles24-zapopan-departamentos-venta.csv", index=False)
+            pd.DataFrame({"url": [url(k) for k in ks]}).to_csv(dia / "listings_zapopan.csv", index=False)
+            detalle = lambda: {"titulo": [f"Depto {k}" for k in ks], "descripcion": [desc(k) for k in ks],
+                               "precio": [f"MN {3 + k % 5},000,000" for k in ks], "area_total": "85 m² tot.",
+                               "direccion": "Av. Patria 123, Zapopan, Jalisco", "tipo_propiedad": "Departamento"}
+            pd.DataFrame({"url": [url(k) for k in ks], **detalle(),   # formato antiguo: pestañas anchas
+                          "tab_amenidades": "Alberca; Gimnasio; Roof garden", "servicios": "Internet; Gas"}
+                         ).to_csv(dia / "detalles_completos.csv", index=False)
+            pd.DataFrame({"url_fuente": [url(k) for k in ks], **detalle()}
+                         ).to_csv(dia / f"reporte_detallado_{dia.name}.csv", index=False)
+            pd.DataFrame({"codigo_inmuebles24": ks, **detalle(), "deal_score": 0.1}   # 1.2 no guardaba url
+                         ).to_csv(dia / "inmuebles24_terrenos_guadalajara_detalle.csv", index=False)
+        for corrida in ("primera", "segunda"):
+            t0 = time.perf_counter()
+            res = consolidar([raiz], destino, chunk=1_000)
+            print(f"{corrida} corrida: {len(res)} archivos, {sum(r['filas'] for r in res):,} filas, "
+                  f"{sum(r['tabs'] for r in res):,} features en {time.perf_counter() - t0:.1f}s")
+        (raiz / "2025-05-01" / "listings_zapopan.csv").touch()
+        print(f"tras modificar 1 archivo: {len(consolidar([raiz], destino))} reprocesado(s)")
+        canon = pd.read_csv(next(destino.glob("*/detalles-reporte_detallado-*.csv")), nrows=2)
+        print("columnas canónicas:", ", ".join(canon.columns[:8]), "…")
+        print("pestañas:", FeatureStore(destino).features_de(["2025-05-01"]).popitem()[1])
+
+
+# ─────────────────────────── MAIN ──────────────────────────
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    ap = argparse.ArgumentParser(description="Consolida el histórico de CSV en un esquema canónico")
+    ap.add_argument("raices", nargs="*", help="directorios con subcarpetas <fecha>/")
+    ap.add_argument("--salida", default="data/consolidado")
+    ap.add_argument("--procesos", type=int, default=None)
+    ap.add_argument("--chunk", type=int, default=CHUNK, help="filas por trozo de lectura")
+    ap.add_argument("--sin-ingesta", action="store_true",
+                    help="sólo esquema canónico y pestañas (sin duplicados/estadísticas/búsqueda)")
+    ap.add_argument("--demo", action="store_true")
+    args = ap.parse_args()
+
+    if args.demo:
+        _demo()
+    elif args.raices:
+        res = consolidar(args.raices, args.salida, args.procesos, args.chunk, ingerir=not args.sin_ingesta)
+        for r in res:
+            print(f"{r['fecha']}  {r['fuente']:18} {r['filas']:>8,} filas {r['tabs']:>8,} features  {r['archivo']}")
+        print(f"{len(res)} archivos nuevos consolidados en {args.salida}" if res else "Nada nuevo que consolidar.")
+    else:
+        ap.print_help()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Diferencias día a día entre snapshots: anuncios nuevos, retirados y con cambios.
+
+• Por cada `<data_dir>/<fecha>/` se calcula una huella de 64 bits por fila:
+  clave = listing_id, huella = hash(campos relevantes), y se guardan junto a
+  los datos en `huellas.csv` (`huellas-<patrón>.csv` con otro `--patron`; se
+  reutilizan mientras los CSV no cambien).
+• Un anuncio puede salir en varios CSV del día (listings_*.csv sólo con url,
+  detalles_completos.csv…): gana la fila con más campos de huella, la misma
+  regla en `indexar` y en `diff`.  Dos huellas sólo se comparan si vienen de
+  filas con los mismos campos; si no, sólo cuenta un cambio de precio.
+• El diff es un hash-join en tiempo lineal por listing_id, sin cargar
+  DataFrames ni hacer merge por url.
+• `diff_rango()` encadena fechas consecutivas manteniendo en memoria sólo
+  las huellas del día previo.
+
+    python diff_snapshots.py data/inmuebles24 2025-06-01 2025-06-07
+"""
+
+from __future__ import annotations
+import csv, hashlib, sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from registros import listing_id
+
+ARCHIVO_HUELLAS = "huellas.csv"
+ARCHIVO_DIFF    = "diff.csv"
+# archivos derivados que no forman parte del snapshot
+DERIVADOS = {ARCHIVO_HUELLAS, ARCHIVO_DIFF, "tab_features.csv", "deals.csv", "clusters_duplicados.csv"}
+CAMPOS_HUELLA = ("precio", "titulo", "nombre", "descripcion", "direccion", "ubicacion",
+                 "area_m2", "area_total", "area_cubierta", "recamaras", "habitaciones",
+                 "mantenimiento", "operacion", "tipo_propiedad")
+
+csv.field_size_limit(sys.maxsize)              # descripciones largas
+
+
+class Huella(NamedTuple):
+    lid: str
+    huella: int
+    precio: str
+    url: str
+    campos: int = 0             # campos de huella presentes en el CSV de origen
+
+
+def _mejor(a: Huella, b: Huella) -> Huella:
+    """Entre dos filas del mismo anuncio, la más completa (a igualdad, la primera)."""
+    return b if b.campos > a.campos else a
+
+
+def _h64(texto: str) -> int:
+    return int.from_bytes(hashlib.blake2b(texto.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def fuentes(dia: Path, patron: str = "*.csv") -> List[Path]:
+    return sorted(p for p in dia.glob(patron) if p.name not in DERIVADOS and not p.name.startswith("huellas"))
+
+
+def archivo_huellas(patron: str = "*.csv") -> str:
+    """La caché depende del patrón: otro `--patron` lee otros CSV."""
+    if patron == "*.csv":
+        return ARCHIVO_HUELLAS
+    return f"huellas-{hashlib.blake2b(patron.encode(), digest_size=4).hexdigest()}.csv"
+
+
+# ───────────────────── huellas ─────────────────────
+def calcular_huellas(csvs: Iterable[Path], campos: Tuple[str, ...] = CAMPOS_HUELLA) -> Iterator[Huella]:
+    """Recorre los CSV fila a fila (memoria acotada) y emite una huella por anuncio."""
+    for path in csvs:
+        with path.open(encoding="utf-8", newline="") as fh:
+            lector = csv.DictReader(fh)
+            presentes = [c for c in campos if c in (lector.fieldnames or [])]
+            for fila in lector:
+                url = fila.get("url") or fila.get("url_fuente") or ""
+                if not url:
+                    continue
+                valor = "\x1f".join((fila.get(c) or "").strip() for c in presentes)
+                yield Huella(listing_id(url), _h64(valor), fila.get("precio") or "", url, len(presentes))
+
+
+def huellas_de(dia: Path, patron: str = "*.csv") -> Iterator[Huella]:
+    """Huellas del día; usa/escribe `archivo_huellas(patron)` como caché junto a los datos."""
+    srcs = fuentes(dia, patron)
+    cache = dia / archivo_huellas(patron)
+    if cache.exists() and srcs and cache.stat().st_mtime >= max(p.stat().st_mtime for p in srcs):
+        with cache.open(encoding="utf-8", newline="") as fh:
+            lector = csv.DictReader(fh)
+            if "campos" in (lector.fieldnames or []):     # cachés viejas sin `campos` se recalculan
+                for fila in lector:
+                    yield Huella(fila["listing_id"], int(fila["huella"], 16), fila["precio"], fila["url"],
+                                 int(fila["campos"]))
+                return
+    tmp = cache.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8", newline="") as fh:
+        w = csv.writer(fh)
+        w.writerow(["listing_id", "huella", "precio", "url", "campos"])
+        for h in calcular_huellas(srcs):
+            w.writerow([h.lid, f"{h.huella:016x}", h.precio, h.url, h.campos])
+            yield h
+    tmp.replace(cache)
+
+
+# ───────────────────── diff ─────────────────────
+@dataclass
+class Diff:
+    fecha_a: str
+    fecha_b: str
+    nuevos: List[Huella] = field(default_factory=list)
+    eliminados: List[Huella] = field(default_factory=list)
+    cambiados: List[Tuple[Huella, Huella]] = field(default_factory=list)
+
+    def resumen(self) -> str:
+        cambios_precio = sum(a.precio != b.precio for a, b in self.cambiados)
+        return (f"{self.fecha_a} → {self.fecha_b}: +{len(self.nuevos)} nuevos, "
+                f"-{len(self.eliminados)} retirados, ~{len(self.cambiados)} cambiados "
+                f"({cambios_precio} de precio)")
+
+    def filas(self) -> Iterator[Dict[str, str]]:
+        for h in self.nuevos:
+            yield {"tipo": "nuevo", "listing_id": h.lid, "url": h.url, "precio_anterior": "", "precio_nuevo": h.precio}
+        for h in self.eliminados:
+            yield {"tipo": "eliminado", "listing_id": h.lid, "url": h.url, "precio_anterior": h.precio, "precio_nuevo": ""}
+        for a, b in self.cambiados:
+            yield {"tipo": "precio" if a.precio != b.precio else "cambiado", "listing_id": b.lid,
+                   "url": b.url, "precio_anterior": a.precio, "precio_nuevo": b.precio}
+
+    def guardar(self, path: Path):
+        with path.open("w", encoding="utf-8", newline="") as fh:
+            w = csv.DictWriter(fh, fieldnames=["tipo", "listing_id", "url", "precio_anterior", "precio_nuevo"])
+            w.writeheader()
+            w.writerows(self.filas())
+
+
+def indexar(huellas: Iterable[Huella]) -> Dict[str, Huella]:
+    """Una huella por listing_id: la de la fila más completa (ver `_mejor`)."""
+    idx: Dict[str, Huella] = {}
+    for h in huellas:
+        antes = idx.get(h.lid)
+        idx[h.lid] = h if antes is None else _mejor(antes, h)
+    return idx
+
+
+def cambio(antes: Huella, ahora: Huella) -> bool:
+    if antes.campos == ahora.campos:
+        return antes.huella != ahora.huella
+    # filas de CSV distintos (p. ej. sólo url vs detalle): las huellas no son comparables
+    return bool(antes.precio and ahora.precio and antes.precio != ahora.precio)
+
+
+def diff(previo: Dict[str, Huella], actual: Iterable[Huella], fecha_a: str = "", fecha_b: str = "") -> Diff:
+    """Hash-join en O(n) entre `previo` (indexado) y `actual` (se indexa con la misma regla)."""
+    d = Diff(fecha_a, fecha_b)
+    pendientes = dict(previo)
+    for h in (actual.values() if isinstance(actual, dict) else indexar(actual).values()):
+        antes = pendientes.pop(h.lid, None)
+        if antes is None:
+            d.nuevos.append(h)
+        elif cambio(antes, h):
+            d.cambiados.append((antes, h))
+    d.eliminados = list(pendientes.values())
+    return d
+
+
+def diff_rango(data_dir: Path, desde: Optional[str] = None, hasta: Optional[str] = None,
+               patron: str = "*.csv") -> Iterator[Diff]:
+    """Diffs entre fechas consecutivas con datos dentro de [desde, hasta]."""
+    dias = sorted(p for p in data_dir.iterdir()
+                  if p.is_dir() and fuentes(p, patron)
+                  and (desde is None or p.name >= desde) and (hasta is None or p.name <= hasta))
+    previo: Optional[Dict[str, Huella]] = None
+    fecha_previa = ""
+    for dia in dias:
+        if previo is None:
+            previo, fecha_previa = indexar(huellas_de(dia, patron)), dia.name
+            continue
+        actual = indexar(huellas_de(dia, patron))
+        yield diff(previo, actual, fecha_previa, dia.name)
+        previo, fecha_previa = actual, dia.name
+
+
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    ap = argparse.ArgumentParser(description="Diff de snapshots diarios por hash")
+    ap.add_argument("data_dir")
+    ap.add_argument("desde", nargs="?")
+    ap.add_argument("hasta", nargs="?")
+    ap.add_argument("--patron", default="*.csv", help="glob de CSV del snapshot dentro de cada día")
+    ap.add_argument("--guardar", action="store_true", help=f"escribe {ARCHIVO_DIFF} en el día más reciente")
+    args = ap.parse_args()
+
+    for d in diff_rango(Path(args.data_dir), args.desde, args.hasta, args.patron):
+        print(d.resumen())
+        if args.guardar:
+            d.guardar(Path(args.data_dir) / d.fecha_b / ARCHIVO_DIFF)
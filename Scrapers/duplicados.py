@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Detección de anuncios casi duplicados entre anunciantes (MinHash + LSH).
+
+El mismo departamento aparece con distinto `codigo_inmuebles24` y texto
+ligeramente editado. Para agruparlos sin comparar todos contra todos:
+
+• Firma MinHash (k=128) de los shingles de 5 caracteres de titulo+descripcion
+  (texto plegado: sin acentos, minúsculas).
+• LSH: 16 bandas × 8 filas → sólo se comparan anuncios que comparten una
+  banda completa (umbral efectivo de Jaccard ≈ 0.7).
+• Verificación del candidato: Jaccard estimado, precio y superficie casi
+  iguales y, si hay coordenadas, a menos de `MAX_KM`.
+• Union-find: `cluster_id` = listing_id del primer anuncio del grupo, estable
+  entre corridas. El estado se guarda para procesar días nuevos incrementalmente.
+
+    python duplicados.py data/inmuebles24              # toda la historia
+    python duplicados.py --bench
+"""
+
+from __future__ import annotations
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from geo import haversine_km
+from normalizar import plegar
+
+ARCHIVO_ESTADO = "duplicados_estado.npz"
+K, BANDAS      = 128, 16
+FILAS          = K // BANDAS
+PRIMO          = np.uint64((1 << 31) - 1)
+SHINGLE        = 5
+# hash polinomial de la ventana de SHINGLE bytes: Σ byte·257^j  (cabe en uint64)
+_PESOS         = np.array([257 ** j for j in range(SHINGLE)], dtype=np.uint64)
+MIN_TEXTO      = 40          # descripciones más cortas no dan firmas fiables
+UMBRAL_JACCARD = 0.6
+TOL_PRECIO     = 0.03
+TOL_AREA       = 0.05
+MAX_KM         = 0.5
+MAX_POR_CLUSTER = 3          # comparaciones máximas contra un mismo cluster candidato
+MAX_CUBETA     = 64          # una banda tan repetida es texto de plantilla: no crece más
+
+
+def _rel(a: float, b: float) -> float:
+    return abs(a - b) / max(abs(a), abs(b), 1e-9)
+
+
+class Deduplicador:
+    def __init__(self, seed: int = 24):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, int(PRIMO), K, dtype=np.uint64)
+        self.b = rng.integers(0, int(PRIMO), K, dtype=np.uint64)
+        self.ids: List[str] = []
+        self.pos: Dict[str, int] = {}
+        self.firmas: List[Optional[np.ndarray]] = []
+        self.meta: List[Tuple[float, float, float, float]] = []   # precio, área, lat, lon
+        self.padre: List[int] = []
+        self.buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+
+    # ─ MinHash
+    def shingles(self, texto: str) -> np.ndarray:
+        """Hashes únicos de las ventanas de 5 bytes del texto plegado (vectorizado)."""
+        t = plegar(texto).encode("utf-8")
+        if len(t) < MIN_TEXTO:
+            return np.empty(0, dtype=np.uint64)
+        b = np.frombuffer(t, dtype=np.uint8).astype(np.uint64)
+        ventanas = np.lib.stride_tricks.sliding_window_view(b, SHINGLE)
+        return np.unique((ventanas * _PESOS).sum(axis=1) % PRIMO)
+
+    def firma(self, texto: str) -> Optional[np.ndarray]:
+        s = self.shingles(texto)
+        if not s.size:
+            return None
+        return ((self.a[:, None] * s[None, :] + self.b[:, None]) % PRIMO).min(axis=1).astype(np.uint32)
+
+    # ─ union-find
+    def _raiz(self, i: int) -> int:
+        while self.padre[i] != i:
+            self.padre[i] = self.padre[self.padre[i]]
+            i = self.padre[i]
+        return i
+
+    def _unir(self, i: int, j: int):
+        ri, rj = self._raiz(i), self._raiz(j)
+        if ri != rj:                             # el más antiguo manda → id estable
+            self.padre[max(ri, rj)] = min(ri, rj)
+
+    def cluster_id(self, lid: str) -> Optional[str]:
+        i = self.pos.get(lid)
+        return None if i is None else self.ids[self._raiz(i)]
+
+    # ─ alta
+    def _parecidos(self, i: int, j: int) -> bool:
+        (pi, ai, lai, loi), (pj, aj, laj, loj) = self.meta[i], self.meta[j]
+        if pi == pi and pj == pj and _rel(pi, pj) > TOL_PRECIO:
+            return False
+        if ai == ai and aj == aj and _rel(ai, aj) > TOL_AREA:
+            return False
+        if lai == lai and laj == laj and haversine_km(lai, loi, laj, loj) > MAX_KM:
+            return False
+        return np.count_nonzero(self.firmas[i] == self.firmas[j]) >= UMBRAL_JACCARD * K
+
+    def _indexar(self, i: int):
+        f = self.firmas[i]
+        candidatos = set()
+        for banda in range(BANDAS):
+            clave = (banda, f[banda * FILAS:(banda + 1) * FILAS].tobytes())
+            cubeta = self.buckets[clave]
+            candidatos.update(cubeta)
+            if len(cubeta) < MAX_CUBETA:
+                cubeta.append(i)
+        # textos idénticos llenan las cubetas: se compara contra unos pocos
+        # miembros de cada cluster candidato, no contra todos
+        por_cluster: Dict[int, List[int]] = defaultdict(list)
+        for j in candidatos:
+            por_cluster[self._raiz(j)].append(j)
+        for miembros in por_cluster.values():
+            for j in miembros[:MAX_POR_CLUSTER]:
+                if self._raiz(j) == self._raiz(i):
+                    break
+                if self._parecidos(i, j):
+                    self._unir(i, j)
+                    break
+
+    def agregar(self, lid: str, texto: str, precio: Any = None, area: Any = None,
+                lat: Any = None, lon: Any = None) -> str:
+        """Da de alta un anuncio (idempotente por listing_id) y devuelve su cluster_id."""
+        if lid in self.pos:
+            return self.cluster_id(lid)
+        f = lambda x: float(x) if isinstance(x, (int, float)) and x == x else float("nan")
+        i = self.pos[lid] = len(self.ids)
+        self.ids.append(lid)
+        self.padre.append(i)
+        self.meta.append((f(precio), f(area), f(lat), f(lon)))
+        self.firmas.append(self.firma(texto or ""))
+        if self.firmas[i] is not None:
+            self._indexar(i)
+        return self.cluster_id(lid)
+
+    def asignar_frame(self, df):
+        """Añade `cluster_id` a un DataFrame normalizado (necesita url/url_fuente)."""
+        from registros import listing_id
+        col = lambda c: df[c] if c in df else [None] * len(df)
+        urls = df["url"] if "url" in df else col("url_fuente")
+        texto = [f"{t if isinstance(t, str) else ''} {d if isinstance(d, str) else ''}"
+                 for t, d in zip(col("titulo"), col("descripcion"))]
+        df = df.copy()
+        df["cluster_id"] = [
+            self.agregar(listing_id(u if isinstance(u, str) else ""), tx, p, a, la, lo)
+            for u, tx, p, a, la, lo in zip(urls, texto, col("precio_valor"), col("superficie_m2"),
+                                           col("lat"), col("lon"))]
+        return df
+
+    # ─ persistencia
+    def guardar(self, base_dir: Union[str, Path]):
+        vacia = np.zeros(K, dtype=np.uint32)
+        tiene = np.array([f is not None for f in self.firmas], dtype=bool)
+        firmas = np.stack([f if f is not None else vacia for f in self.firmas]) if self.firmas \
+            else np.zeros((0, K), dtype=np.uint32)
+        path = Path(base_dir) / ARCHIVO_ESTADO
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, ids=np.array(self.ids, dtype=object), firmas=firmas, tiene=tiene,
+                            meta=np.array(self.meta, dtype=float).reshape(-1, 4),
+                            padre=np.array([self._raiz(i) for i in range(len(self.ids))], dtype=np.int64))
+
+    @classmethod
+    def cargar(cls, base_dir: Union[str, Path]) -> "Deduplicador":
+        dd = cls()
+        path = Path(base_dir) / ARCHIVO_ESTADO
+        if not path.exists():
+            return dd
+        with np.load(path, allow_pickle=True) as z:
+            dd.ids = list(z["ids"])
+            dd.meta = [tuple(m) for m in z["meta"]]
+            dd.padre = z["padre"].tolist()
+            dd.firmas = [f if t else None for f, t in zip(z["firmas"], z["tiene"])]
+        dd.pos = {lid: i for i, lid in enumerate(dd.ids)}
+        for i, f in enumerate(dd.firmas):       # cubetas LSH se reconstruyen, no se guardan
+            if f is not None:
+                for banda in range(BANDAS):
+                    cubeta = dd.buckets[(banda, f[banda * FILAS:(banda + 1) * FILAS].tobytes())]
+                    if len(cubeta) < MAX_CUBETA:
+                        cubeta.append(i)
+        return dd
+
+    def clusters(self) -> Dict[str, List[str]]:
+        grupos: Dict[str, List[str]] = defaultdict(list)
+        for i, lid in enumerate(self.ids):
+            grupos[self.ids[self._raiz(i)]].append(lid)
+        return {c: m for c, m in grupos.items() if len(m) > 1}
+
+
+# ─────────────────────────── BENCH ──────────────────────────
+def _bench(n: int = 20_000, dup: float = 0.1):
+    import random, time
+    rnd = random.Random(0)
+    palabras = ("departamento remodelado roof garden pet friendly cerca de andares alberca gimnasio "
+                "elevador seguridad amplio luminoso cocina integral vista panoramica estacionamiento "
+                "techado bodega terraza balcon zona norte colonia providencia excelente ubicacion").split()
+    dd = Deduplicador()
+    t0 = time.perf_counter()
+    verdad: List[Tuple[str, str]] = []
+    for k in range(n):
+        if k and rnd.random() < dup:            # re-publicación editada de uno anterior
+            j = rnd.randrange(k)
+            base = textos[j].split()
+            base[rnd.randrange(len(base))] = rnd.choice(palabras)
+            texto, precio = " ".join(base), precios[j]
+            verdad.append((str(j), str(k)))
+        else:
+            texto = " ".join(rnd.choice(palabras) for _ in range(60))
+            precio = rnd.randrange(1_000_000, 9_000_000, 1000)
+        if k == 0:
+            textos, precios = [], []
+        textos.append(texto)
+        precios.append(precio)
+        dd.agregar(str(k), texto, precio, 80.0)
+    dt = time.perf_counter() - t0
+    recall = sum(dd.cluster_id(a) == dd.cluster_id(b) for a, b in verdad) / max(1, len(verdad))
+    print(f"{n:,} anuncios en {dt:.1f}s ({n / dt:,.0f}/s) · {len(dd.clusters()):,} clusters · "
+          f"recall de pares duplicados {recall:.1%}")
+
+
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    ap = argparse.ArgumentParser(description="Clusters de anuncios casi duplicados")
+    ap.add_argument("data_dir", nargs="?")
+    ap.add_argument("--bench", action="store_true")
+    args = ap.parse_args()
+
+    if args.bench:
+        _bench()
+    elif args.data_dir:
+        import pandas as pd
+        from normalizar import normalizar_frame
+        base = Path(args.data_dir)
+        dd = Deduplicador.cargar(base)
+        for csv in sorted(base.glob("*/*.csv")):
+            df = pd.read_csv(csv)
+            if "descripcion" not in df or not ({"url", "url_fuente"} & set(df.columns)):
+                continue
+            dd.asignar_frame(df if "precio_valor" in df else normalizar_frame(df))
+        dd.guardar(base)
+        grupos = dd.clusters()
+        print(f"{len(dd.ids):,} anuncios · {len(grupos):,} clusters con duplicados "
+              f"({sum(len(m) for m in grupos.values()):,} anuncios)")
+        pd.DataFrame([{"listing_id": lid, "cluster_id": dd.cluster_id(lid)} for lid in dd.ids]) \
+          .to_csv(base / "clusters_duplicados.csv", index=False)
+    else:
+        ap.print_help()
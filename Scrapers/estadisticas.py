@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Estadísticas incrementales de precio/m² por zona para puntuar ofertas al vuelo.
+
+• Agregados por (zona, tipo, recámaras), (zona, tipo) y (zona): conteo,
+  media (Welford) y cuantiles p25/mediana en streaming (algoritmo P²,
+  5 marcadores por cuantil, memoria O(1)).
+• Cada anuncio se puntúa contra el estado *previo* a su llegada, con el
+  nivel más específico que tenga muestras suficientes: O(1) por anuncio,
+  sin recalcular la historia.
+• Un anuncio ya visto con el mismo precio no vuelve a sumar (recrawls diarios);
+  si trae `cluster_id` (duplicados.py) sólo suma el primer miembro del cluster,
+  así la re-publicación de otro anunciante tampoco.
+
+    deal_score = (mediana − precio_m2) / mediana     (> 0: más barato que la zona)
+
+    python estadisticas.py data/inmuebles24 2025-06-01      # ingiere la partición del día
+"""
+
+from __future__ import annotations
+import json, math
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from geo import GridIndex
+from registros import listing_id
+
+ARCHIVO_ESTADO = "estadisticas_zona.json"
+MIN_MUESTRAS   = 8          # mínimo para usar un nivel como referencia
+CELDA_KM       = 2.0
+# columnas que añade `ingestar`, presentes en todas las filas (None si no aplica)
+COLUMNAS = ("zona", "precio_m2", "deal_score", "ref_mediana_m2", "ref_p25_m2", "bajo_p25", "ref_n", "ref_nivel")
+_SIN_REFERENCIA = {"deal_score": None, "ref_mediana_m2": None, "ref_p25_m2": None, "bajo_p25": None,
+                   "ref_n": 0, "ref_nivel": None}
+
+
+# ───────────────────── cuantil P² ─────────────────────
+class P2Quantile:
+    """Estimador P² (Jain & Chlamtac, 1985) de un cuantil en streaming."""
+    __slots__ = ("p", "q", "n", "np_", "dn", "inicial")
+
+    def __init__(self, p: float):
+        self.p = p
+        self.q: List[float] = []                  # alturas de los marcadores
+        self.n = [0, 1, 2, 3, 4]                  # posiciones
+        self.np_ = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self.dn = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+        self.inicial: List[float] = []
+
+    def agregar(self, x: float):
+        if len(self.inicial) < 5:
+            self.inicial.append(x)
+            if len(self.inicial) == 5:
+                self.q = sorted(self.inicial)
+            return
+        q, n = self.q, self.n
+        if x < q[0]:
+            q[0], k = x, 0
+        elif x >= q[4]:
+            q[4], k = x, 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.np_[i] += self.dn[i]
+        for i in (1, 2, 3):
+            d = self.np_[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                s = 1 if d > 0 else -1
+                qp = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:     # parabólica fuera de rango → lineal
+                    qp = q[i] + s * (q[i + s] - q[i]) / (n[i + s] - n[i])
+                q[i] = qp
+                n[i] += s
+
+    def valor(self) -> Optional[float]:
+        if len(self.inicial) < 5:
+            if not self.inicial:
+                return None
+            orden = sorted(self.inicial)
+            return orden[min(len(orden) - 1, int(self.p * len(orden)))]
+        return self.q[2]
+
+    def a_dict(self) -> Dict[str, Any]:
+        return {"p": self.p, "q": self.q, "n": self.n, "np": self.np_, "ini": self.inicial}
+
+    @classmethod
+    def de_dict(cls, d: Dict[str, Any]) -> "P2Quantile":
+        e = cls(d["p"])
+        e.q, e.n, e.np_, e.inicial = d["q"], d["n"], d["np"], d["ini"]
+        return e
+
+
+# ───────────────────── agregado por clave ─────────────────────
+class ZoneStats:
+    __slots__ = ("n", "media", "m2", "p25", "p50")
+
+    def __init__(self):
+        self.n, self.media, self.m2 = 0, 0.0, 0.0
+        self.p25, self.p50 = P2Quantile(0.25), P2Quantile(0.5)
+
+    def agregar(self, x: float):
+        self.n += 1
+        delta = x - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (x - self.media)
+        self.p25.agregar(x)
+        self.p50.agregar(x)
+
+    @property
+    def desviacion(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def a_dict(self) -> Dict[str, Any]:
+        return {"n": self.n, "media": self.media, "m2": self.m2,
+                "p25": self.p25.a_dict(), "p50": self.p50.a_dict()}
+
+    @classmethod
+    def de_dict(cls, d: Dict[str, Any]) -> "ZoneStats":
+        z = cls()
+        z.n, z.media, z.m2 = d["n"], d["media"], d["m2"]
+        z.p25, z.p50 = P2Quantile.de_dict(d["p25"]), P2Quantile.de_dict(d["p50"])
+        return z
+
+
+# ───────────────────── motor ─────────────────────
+def _clave(*partes: Any) -> str:
+    return "|".join("*" if p is None or p != p else str(p) for p in partes)
+
+
+def _recamaras(rec: Any) -> Optional[int]:
+    """2, 2.0 o np.int64(2) → 2; NaN, None o texto → None.
+
+    `recamaras_n` llega como int o float según el lote traiga NaN; sin esto
+    el mismo segmento quedaba partido en "…|2" y "…|2.0".
+    """
+    try:
+        x = float(rec)
+    except (TypeError, ValueError):
+        return None
+    return int(x) if math.isfinite(x) else None
+
+
+def zona_de(fila: Dict[str, Any], grid: GridIndex) -> Optional[str]:
+    """Celda de la rejilla si hay coordenadas; si no, municipio/estado de la dirección."""
+    lat, lon = fila.get("lat"), fila.get("lon")
+    if isinstance(lat, (int, float)) and isinstance(lon, (int, float)) and lat == lat and lon == lon:
+        return grid.zona(lat, lon)
+    direccion = fila.get("direccion") or fila.get("ubicacion")
+    if isinstance(direccion, str) and "," in direccion:
+        return "d:" + ",".join(p.strip().lower() for p in direccion.split(",")[-2:])
+    return None
+
+
+class StatsEngine:
+    def __init__(self, celda_km: float = CELDA_KM):
+        self.grid = GridIndex(celda_km)
+        self.celda_km = celda_km
+        self.stats: Dict[str, ZoneStats] = {}
+        self.vistos: Dict[str, float] = {}        # listing_id → último precio_m2 sumado
+        self.representantes: Dict[str, str] = {}  # cluster_id → listing_id que lo representa
+
+    # ─ persistencia
+    @classmethod
+    def cargar(cls, base_dir: Union[str, Path]) -> "StatsEngine":
+        path = Path(base_dir) / ARCHIVO_ESTADO
+        if not path.exists():
+            return cls()
+        d = json.loads(path.read_text(encoding="utf-8"))
+        eng = cls(d.get("celda_km", CELDA_KM))
+        for k, v in d["stats"].items():
+            z = ZoneStats.de_dict(v)
+            zona, _, rec = k.rpartition("|")
+            if rec.endswith(".0") and zona.count("|") == 1:     # estado previo a `_recamaras`
+                k = f"{zona}|{_recamaras(rec)}"
+            if k not in eng.stats or z.n > eng.stats[k].n:      # sin fusión de P²: gana la mayor
+                eng.stats[k] = z
+        eng.vistos = d.get("vistos", {})
+        eng.representantes = d.get("representantes", {})
+        return eng
+
+    def guardar(self, base_dir: Union[str, Path]):
+        path = Path(base_dir) / ARCHIVO_ESTADO
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "celda_km": self.celda_km,
+            "stats": {k: v.a_dict() for k, v in self.stats.items()},
+            "vistos": self.vistos,
+            "representantes": self.representantes,
+        }), encoding="utf-8")
+        tmp.replace(path)
+
+    # ─ núcleo
+    def _claves(self, zona: str, tipo: Any, rec: Any) -> Dict[str, str]:
+        """clave → nivel, del más específico al general.
+
+        Sin tipo o sin recámaras varios niveles dan la misma clave: se deja
+        una sola (con el nombre del nivel más general) para no sumar dos
+        veces la misma muestra.
+        """
+        tipo = tipo.strip().lower() if isinstance(tipo, str) else None
+        rec = _recamaras(rec)
+        niveles: Dict[str, str] = {}
+        for nivel, k in (("zona_tipo_rec", _clave(zona, tipo, rec)), ("zona_tipo", _clave(zona, tipo, None)),
+                         ("zona", _clave(zona, None, None))):
+            niveles[k] = nivel
+        return niveles
+
+    def puntuar(self, zona: Optional[str], tipo: Any, rec: Any, precio_m2: float) -> Dict[str, Any]:
+        """Puntuación contra el nivel más específico con muestras suficientes."""
+        if zona is None:
+            return dict(_SIN_REFERENCIA)
+        for k, nivel in self._claves(zona, tipo, rec).items():
+            z = self.stats.get(k)
+            if z and z.n >= MIN_MUESTRAS:
+                med = z.p50.valor()
+                return {"deal_score": (med - precio_m2) / med if med else None,
+                        "ref_mediana_m2": med, "ref_p25_m2": z.p25.valor(),
+                        "bajo_p25": precio_m2 < (z.p25.valor() or 0),
+                        "ref_n": z.n, "ref_nivel": nivel}
+        return dict(_SIN_REFERENCIA)
+
+    def agregar(self, zona: str, tipo: Any, rec: Any, precio_m2: float):
+        for k in self._claves(zona, tipo, rec):
+            self.stats.setdefault(k, ZoneStats()).agregar(precio_m2)
+
+    def procesar(self, fila: Dict[str, Any]) -> Dict[str, Any]:
+        """Puntúa un anuncio normalizado y lo suma a los agregados. O(1).
+
+        Devuelve siempre las mismas claves (`COLUMNAS`), por cualquier rama.
+        """
+        precio, area = fila.get("precio_valor"), fila.get("superficie_m2")
+        if fila.get("moneda") not in (None, "MXN") or not precio or not area or precio != precio or area != area:
+            return {"zona": None, "precio_m2": None, **_SIN_REFERENCIA}
+        ppm2 = precio / area
+        zona = zona_de(fila, self.grid)
+        tipo, rec = fila.get("tipo_propiedad"), fila.get("recamaras_n")
+        out = {"zona": zona, "precio_m2": ppm2, **self.puntuar(zona, tipo, rec, ppm2)}
+        # un duplicado entre anunciantes (mismo cluster_id) cuenta una sola vez: sólo suma
+        # el primer miembro visto del cluster, y su precio no lo pisa el de los demás
+        lid = listing_id(fila.get("url") or fila.get("url_fuente") or "")
+        cid = fila.get("cluster_id")
+        if isinstance(cid, str) and cid and self.representantes.setdefault(cid, lid) != lid:
+            return out
+        if zona is not None and self.vistos.get(lid) != round(ppm2, 2):
+            self.agregar(zona, tipo, rec, ppm2)
+            self.vistos[lid] = round(ppm2, 2)
+        return out
+
+    def ingestar(self, df):
+        """Añade zona, precio_m2, deal_score y referencia a un DataFrame normalizado."""
+        import pandas as pd
+        res = [self.procesar(f) for f in df.to_dict("records")]
+        extra = pd.DataFrame(res, index=df.index, columns=list(COLUMNAS))
+        return df.drop(columns=[c for c in extra.columns if c in df.columns]).join(extra)
+
+
+# ─────────────────────────── MAIN ──────────────────────────
+def _detalles_del_dia(dia: Path):
+    import pandas as pd
+    from normalizar import normalizar_frame
+    for csv in sorted(dia.glob("*.csv")):
+        if csv.name in ("tab_features.csv", "deals.csv") or csv.name.startswith("listings"):
+            continue
+        df = pd.read_csv(csv)
+        if "precio" not in df:
+            continue
+        yield csv, (df if "precio_valor" in df else normalizar_frame(df))
+
+
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    import pandas as pd
+
+    ap = argparse.ArgumentParser(description="Estadísticas por zona y deal score")
+    ap.add_argument("data_dir")
+    ap.add_argument("fechas", nargs="+", help="particiones <data_dir>/<fecha> a ingerir, en orden")
+    ap.add_argument("--top", type=int, default=20)
+    args = ap.parse_args()
+
+    eng = StatsEngine.cargar(args.data_dir)
+    for fecha in args.fechas:
+        partes = [eng.ingestar(df) for _, df in _detalles_del_dia(Path(args.data_dir) / fecha)]
+        if not partes:
+            print(f"{fecha}: sin detalles")
+            continue
+        deals = pd.concat(partes, ignore_index=True).sort_values("deal_score", ascending=False)
+        deals.to_csv(Path(args.data_dir) / fecha / "deals.csv", index=False)
+        print(f"{fecha}: {len(deals)} anuncios puntuados")
+        cols = [c for c in ("deal_score", "precio_m2", "ref_mediana_m2", "ref_nivel", "zona", "url", "url_fuente") if c in deals]
+        print(deals[cols].head(args.top).to_string(index=False))
+    eng.guardar(args.data_dir)
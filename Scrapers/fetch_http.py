@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Capa de descarga sin navegador (urllib) para páginas que no necesitan JS.
+
+• Cada petición sale con la identidad (UA/proxy/sesión) que asigne el pool.
+• Detecta bloqueos tipo Cloudflare y los reporta al pool para rotar.
+• Revalidación condicional (`CacheValidadores`): guarda ETag, Last-Modified
+  y un hash del cuerpo por URL; la siguiente descarga manda If-None-Match /
+  If-Modified-Since y un 304 —o un 200 con el mismo hash, para servidores
+  sin validadores— vuelve marcado `sin_cambios`, para no volver a parsear.
+  Los validadores de un cuerpo nuevo sólo cuentan tras `confirmar(url)`,
+  cuando el consumidor ya lo procesó.
+
+    python fetch_http.py --demo          # tasa de revalidación contra servidor_local
+"""
+
+from __future__ import annotations
+import hashlib, json, threading, time, urllib.error, urllib.request
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from identidades import Identidad, IdentityPool
+
+TIMEOUT = 30.0
+ARCHIVO_VALIDADORES = "validadores_http.json"
+
+
+@dataclass
+class Respuesta:
+    url: str
+    status: int
+    html: str
+    latencia: float
+    bloqueado: bool = False
+    identidad: str = ""
+    sin_cambios: bool = False           # 304, o mismo hash de cuerpo que la última vez
+    bytes: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200 and not self.bloqueado
+
+    @property
+    def limitado(self) -> bool:
+        """429: límite de tasa del host, no un bloqueo de la identidad."""
+        return self.status == 429
+
+
+def looks_blocked(html: str, status: int = 200) -> bool:
+    head = html[:2_048].lower()
+    if ("attention required" in head and "cloudflare" in head) or "sorry, you have been blocked" in head:
+        return True
+    return status in (403, 429)
+
+
+# ───────────────────── validadores por URL ─────────────────────
+class CacheValidadores:
+    """ETag / Last-Modified / hash del cuerpo de cada URL, con contadores de la corrida.
+
+    Seguro entre hilos (el planificador descarga desde `to_thread`).  Las
+    páginas de bloqueo y los errores no se registran.
+
+    Dos fases: `registrar` deja los validadores de un cuerpo nuevo como
+    pendientes y sólo `confirmar(url)` —cuando el consumidor ya procesó ese
+    cuerpo— los pasa a `entradas`, que es lo que se persiste y se usa para
+    la siguiente petición condicional.  Así una ficha que se descargó pero
+    nadie parseó (corrida abortada, consumidor que no la guarda) no queda
+    marcada como "sin cambios" para siempre.
+    """
+
+    def __init__(self, entradas: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.entradas: Dict[str, Dict[str, Any]] = entradas or {}
+        self.pendientes: Dict[str, Dict[str, Any]] = {}
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def cargar(cls, base_dir: Union[str, Path]) -> "CacheValidadores":
+        path = Path(base_dir) / ARCHIVO_VALIDADORES
+        if not path.exists():
+            return cls()
+        return cls(json.loads(path.read_text(encoding="utf-8")))
+
+    def guardar(self, base_dir: Union[str, Path]):
+        path = Path(base_dir) / ARCHIVO_VALIDADORES
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with self._lock:
+            tmp.write_text(json.dumps(self.entradas, separators=(",", ":")), encoding="utf-8")
+        tmp.replace(path)
+
+    def __len__(self) -> int:
+        return len(self.entradas)
+
+    @staticmethod
+    def _clave(url: str) -> str:
+        return url.split("#", 1)[0]
+
+    def cabeceras(self, url: str) -> Dict[str, str]:
+        e = self.entradas.get(self._clave(url))
+        h: Dict[str, str] = {}
+        if e:
+            if e.get("etag"):
+                h["If-None-Match"] = e["etag"]
+            if e.get("modificado"):
+                h["If-Modified-Since"] = e["modificado"]
+        with self._lock:
+            self.stats["peticiones"] += 1
+            self.stats["condicionales"] += bool(h)
+            self.stats["con_historia"] += bool(e)
+        return h
+
+    def registrar(self, url: str, status: int, headers, body: bytes) -> bool:
+        """True si la página no cambió (304 o mismo hash); si cambió, sus validadores quedan pendientes."""
+        clave = self._clave(url)
+        with self._lock:
+            previa = self.entradas.get(clave)
+            if status == 304 and previa:
+                self.stats["no_modificados"] += 1
+                self.stats["bytes_ahorrados"] += previa.get("bytes", 0)
+                if headers.get("ETag"):
+                    previa["etag"] = headers["ETag"]
+                return True
+            if status != 200:
+                return False
+            huella = hashlib.blake2b(body, digest_size=16).hexdigest()
+            self.stats["bytes_recibidos"] += len(body)
+            igual = previa is not None and previa.get("hash") == huella
+            self.stats["iguales"] += igual
+            self.stats["cambiados"] += previa is not None and not igual
+            entrada = {"etag": headers.get("ETag"), "modificado": headers.get("Last-Modified"),
+                       "hash": huella, "bytes": len(body)}
+            if igual:
+                self.entradas[clave] = entrada        # mismo contenido ya procesado: sólo refresca validadores
+            else:
+                self.pendientes[clave] = entrada
+            return igual
+
+    def confirmar(self, url: str):
+        """El consumidor ya procesó el cuerpo de `url`: sus validadores valen para la próxima vez."""
+        clave = self._clave(url)
+        with self._lock:
+            entrada = self.pendientes.pop(clave, None)
+            if entrada is not None:
+                self.entradas[clave] = entrada
+
+    def resumen(self) -> str:
+        s = self.stats
+        evitados = s["no_modificados"] + s["iguales"]
+        tasa = evitados / s["con_historia"] if s["con_historia"] else 0.0
+        return (f"{s['peticiones']} peticiones ({s['condicionales']} condicionales) · "
+                f"{s['no_modificados']} 304 + {s['iguales']} con mismo hash = {evitados} parseos evitados · "
+                f"revalidación {tasa:.0%} · {s['bytes_ahorrados'] / 1024:,.0f} KiB ahorrados, "
+                f"{s['bytes_recibidos'] / 1024:,.0f} KiB recibidos")
+
+
+def _opener(ident: Optional[Identidad]) -> urllib.request.OpenerDirector:
+    if ident and ident.proxy:
+        return urllib.request.build_opener(
+            urllib.request.ProxyHandler({"http": ident.proxy, "https": ident.proxy}))
+    return urllib.request.build_opener()
+
+
+def fetch(url: str, ident: Optional[Identidad] = None, timeout: float = TIMEOUT,
+          validadores: Optional[CacheValidadores] = None) -> Respuesta:
+    """GET simple; nunca lanza por códigos HTTP, sólo por errores de red.
+
+    Con `validadores` la petición es condicional; un 304 vuelve con
+    `html=""` y `sin_cambios=True`.
+    """
+    headers = {"Accept-Language": "es-MX,es;q=0.9"}
+    if ident:
+        headers.update(ident.headers())
+    if validadores is not None:
+        headers.update(validadores.cabeceras(url))
+    req = urllib.request.Request(url, headers=headers)
+    t0 = time.monotonic()
+    try:
+        with _opener(ident).open(req, timeout=timeout) as r:
+            status, body, hdrs = r.status, r.read(), r.headers
+    except urllib.error.HTTPError as e:
+        status, body, hdrs = e.code, e.read(), e.headers
+    html = body.decode("utf-8", errors="replace")
+    bloqueado = looks_blocked(html, status)
+    sin_cambios = (validadores is not None and not bloqueado
+                   and validadores.registrar(url, status, hdrs, body))
+    return Respuesta(url, status, html, time.monotonic() - t0,
+                     bloqueado=bloqueado, identidad=ident.ident_id if ident else "",
+                     sin_cambios=sin_cambios, bytes=len(body))
+
+
+def fetch_con_pool(pool: IdentityPool, url: str, intentos: int = 3,
+                   timeout: float = TIMEOUT, validadores: Optional[CacheValidadores] = None) -> Optional[Respuesta]:
+    """Descarga `url` rotando de identidad ante bloqueos o errores de red.
+
+    Devuelve la primera respuesta no bloqueada (puede ser un 404, un 304 o
+    un 429, que es del host y no se reintenta aquí) o None si ninguna
+    identidad sana logra descargarla.
+    """
+    usadas: set = set()
+    for _ in range(intentos):
+        ident = pool.adquirir_espera(excluir=usadas)
+        if ident is None:
+            return None
+        usadas.add(ident.ident_id)
+        t0 = time.monotonic()
+        try:
+            resp = fetch(url, ident, timeout, validadores)
+        except Exception:
+            pool.liberar(ident, ok=False, latencia=time.monotonic() - t0)
+            continue
+        if resp.limitado:                       # otra identidad chocaría con el mismo límite
+            pool.liberar(ident, ok=True, latencia=resp.latencia)
+            return resp
+        sana = not resp.bloqueado and resp.status < 500   # un 404 no es culpa de la identidad
+        pool.liberar(ident, ok=sana, latencia=resp.latencia, bloqueado=resp.bloqueado)
+        if sana:
+            return resp
+    return None
+
+
+# ─────────────────────────── DEMO ──────────────────────────
+def _demo(n: int = 300, cambian: int = 30):
+    """Cuatro corridas sobre las mismas fichas: en frío, sin cambios, con cambios, sin validadores."""
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+    from servidor_local import SitioSimulado, servidor_local
+
+    from canario import extraer_detalle
+    from servidor_local import html_detalle
+
+    t0 = time.perf_counter()
+    for p in range(50):
+        extraer_detalle(html_detalle(p))
+    t_parseo = (time.perf_counter() - t0) / 50
+    sitio = SitioSimulado()
+    cache = CacheValidadores()
+    pids = list(range(1000, 1000 + n))
+    with servidor_local(sitio) as base:
+        urls = [f"{base}/propiedades/clasificado/veclapin-departamento-en-zapopan-{p}.html" for p in pids]
+
+        def corrida(nombre: str):
+            cache.stats.clear()
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(8) as ex:
+                res = list(ex.map(lambda u: fetch(u, validadores=cache), urls))
+            a_parsear = 0
+            for r in res:
+                if r.ok and not r.sin_cambios:
+                    a_parsear += 1
+                    cache.confirmar(r.url)          # aquí iría el parseo
+            evitado = (len(res) - a_parsear) * t_parseo
+            print(f"{nombre:26} {time.perf_counter() - t0:5.2f}s · {a_parsear:>3} a parsear "
+                  f"(≈{evitado:.2f}s de bs4 evitados)\n{'':28}{cache.resumen()}")
+
+        corrida("1ª corrida (en frío)")
+        corrida("2ª corrida (sin cambios)")
+        for p in random.Random(0).sample(pids, cambian):
+            sitio.versiones[p] = sitio.versiones.get(p, 0) + 1
+        corrida(f"3ª ({cambian} fichas cambian)")
+        sitio.validadores = False
+        corrida("4ª (servidor sin ETag)")
+    print(f"servidor: {sitio.respuestas_304} respuestas 304 en total")
+
+
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    ap = argparse.ArgumentParser(description="Capa de descarga HTTP")
+    ap.add_argument("--demo", action="store_true", help="revalidación condicional contra servidor_local")
+    if ap.parse_args().demo:
+        _demo()
+    else:
+        ap.print_help()
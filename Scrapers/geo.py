@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice espacial en rejilla para “comparables a menos de R km” y agregados por zona.
+
+• Cada punto cae en una celda de `celda_km` de lado (proyección
+  equirectangular con latitud de referencia fija: error despreciable a
+  escala de una zona metropolitana).
+• `cercanos()` sólo revisa las celdas que cubren el radio y filtra por
+  distancia haversine: nada de comparaciones por pares.
+• `zona()` devuelve la celda como clave de zona estable entre corridas;
+  sustituye la agrupación por delegación que se hacía a mano en el notebook.
+
+    python geo.py data/inmuebles24/2025-06-01/reporte_detallado_2025-06-01.csv --zonas
+    python geo.py <csv> --cerca 20.67 -103.39 --radio 1.5
+"""
+
+from __future__ import annotations
+import math
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+R_TIERRA_KM = 6371.0088
+KM_POR_GRADO = 111.32
+CELDA_KM = 1.0
+LAT_REF = 20.0          # Guadalajara / Zapopan / CDMX rondan los 19–21°
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distancia en km; acepta escalares o arrays de numpy."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * R_TIERRA_KM * np.arcsin(np.sqrt(a))
+
+
+class GridIndex:
+    def __init__(self, celda_km: float = CELDA_KM, lat_ref: float = LAT_REF):
+        self.celda_km = celda_km
+        self.dlat = celda_km / KM_POR_GRADO
+        self.dlon = celda_km / (KM_POR_GRADO * math.cos(math.radians(lat_ref)))
+        self.celdas: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        self.ids: List[Hashable] = []
+        self.lat: List[float] = []
+        self.lon: List[float] = []
+        self._arr: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def celda(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.dlat), math.floor(lon / self.dlon)
+
+    def zona(self, lat: float, lon: float) -> str:
+        iy, ix = self.celda(lat, lon)
+        return f"g{self.celda_km:g}_{iy}_{ix}"
+
+    def zonas(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """`zona()` vectorizada; NaN → None."""
+        lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        ok = ~(np.isnan(lat) | np.isnan(lon))
+        out = np.full(lat.shape, None, dtype=object)
+        iy = np.floor(lat[ok] / self.dlat).astype(int)
+        ix = np.floor(lon[ok] / self.dlon).astype(int)
+        out[ok] = [f"g{self.celda_km:g}_{a}_{b}" for a, b in zip(iy, ix)]
+        return out
+
+    # ─ carga
+    def agregar(self, ident: Hashable, lat: float, lon: float):
+        if lat is None or lon is None or lat != lat or lon != lon:
+            return
+        pos = len(self.ids)
+        self.ids.append(ident)
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.celdas[self.celda(lat, lon)].append(pos)
+        self._arr = None
+
+    @classmethod
+    def desde(cls, filas: Iterable[Tuple[Hashable, float, float]], **kwargs) -> "GridIndex":
+        idx = cls(**kwargs)
+        for ident, lat, lon in filas:
+            idx.agregar(ident, lat, lon)
+        return idx
+
+    @classmethod
+    def desde_frame(cls, df, id_col: Optional[str] = None, **kwargs) -> "GridIndex":
+        ids = df[id_col] if id_col else df.index
+        return cls.desde(zip(ids, df["lat"], df["lon"]), **kwargs)
+
+    # ─ consultas
+    def cercanos(self, lat: float, lon: float, radio_km: float) -> List[Tuple[Hashable, float]]:
+        """[(id, distancia_km)] dentro del radio, ordenados por distancia."""
+        iy, ix = self.celda(lat, lon)
+        ry = math.ceil(radio_km / self.celda_km)
+        # ancho real de una celda en km a esta latitud
+        rx = math.ceil(radio_km / (self.dlon * KM_POR_GRADO * math.cos(math.radians(lat))))
+        cand = [p for dy in range(-ry, ry + 1) for dx in range(-rx, rx + 1)
+                for p in self.celdas.get((iy + dy, ix + dx), ())]
+        if not cand:
+            return []
+        if self._arr is None:
+            self._arr = np.asarray(self.lat), np.asarray(self.lon)
+        c = np.asarray(cand)
+        d = haversine_km(lat, lon, self._arr[0][c], self._arr[1][c])
+        dentro = d <= radio_km
+        orden = np.argsort(d[dentro])
+        return [(self.ids[p], float(km)) for p, km in zip(c[dentro][orden], d[dentro][orden])]
+
+    def conteo_por_zona(self) -> Dict[str, int]:
+        return {f"g{self.celda_km:g}_{iy}_{ix}": len(ps) for (iy, ix), ps in self.celdas.items()}
+
+
+def agregados_por_zona(df, celda_km: float = CELDA_KM, valor: str = "precio_m2"):
+    """count / mediana / media de `valor` por celda (sin distancias por pares).
+
+    `df` necesita columnas lat, lon y `valor`; si `valor` es precio_m2 y no
+    existe se calcula como precio_valor / superficie_m2.
+    """
+    df = df.copy()
+    if "moneda" in df:                          # no mezclar MXN con USD
+        df = df[df["moneda"].isna() | (df["moneda"] == "MXN")]
+    if valor == "precio_m2" and "precio_m2" not in df:
+        df["precio_m2"] = df["precio_valor"] / df["superficie_m2"]
+    df["zona"] = GridIndex(celda_km).zonas(df["lat"], df["lon"])
+    return (df.dropna(subset=["zona", valor])
+              .groupby("zona")[valor].agg(["count", "median", "mean"])
+              .sort_values("count", ascending=False))
+
+
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    import pandas as pd
+    from normalizar import normalizar_frame
+
+    ap = argparse.ArgumentParser(description="Índice espacial de anuncios")
+    ap.add_argument("csv", help="CSV de detalles (con ubicacion_url o lat/lon)")
+    ap.add_argument("--celda", type=float, default=CELDA_KM, help="lado de la celda en km")
+    ap.add_argument("--zonas", action="store_true", help="agregados de precio/m² por celda")
+    ap.add_argument("--cerca", nargs=2, type=float, metavar=("LAT", "LON"))
+    ap.add_argument("--radio", type=float, default=1.0)
+    args = ap.parse_args()
+
+    df = pd.read_csv(args.csv)
+    if "lat" not in df:
+        df = normalizar_frame(df)
+    if args.zonas:
+        print(agregados_por_zona(df, args.celda).to_string())
+    if args.cerca:
+        idx = GridIndex.desde_frame(df, celda_km=args.celda)
+        for i, km in idx.cercanos(*args.cerca, args.radio)[:50]:
+            fila = df.loc[i]
+            print(f"{km:6.2f} km  {fila.get('precio', '')}  {fila.get('url', fila.get('url_fuente', ''))}")
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool de identidades (proxy + User-Agent + sesión) con salud y rotación automática.
+
+• Cada identidad lleva tasa de éxito (EWMA), latencia (EWMA) y nº de bloqueos.
+• `adquirir()` elige la identidad sana con mejor puntuación y menos carga,
+  respetando un máximo de peticiones simultáneas por identidad.
+• Un bloqueo manda la identidad a cuarentena con enfriamiento exponencial;
+  al volver estrena sesión (cookies/contexto nuevos).
+• Sirve igual para hilos (Selenium), asyncio (Playwright) y la capa HTTP.
+
+Proxies desde entorno:  PROXY_URLS="http://u:p@h1:8000,http://u:p@h2:8000"
+(se mantiene PROXY_URL por compatibilidad).
+
+Demo contra el sitio simulado:  python identidades.py --demo
+"""
+
+from __future__ import annotations
+import asyncio, itertools, os, threading, time, uuid
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+UAS_DEFAULT = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15",
+]
+
+ALPHA        = 0.2      # peso de la última observación en las EWMA
+COOLDOWN     = 300.0    # s de cuarentena tras el primer bloqueo
+COOLDOWN_MAX = 3_600.0
+MAX_EN_VUELO = 2        # peticiones simultáneas por identidad
+
+
+def _nueva_sesion() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+# ───────────────────── identidad ─────────────────────
+@dataclass
+class Identidad:
+    ident_id: str
+    user_agent: str
+    proxy: str = ""
+    sesion: str = field(default_factory=_nueva_sesion)
+    # ─ salud
+    usos: int = 0
+    exitos: int = 0
+    bloqueos: int = 0
+    bloqueos_seguidos: int = 0
+    tasa_exito: float = 1.0
+    latencia: float = 0.0
+    en_vuelo: int = 0
+    cuarentena_hasta: float = 0.0
+
+    def headers(self) -> Dict[str, str]:
+        return {"User-Agent": self.user_agent}
+
+    def en_cuarentena(self, ahora: float) -> bool:
+        return ahora < self.cuarentena_hasta
+
+    def puntuacion(self) -> float:
+        """Más alto = mejor candidata (éxito alto, latencia baja, poca carga)."""
+        return self.tasa_exito / (1.0 + self.latencia) / (1.0 + self.en_vuelo)
+
+
+# ───────────────────── pool ─────────────────────
+class IdentityPool:
+    def __init__(self, identidades: Iterable[Identidad], max_en_vuelo: int = MAX_EN_VUELO,
+                 cooldown: float = COOLDOWN, cooldown_max: float = COOLDOWN_MAX,
+                 reloj: Callable[[], float] = time.monotonic):
+        self.identidades: List[Identidad] = list(identidades)
+        if not self.identidades:
+            raise ValueError("El pool necesita al menos una identidad")
+        self.max_en_vuelo = max_en_vuelo
+        self.cooldown, self.cooldown_max = cooldown, cooldown_max
+        self.reloj = reloj
+        self._cond = threading.Condition(threading.RLock())
+
+    @classmethod
+    def from_env(cls, uas: Optional[List[str]] = None, **kwargs) -> "IdentityPool":
+        """Una identidad por cada par (proxy, UA); sin proxies, una por UA."""
+        raw = os.getenv("PROXY_URLS") or os.getenv("PROXY_URL", "")
+        proxies = [p.strip() for p in raw.split(",") if p.strip()] or [""]
+        pares = itertools.product(proxies, uas or UAS_DEFAULT)
+        return cls((Identidad(f"id{i}", ua, px) for i, (px, ua) in enumerate(pares)), **kwargs)
+
+    # ─ selección
+    def _elegir(self, excluir: Iterable[str]) -> Optional[Identidad]:
+        ahora = self.reloj()
+        libres = [i for i in self.identidades
+                  if not i.en_cuarentena(ahora) and i.en_vuelo < self.max_en_vuelo]
+        excluir = set(excluir)
+        preferidas = [i for i in libres if i.ident_id not in excluir] or libres
+        if not preferidas:
+            return None
+        ident = max(preferidas, key=Identidad.puntuacion)
+        ident.en_vuelo += 1
+        return ident
+
+    def _proxima_liberacion(self) -> float:
+        """Segundos hasta que alguna identidad salga de cuarentena (0 = ya hay sanas)."""
+        ahora = self.reloj()
+        if any(not i.en_cuarentena(ahora) for i in self.identidades):
+            return 0.0
+        return min(i.cuarentena_hasta for i in self.identidades) - ahora
+
+    def adquirir(self, excluir: Iterable[str] = ()) -> Optional[Identidad]:
+        """Reserva una identidad sana sin esperar; None si no hay ninguna libre."""
+        with self._cond:
+            return self._elegir(excluir)
+
+    def adquirir_espera(self, excluir: Iterable[str] = (), timeout: float = 60.0) -> Optional[Identidad]:
+        """Como `adquirir`, pero espera (hilos) a que se libere una identidad.
+
+        Devuelve None si todas siguen en cuarentena más allá de `timeout`.
+        """
+        limite = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                ident = self._elegir(excluir)
+                if ident:
+                    return ident
+                restante = limite - time.monotonic()
+                espera = self._proxima_liberacion()
+                if restante <= 0 or espera > restante:
+                    return None
+                self._cond.wait(min(restante, max(espera, 0.05)))
+
+    async def adquirir_async(self, excluir: Iterable[str] = (), timeout: float = 60.0) -> Optional[Identidad]:
+        """Versión asyncio de `adquirir_espera` (sondeo corto, no bloquea el loop)."""
+        limite = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                ident = self._elegir(excluir)
+                espera = self._proxima_liberacion() if ident is None else 0.0
+            if ident:
+                return ident
+            restante = limite - time.monotonic()
+            if restante <= 0 or espera > restante:
+                return None
+            await asyncio.sleep(min(restante, max(espera, 0.05)))
+
+    # ─ retroalimentación
+    def liberar(self, ident: Identidad, ok: bool, latencia: float = 0.0, bloqueado: bool = False):
+        """Devuelve la identidad al pool y actualiza su salud."""
+        with self._cond:
+            ident.en_vuelo = max(0, ident.en_vuelo - 1)
+            self.registrar(ident, ok, latencia, bloqueado)
+            self._cond.notify_all()
+
+    def soltar(self, ident: Identidad):
+        """Devuelve la reserva sin tocar la salud (p. ej. copia hedge cancelada)."""
+        with self._cond:
+            ident.en_vuelo = max(0, ident.en_vuelo - 1)
+            self._cond.notify_all()
+
+    def registrar(self, ident: Identidad, ok: bool, latencia: float = 0.0, bloqueado: bool = False):
+        """Actualiza la salud sin soltar la reserva (drivers de larga vida)."""
+        with self._cond:
+            ident.usos += 1
+            ident.tasa_exito += ALPHA * ((1.0 if ok else 0.0) - ident.tasa_exito)
+            if latencia:
+                ident.latencia = latencia if ident.usos == 1 else ident.latencia + ALPHA * (latencia - ident.latencia)
+            if ok:
+                ident.exitos += 1
+                ident.bloqueos_seguidos = 0
+            if bloqueado:
+                ident.bloqueos += 1
+                ident.bloqueos_seguidos += 1
+                pausa = min(self.cooldown * 2 ** (ident.bloqueos_seguidos - 1), self.cooldown_max)
+                ident.cuarentena_hasta = self.reloj() + pausa
+                ident.sesion = _nueva_sesion()          # vuelve con cookies limpias
+                print(f"⛔ {ident.ident_id} bloqueada → cuarentena {pausa:.0f}s")
+
+    def sanas(self) -> int:
+        ahora = self.reloj()
+        return sum(not i.en_cuarentena(ahora) for i in self.identidades)
+
+    def resumen(self) -> List[Dict[str, object]]:
+        ahora = self.reloj()
+        return [{
+            "id": i.ident_id, "proxy": i.proxy or "-", "usos": i.usos, "exitos": i.exitos,
+            "bloqueos": i.bloqueos, "tasa_exito": round(i.tasa_exito, 3),
+            "latencia_s": round(i.latencia, 3),
+            "cuarentena_s": round(max(0.0, i.cuarentena_hasta - ahora), 1),
+        } for i in self.identidades]
+
+
+# ─────────────────────────── DEMO ──────────────────────────
+def _demo():
+    from concurrent.futures import ThreadPoolExecutor
+    from fetch_http import fetch_con_pool
+    from servidor_local import servidor_local
+
+    uas = UAS_DEFAULT + ["Mozilla/5.0 BotDeshonrado/1.0"]
+    pool = IdentityPool((Identidad(f"id{n}", ua) for n, ua in enumerate(uas)),
+                        cooldown=1.0, max_en_vuelo=2)
+    with servidor_local(bloqueos={"BotDeshonrado": 2}, latencia=0.01) as base:
+        urls = [f"{base}/propiedades/clasificado/veclapin-depto-{n}.html" for n in range(40)]
+        with ThreadPoolExecutor(max_workers=6) as ex:
+            res = list(ex.map(lambda u: fetch_con_pool(pool, u), urls))
+    ok = sum(1 for r in res if r and r.ok)
+    print(f"✔︎ {ok}/{len(urls)} páginas descargadas")
+    for fila in pool.resumen():
+        print("  ", fila)
+
+
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    ap = argparse.ArgumentParser(description="Pool de identidades")
+    ap.add_argument("--demo", action="store_true", help="ejecuta contra el sitio simulado local")
+    if ap.parse_args().demo:
+        _demo()
+    else:
+        for fila in IdentityPool.from_env().resumen():
+            print(fila)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Etapa común de ingesta de detalles, compartida por todos los scrapers:
+
+    DataFrame crudo → normalizar_frame → cluster_id (duplicados.py)
+                    → zona / precio_m2 / deal_score (estadisticas.py)
+                    → índice de texto completo (busqueda.py)
+
+El estado incremental (firmas MinHash y agregados por zona) vive en
+`base_dir` y se persiste con `guardar()` al terminar la corrida; el índice
+de texto se confirma en cada lote.
+"""
+
+from __future__ import annotations
+import datetime as dt
+from pathlib import Path
+from typing import Optional, Union
+
+from busqueda import IndiceTexto
+from duplicados import Deduplicador
+from estadisticas import StatsEngine
+from normalizar import normalizar_frame
+
+
+class Ingesta:
+    def __init__(self, base_dir: Union[str, Path]):
+        self.base_dir = Path(base_dir)
+        self.dedup = Deduplicador.cargar(self.base_dir)
+        self.stats = StatsEngine.cargar(self.base_dir)
+        self.texto = IndiceTexto.abrir(self.base_dir)
+
+    def procesar(self, df, fecha: Optional[str] = None):
+        """Columnas numéricas + cluster_id + deal score; no modifica `df`."""
+        if df.empty:
+            return df
+        out = self.stats.ingestar(self.dedup.asignar_frame(normalizar_frame(df)))
+        self.texto.agregar_frame(out, fecha or dt.date.today().isoformat())
+        return out
+
+    def guardar(self):
+        self.dedup.guardar(self.base_dir)
+        self.stats.guardar(self.base_dir)
@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API importable de los scrapers de Inmuebles24: registros en streaming, sin
+pasar por CSV.
+
+Los scripts escriben CSV y los servicios que los consumen tienen que esperar
+a que termine la corrida para leerlos de vuelta.  Aquí la misma lógica se
+expone como biblioteca:
+
+• Parsers puros HTML → datos (antes repetidos dentro de cada script):
+  `scrape_page_source` (tarjetas de listado, de 1.1), `scrape_property_detail`
+  (campos fijos de la ficha, de 1.2), `parse_static` y `scrape_tabs` (de o3).
+  `parse_detail` los combina en un `PropertyRecord` con pestañas en `extra`.
+• `iter_listings(busqueda)` descarga página por página y entrega cada
+  `ListingRecord` en cuanto se parsea; `iter_details(urls)` hace lo propio
+  con las fichas.
+• `aiter_details(urls, concurrencia=N)` es la versión asíncrona: N descargas
+  en vuelo y cada `PropertyRecord` sale en orden de llegada.  `urls` puede ser
+  una lista, un iterable perezoso (p. ej. `iter_listings`, que se avanza en un
+  hilo para no bloquear el loop) o un iterable asíncrono.
+• Descargadores enchufables: cualquier callable `url → html | None` (o una
+  corrutina, en `aiter_details`).  `None` = falló; `""` = sin cambios desde
+  la última vez (no se entrega registro).  Por defecto `DescargaHTTP`
+  (fetch_http con pool de identidades y validadores); `DescargaPlaywright(ctx)`
+  hace clic en las pestañas dinámicas.  Si el descargador tiene
+  `confirmar(url)`, se llama cuando el consumidor ya tomó el registro (pidió
+  el siguiente), para que una ficha no procesada no quede "sin cambios".
+• Destinos enchufables: objetos con `escribir(registro)` y, opcional,
+  `cerrar()`, o un callable.  `DestinoCSV` y `DestinoIngesta` (normaliza +
+  duplicados + stats + FeatureStore, por lotes).  Se cierran al agotar o
+  abandonar el iterador.
+
+    from busquedas import Busqueda
+    from inmuebles24 import aiter_details, iter_listings
+
+    for tarjeta in iter_listings(Busqueda("zapopan"), paginas=2):
+        print(tarjeta.precio, tarjeta.url)
+
+    async for ficha in aiter_details(t.url for t in iter_listings(Busqueda("zapopan"))):
+        procesar(ficha)                 # primera ficha sin esperar al listado completo
+
+    python inmuebles24.py --demo        # tiempo al primer registro vs CSV ida y vuelta
+"""
+
+from __future__ import annotations
+import asyncio, csv, inspect, re
+from collections import Counter
+from pathlib import Path
+from typing import (Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator,
+                    List, Optional, Sequence, Union)
+
+from bs4 import BeautifulSoup
+
+from busquedas import Busqueda
+from canario import SELECTORES, MonitorLlenado, extraer_detalle
+from caracteristicas import clean_label
+from fetch_http import TIMEOUT, CacheValidadores, fetch_con_pool, looks_blocked
+from identidades import IdentityPool
+from registros import ListingRecord, PropertyRecord, listing_id, to_frame
+
+BASE_URL = "https://www.inmuebles24.com"
+CONCURRENCIA = 4              # descargas de detalle en vuelo en aiter_details
+
+Descarga = Callable[[str], Optional[str]]
+DescargaAsync = Callable[[str], Awaitable[Optional[str]]]
+Destino = Union[Callable[[Any], None], Any]          # callable o con .escribir()/.cerrar()
+
+
+# ───────────────────── parsers (HTML → datos) ─────────────────────
+def scrape_page_source(html: str, operacion: str = "venta", conjunto: str = "principal",
+                       base_url: str = BASE_URL) -> List[ListingRecord]:
+    """Un `ListingRecord` por tarjeta del listado, con la url absoluta."""
+    sel = SELECTORES[conjunto]["listado"]
+    soup = BeautifulSoup(html, "html.parser")
+    records = []
+    for card in soup.select(sel["_tarjeta"]):
+        d: Dict[str, str] = {"tipo": operacion}
+        a = card.select_one(sel["url"].partition("@")[0])
+        if a:
+            d["nombre"] = d["descripcion"] = a.get_text(strip=True)
+            d["url"] = base_url.rstrip("/") + a.get("href", "")
+        precio = card.select_one(sel["precio"])
+        if precio:
+            d["precio"] = precio.get_text(strip=True)
+        direccion, ubicacion = card.select_one(sel["direccion"]), card.select_one(sel["ubicacion"])
+        d["ubicacion"] = ", ".join(t for t in (direccion and direccion.get_text(strip=True),
+                                               ubicacion and ubicacion.get_text(strip=True)) if t)
+        features = card.select_one(sel["features"])
+        if features:
+            for sp in features.find_all("span"):
+                txt = sp.get_text(strip=True).lower()
+                if "rec" in txt:
+                    d["habitaciones"] = txt
+                if "bañ" in txt:
+                    d["baños"] = txt
+        records.append(ListingRecord.from_dict(d))
+    return records
+
+
+_ICONOS = {
+    "icon-stotal": "area_total", "icon-scubierta": "area_cubierta", "icon-bano": "banos_icon",
+    "icon-cochera": "estacionamientos_icon", "icon-dormitorio": "recamaras_icon",
+    "icon-toilete": "medio_banos_icon", "icon-antiguedad": "antiguedad_icon",
+}
+
+
+def _texto(nodo, *, sep: str = "") -> str:
+    return nodo.get_text(sep, strip=True) if nodo else ""
+
+
+def _numero(token: str) -> str:
+    m = re.search(r"(\d+)", token)
+    return m.group(1) if m else ""
+
+
+def scrape_property_detail(html: str) -> Dict[str, str]:
+    """Campos fijos de la ficha (los de `PropertyRecord` salvo url); "" si falta alguno."""
+    soup = BeautifulSoup(html, "html.parser")
+    data: Dict[str, str] = {}
+
+    # tipo · área · recámaras · estacionamientos
+    h2 = soup.find("h2", class_="title-type-sup-property")
+    tokens = [t.strip() for t in h2.get_text(separator="·").split("·") if t.strip()] if h2 else []
+    tokens += [""] * (4 - len(tokens))
+    data["tipo_propiedad"], data["area_m2"] = tokens[0], tokens[1]
+    data["recamaras"], data["estacionamientos"] = _numero(tokens[2]), _numero(tokens[3])
+
+    # operación, precio y mantenimiento
+    precio = soup.select_one("div.price-container-property div.price-value")
+    texto = _texto(precio, sep=" ").lower()
+    data["operacion"] = "venta" if "venta" in texto else "renta" if "renta" in texto else ""
+    data["precio"] = _texto(precio.find("span")) if precio else ""
+    data["mantenimiento"] = _texto(soup.select_one("div.price-container-property div.price-extra span.price-expenses"))
+
+    data["direccion"] = _texto(soup.select_one("div.section-location-property h4"))
+    img = soup.select_one("div.static-map-container img#static-map")
+    url = img.get("src", "") if img else ""
+    data["ubicacion_url"] = "https:" + url if url.startswith("//") else url
+
+    data["titulo"] = _texto(soup.find("h1", class_="title-property"))
+    data["descripcion"] = _texto(soup.select_one("section.article-section-description div#longDescription"), sep=" ")
+    data["anunciante"] = _texto(soup.find("h3", attrs={"data-qa": "linkMicrositioAnunciante"}))
+
+    data["codigo_anunciante"] = data["codigo_inmuebles24"] = ""
+    for li in soup.select("section#reactPublisherCodes li"):
+        texto = li.get_text(" ", strip=True)
+        valor = texto.split(":", 1)[1].strip() if ":" in texto else ""
+        if "Cód. del anunciante" in texto:
+            data["codigo_anunciante"] = valor
+        elif "Cód. Inmuebles24" in texto:
+            data["codigo_inmuebles24"] = valor
+
+    data["tiempo_publicacion"] = _texto(soup.select_one("div#user-views p"))
+
+    for campo in _ICONOS.values():
+        data[campo] = ""
+    for li in soup.select("ul#section-icon-features-property li.icon-feature"):
+        icon = li.find("i")
+        campo = next((_ICONOS[c] for c in (icon.get("class", []) if icon else []) if c in _ICONOS), None)
+        if campo:
+            data[campo] = re.sub(r"\s+", " ", li.get_text(" ", strip=True)).strip()
+    return data
+
+
+def parse_static(html: str, conjunto: str = "principal") -> Dict[str, str]:
+    """Extrae los campos *no dinámicos* de la página de propiedad con el juego de selectores dado."""
+    out = extraer_detalle(html, conjunto)
+    out.pop("subtitulo", None)
+    out.pop("pestanas", None)
+    return out
+
+
+def scrape_tabs(page_html: str) -> Dict[str, List[str]]:
+    """Devuelve las features de las pestañas ‘Características’, ‘Servicios’, ‘Amenidades’…"""
+    soup, info = BeautifulSoup(page_html, "html.parser"), {}
+    nav = soup.select_one("#reactGeneralFeatures")
+    if not nav:
+        return info
+
+    for btn in nav.select("button[role='tab']"):
+        label = btn.get_text(strip=True).lower()
+        panel = btn.find_next("div", attrs={"role": "tabpanel"})
+        if not label or not panel:
+            continue
+        feats = [
+            re.sub(r"\s+", " ", t.get_text(" ", strip=True))
+            for t in panel.find_all(["span", "li", "p"])
+            if t.get_text(strip=True)
+        ]
+        info[clean_label(label)] = feats
+    return info
+
+
+def parse_detail(html: str, url: str = "", conjunto: str = "principal") -> PropertyRecord:
+    """Ficha completa: campos fijos + pestañas en `extra`.
+
+    Con un juego distinto del principal (el canario cayó al respaldo) sus
+    selectores rellenan los campos que el parser fijo dejó vacíos.
+    """
+    data = scrape_property_detail(html)
+    if conjunto != "principal":
+        for k, v in parse_static(html, conjunto).items():
+            if v and not data.get(k):
+                data[k] = v
+    data["url"] = url
+    return PropertyRecord.from_dict(data, extra=scrape_tabs(html))
+
+
+# ───────────────────── descargadores ─────────────────────
+class DescargaHTTP:
+    """urllib con rotación de identidades; con `validadores`, las fichas sin cambios vuelven "".
+
+    `stats` cuenta ok / sin_cambios / fallos de la corrida.
+    """
+
+    def __init__(self, pool: Optional[IdentityPool] = None, validadores: Optional[CacheValidadores] = None,
+                 intentos: int = 3, timeout: float = TIMEOUT):
+        self.pool = pool or IdentityPool.from_env()
+        self.validadores = validadores
+        self.intentos, self.timeout = intentos, timeout
+        self.stats: Counter = Counter()
+
+    def __call__(self, url: str) -> Optional[str]:
+        resp = fetch_con_pool(self.pool, url, self.intentos, self.timeout, self.validadores)
+        if resp is not None and resp.sin_cambios:
+            self.stats["sin_cambios"] += 1
+            return ""
+        if resp is None or not resp.ok:
+            self.stats["fallos"] += 1
+            return None
+        self.stats["ok"] += 1
+        return resp.html
+
+    def confirmar(self, url: str):
+        """Los iteradores avisan cuando el consumidor ya tomó el registro de `url`."""
+        if self.validadores is not None:
+            self.validadores.confirmar(url)
+
+
+class DescargaPlaywright:
+    """Fichas con Playwright: abre una pestaña del contexto, hace clic en cada pestaña dinámica y devuelve el HTML."""
+
+    def __init__(self, ctx, conjunto: str = "principal", timeout_ms: int = 45_000):
+        self.ctx, self.conjunto, self.timeout_ms = ctx, conjunto, timeout_ms
+
+    async def __call__(self, url: str) -> Optional[str]:
+        page = await self.ctx.new_page()
+        try:
+            await page.goto(url, timeout=self.timeout_ms)
+            if looks_blocked(await page.content()):
+                return None
+            await page.wait_for_selector(SELECTORES[self.conjunto]["detalle"]["subtitulo"], timeout=25_000)
+            for tab in await page.query_selector_all(SELECTORES[self.conjunto]["detalle"]["pestanas"]):
+                try:
+                    await tab.click(timeout=2_500)
+                    await asyncio.sleep(0.25)
+                except Exception:
+                    pass
+            return await page.content()
+        finally:
+            await page.close()
+
+
+def _es_async(f: Callable) -> bool:
+    return inspect.iscoroutinefunction(f) or inspect.iscoroutinefunction(getattr(f, "__call__", None))
+
+
+# ───────────────────── destinos ─────────────────────
+class DestinoCSV:
+    """Agrega cada registro como fila (sólo columnas fijas; las pestañas van a `DestinoIngesta`)."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._fh = None
+        self._w: Optional[csv.DictWriter] = None
+
+    def escribir(self, registro: Union[ListingRecord, PropertyRecord]):
+        if self._w is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            nuevo = not self.path.exists()
+            self._fh = self.path.open("a", encoding="utf-8", newline="")
+            self._w = csv.DictWriter(self._fh, fieldnames=type(registro).CAMPOS, extrasaction="ignore")
+            if nuevo:
+                self._w.writeheader()
+        self._w.writerow({c: getattr(registro, c) for c in type(registro).CAMPOS})
+
+    def cerrar(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = self._w = None
+
+
+class DestinoIngesta:
+    """Fichas → Ingesta (normalizar, duplicados, deal score, índice de texto) y FeatureStore, por lotes."""
+
+    def __init__(self, data_dir: Union[str, Path], fecha: Optional[str] = None, lote: int = 200):
+        from caracteristicas import FeatureStore
+        from ingesta import Ingesta                 # arrastra pandas: sólo si se usa
+        self.ingesta, self.store = Ingesta(data_dir), FeatureStore(data_dir)
+        self.fecha, self.lote = fecha, lote
+        self._buf: List[PropertyRecord] = []
+        self.procesados = 0
+
+    def escribir(self, registro: PropertyRecord):
+        self.store.agregar(listing_id(registro.url), registro.extra)
+        self._buf.append(registro)
+        if len(self._buf) >= self.lote:
+            self._vaciar()
+
+    def _vaciar(self):
+        if self._buf:
+            self.ingesta.procesar(to_frame(self._buf, incluir_extra=False), self.fecha)
+            self.procesados += len(self._buf)
+            self._buf = []
+
+    def cerrar(self):
+        self._vaciar()
+        self.store.flush(self.fecha)
+        self.ingesta.guardar()
+
+
+class _Destinos:
+    def __init__(self, destinos: Iterable[Destino]):
+        self.escribir: List[Callable[[Any], None]] = []
+        self.cerrar: List[Callable[[], None]] = []
+        for d in destinos:
+            self.escribir.append(d.escribir if hasattr(d, "escribir") else d)
+            if hasattr(d, "cerrar"):
+                self.cerrar.append(d.cerrar)
+
+    def __call__(self, registro):
+        for f in self.escribir:
+            f(registro)
+
+    def cerrar_todos(self):
+        for f in self.cerrar:
+            f()
+
+
+# ───────────────────── iteradores ─────────────────────
+def iter_listings(busqueda: Union[Busqueda, Iterable[Busqueda]], paginas: Optional[int] = None,
+                  descarga: Optional[Descarga] = None, base_url: Optional[str] = None,
+                  conjunto: str = "principal", destinos: Sequence[Destino] = ()) -> Iterator[ListingRecord]:
+    """Tarjetas de una o varias búsquedas, página por página, conforme se parsean.
+
+    Una página que no se pudo descargar se salta; una página sin tarjetas
+    termina esa búsqueda (se acabaron los resultados).
+    """
+    busquedas = [busqueda] if isinstance(busqueda, Busqueda) else list(busqueda)
+    descarga = descarga or DescargaHTTP()
+    salida = _Destinos(destinos)
+    try:
+        for b in busquedas:
+            for i in range(1, (paginas or b.paginas) + 1):
+                html = descarga(b.url_listado(i, base_url))
+                if not html:
+                    continue
+                tarjetas = scrape_page_source(html, b.operacion, conjunto, b.base(base_url))
+                if not tarjetas:
+                    break
+                for t in tarjetas:
+                    salida(t)
+                    yield t
+    finally:
+        salida.cerrar_todos()
+
+
+def _confirmador(descarga: Callable) -> Callable[[str], None]:
+    """`descarga.confirmar(url)` si el descargador lleva validadores; si no, nada."""
+    return getattr(descarga, "confirmar", None) or (lambda url: None)
+
+
+def _observar(monitor: Optional[MonitorLlenado], rec: Optional[PropertyRecord]):
+    if monitor is not None:
+        monitor.observar(rec.to_dict() if rec else None)    # ExtraccionDegradada sale al consumidor
+
+
+def iter_details(urls: Iterable[str], descarga: Optional[Descarga] = None, conjunto: str = "principal",
+                 destinos: Sequence[Destino] = (), monitor: Optional[MonitorLlenado] = None) -> Iterator[PropertyRecord]:
+    """Fichas una a una, en el orden de `urls` (sin repetir)."""
+    descarga = descarga or DescargaHTTP()
+    confirmar = _confirmador(descarga)
+    salida, vistas = _Destinos(destinos), set()
+    try:
+        for u in urls:
+            if not u or u in vistas:
+                continue
+            vistas.add(u)
+            html = descarga(u)
+            if html == "":
+                continue
+            rec = parse_detail(html, u, conjunto) if html else None
+            _observar(monitor, rec)
+            if rec is not None:
+                salida(rec)
+                yield rec
+                confirmar(u)                # el consumidor pidió el siguiente: ya procesó éste
+    finally:
+        salida.cerrar_todos()
+
+
+async def _aiter_urls(urls: Union[Iterable[str], AsyncIterable[str]]) -> AsyncIterator[str]:
+    if hasattr(urls, "__aiter__"):
+        async for u in urls:
+            yield u
+    elif isinstance(urls, (list, tuple, set, frozenset)):
+        for u in urls:
+            yield u
+    else:                                   # generador perezoso (p. ej. iter_listings): avanza en un hilo
+        it, fin = iter(urls), object()
+        while (u := await asyncio.to_thread(next, it, fin)) is not fin:
+            yield u
+
+
+async def aiter_details(urls: Union[Iterable[str], AsyncIterable[str]],
+                        descarga: Union[Descarga, DescargaAsync, None] = None,
+                        concurrencia: int = CONCURRENCIA, conjunto: str = "principal",
+                        destinos: Sequence[Destino] = (),
+                        monitor: Optional[MonitorLlenado] = None) -> AsyncIterator[PropertyRecord]:
+    """Fichas con `concurrencia` descargas en vuelo, entregadas en orden de llegada.
+
+    Un descargador síncrono corre (con el parseo) en `asyncio.to_thread`;
+    uno asíncrono se espera en el loop.  Si el consumidor deja de iterar, las
+    descargas pendientes se cancelan y los destinos se cierran.
+    """
+    descarga = descarga or DescargaHTTP()
+    asincrona, confirmar = _es_async(descarga), _confirmador(descarga)
+    salida = _Destinos(destinos)
+    pendientes: asyncio.Queue = asyncio.Queue(maxsize=concurrencia * 2)
+    listos: asyncio.Queue = asyncio.Queue()
+    FIN = object()
+
+    def parsear(html: Optional[str], u: str) -> Union[PropertyRecord, str, None]:
+        return parse_detail(html, u, conjunto) if html else html        # None / "" pasan tal cual
+
+    async def ficha(u: str) -> Union[PropertyRecord, str, None]:
+        if asincrona:
+            return parsear(await descarga(u), u)
+        return await asyncio.to_thread(lambda: parsear(descarga(u), u))
+
+    async def productor():
+        vistas, cancelado = set(), False
+        try:
+            async for u in _aiter_urls(urls):
+                if u and u not in vistas:
+                    vistas.add(u)
+                    await pendientes.put(u)
+        except asyncio.CancelledError:
+            cancelado = True                        # el consumidor se fue: nadie vaciaría la cola
+            raise
+        finally:
+            if not cancelado:                       # fin normal o error de `urls`: avisar a los trabajadores
+                for _ in range(concurrencia):
+                    await pendientes.put(FIN)
+
+    async def trabajador():
+        try:
+            while (u := await pendientes.get()) is not FIN:
+                try:
+                    rec = await ficha(u)
+                except Exception as e:
+                    print(f"⚠️  detalle falló: {e!r}  {u}")
+                    rec = None
+                await listos.put(rec)
+        finally:
+            await listos.put(FIN)
+
+    tareas = [asyncio.create_task(productor())] + [asyncio.create_task(trabajador()) for _ in range(concurrencia)]
+    try:
+        activos = concurrencia
+        while activos:
+            rec = await listos.get()
+            if rec is FIN:
+                activos -= 1
+                continue
+            if isinstance(rec, str):
+                continue                            # "": sin cambios desde la última descarga
+            _observar(monitor, rec)
+            if rec is not None:
+                salida(rec)
+                yield rec
+                confirmar(rec.url)
+        await tareas[0]                             # errores del iterable de urls
+    finally:
+        for t in tareas:
+            t.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        salida.cerrar_todos()
+
+
+# ─────────────────────────── DEMO ──────────────────────────
+def _demo(paginas: int = 8, latencia: float = 0.03, concurrencia: int = 8):
+    """Tiempo al primer registro y total: CSV ida y vuelta vs iteradores en streaming."""
+    import tempfile, time
+    from servidor_local import CARDS_POR_PAGINA, SitioSimulado, servidor_local
+
+    def lector(path: Path) -> Iterator[Dict[str, str]]:
+        with path.open(encoding="utf-8", newline="") as fh:
+            yield from csv.DictReader(fh)
+
+    busqueda = Busqueda("zapopan", paginas=paginas)
+    print(f"{paginas} páginas × {CARDS_POR_PAGINA} anuncios, latencia {latencia * 1000:.0f} ms/petición, "
+          f"concurrencia {concurrencia}\n")
+    with servidor_local(SitioSimulado(paginas=paginas, latencia=latencia)) as base, \
+            tempfile.TemporaryDirectory() as tmp:
+        # 1) como los scripts: listados → CSV → detalles → CSV → el consumidor lee el archivo
+        t0 = time.perf_counter()
+        csv_a, csv_b = Path(tmp) / "listados.csv", Path(tmp) / "detalles.csv"
+        for _ in iter_listings(busqueda, base_url=base, destinos=[DestinoCSV(csv_a)]):
+            pass
+
+        async def a_disco():
+            async for _ in aiter_details([f["url"] for f in lector(csv_a)], concurrencia=concurrencia,
+                                         destinos=[DestinoCSV(csv_b)]):
+                pass
+        asyncio.run(a_disco())
+        primero, n = None, 0
+        for _ in lector(csv_b):
+            primero = primero or time.perf_counter() - t0
+            n += 1
+        print(f"{'CSV ida y vuelta':22} primer registro {primero:6.2f} s   {n} fichas en {time.perf_counter() - t0:5.2f} s")
+
+        # 2) streaming: las fichas empiezan a salir mientras el listado sigue avanzando
+        async def streaming():
+            t0 = time.perf_counter()
+            primero, n = None, 0
+            async for _ in aiter_details((t.url for t in iter_listings(busqueda, base_url=base)),
+                                         concurrencia=concurrencia):
+                primero = primero or time.perf_counter() - t0
+                n += 1
+            print(f"{'aiter_details(iter_…)':22} primer registro {primero:6.2f} s   {n} fichas en {time.perf_counter() - t0:5.2f} s")
+        asyncio.run(streaming())
+
+
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    ap = argparse.ArgumentParser(description="API en streaming de los scrapers de Inmuebles24")
+    ap.add_argument("--demo", action="store_true", help="compara contra servidor_local el CSV ida y vuelta")
+    ap.add_argument("--paginas", type=int, default=8)
+    ap.add_argument("--latencia", type=float, default=0.03, help="segundos por petición en el servidor simulado")
+    args = ap.parse_args()
+    if args.demo:
+        _demo(args.paginas, args.latencia)
+    else:
+        ap.print_help()
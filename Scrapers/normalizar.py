@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Normalización de campos de texto a valores numéricos.
+
+    "MN 1,500,000"                                 → precio_valor=1500000, moneda="MXN"
+    "80 m² tot."                                   → superficie_m2=80.0
+    "//maps.googleapis.com/…?center=20.67,-103.39" → lat=20.67, lon=-103.39
+
+`normalizar_frame(df)` añade estas columnas numéricas a un DataFrame de
+detalles sin tocar las originales (los CSV conservan el texto crudo).
+"""
+
+from __future__ import annotations
+import re, unicodedata
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+COLUMNAS = ("precio_valor", "moneda", "superficie_m2", "recamaras_n", "lat", "lon")   # las que añade normalizar()
+MONEDAS = {"MN": "MXN", "MXN": "MXN", "$": "MXN", "USD": "USD", "US$": "USD", "U$S": "USD"}
+
+_RE_NUM    = re.compile(r"\d[\d,.]*")
+_RE_COORD  = re.compile(r"(-?\d{1,3}\.\d+)\s*,\s*(-?\d{1,3}\.\d+)")
+_RE_AREA   = re.compile(r"(\d[\d,.]*)\s*m(?:²|2)", re.I)
+_RE_MARCAS = re.compile("[\u0300-\u036f]")       # diacríticos combinantes tras NFKD
+_RE_ESPACIOS = re.compile(r"\s+")
+
+
+def plegar(texto: str) -> str:
+    """'  Gimnásio  Techado' → 'gimnasio techado' (sin acentos, minúsculas, espacios simples)."""
+    t = texto if texto.isascii() else _RE_MARCAS.sub("", unicodedata.normalize("NFKD", texto))
+    return _RE_ESPACIOS.sub(" ", t).strip().lower()
+
+
+def _num(txt: str) -> Optional[float]:
+    m = _RE_NUM.search(txt or "")
+    if not m:
+        return None
+    s = m.group().rstrip(".,")
+    if s.count(",") and s.count("."):          # 1,234.56
+        s = s.replace(",", "")
+    elif s.count(",") == 1 and len(s.split(",")[1]) != 3:
+        s = s.replace(",", ".")                # 12,5
+    else:
+        s = s.replace(",", "")
+    try:
+        return float(s)
+    except ValueError:
+        return None
+
+
+def parse_precio(txt: Any) -> Tuple[Optional[float], Optional[str]]:
+    """'USD 250,000' → (250000.0, 'USD'). Sin moneda explícita se asume MXN."""
+    if not isinstance(txt, str) or not txt.strip():
+        return None, None
+    valor = _num(txt)
+    if valor is None:
+        return None, None
+    prefijo = txt.strip().split()[0].upper() if txt.strip() else ""
+    moneda = next((v for k, v in MONEDAS.items() if prefijo.startswith(k)), "MXN")
+    return valor, moneda
+
+
+def parse_area(txt: Any) -> Optional[float]:
+    """'80 m² tot.' / '120m2' → 80.0 / 120.0"""
+    if not isinstance(txt, str):
+        return None
+    m = _RE_AREA.search(txt)
+    return _num(m.group(1)) if m else None
+
+
+def parse_entero(txt: Any) -> Optional[int]:
+    if isinstance(txt, (int, float)) and txt == txt:
+        return int(txt)
+    m = re.search(r"\d+", txt) if isinstance(txt, str) else None
+    return int(m.group()) if m else None
+
+
+def parse_coords(url: Any) -> Tuple[Optional[float], Optional[float]]:
+    """Lat/lon del src del mapa estático (`center=` o, si falta, `markers=`)."""
+    if not isinstance(url, str) or not url:
+        return None, None
+    if url.startswith("//"):
+        url = "https:" + url
+    qs = parse_qs(urlparse(url).query)
+    for campo in ("center", "markers", "latlng", "q"):
+        for valor in qs.get(campo, []):
+            m = _RE_COORD.search(unquote(valor))
+            if m:
+                lat, lon = float(m.group(1)), float(m.group(2))
+                if -90 <= lat <= 90 and -180 <= lon <= 180 and (lat, lon) != (0.0, 0.0):
+                    return lat, lon
+    return None, None
+
+
+# ───────────────────── registro / DataFrame ─────────────────────
+def normalizar(d: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos numéricos derivados de un registro de detalle (dict)."""
+    precio, moneda = parse_precio(d.get("precio"))
+    lat, lon = parse_coords(d.get("ubicacion_url"))
+    area = parse_area(d.get("area_total")) or parse_area(d.get("area_m2")) or parse_area(d.get("area_cubierta"))
+    return {
+        "precio_valor": precio,
+        "moneda": moneda,
+        "superficie_m2": area,
+        "recamaras_n": parse_entero(d.get("recamaras") or d.get("recamaras_icon") or d.get("habitaciones")),
+        "lat": lat,
+        "lon": lon,
+    }
+
+
+def normalizar_frame(df):
+    """Añade precio_valor, moneda, superficie_m2, recamaras_n, lat, lon."""
+    import pandas as pd
+    if df.empty:
+        return df
+    extra = pd.DataFrame([normalizar(r) for r in df.to_dict("records")], index=df.index)
+    return df.drop(columns=[c for c in extra.columns if c in df.columns]).join(extra)
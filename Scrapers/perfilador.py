@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Perfilador por muestreo, opcional en cualquier punto de entrada.
+
+Un hilo aparte toma `sys._current_frames()` cada `intervalo` segundos y
+cuenta las pilas de todos los hilos (Selenium, Playwright/asyncio, hilos de
+`to_thread` del planificador).  No instrumenta nada, así que el costo es el
+de leer unas pilas por muestra (<1 % con el intervalo por defecto; el reporte
+lo mide).  Al terminar escribe:
+
+• `<prefijo>.folded` — pilas colapsadas (`etapa;mod:func;… N`), listas para
+  flamegraph.pl, speedscope o inferno.
+• `<prefijo>.txt`    — muestras por etapa y por biblioteca (bs4, regex,
+  pandas, driver/red, sqlite, espera) y el top-N de funciones, por tiempo
+  propio e inclusivo, etiquetadas con su etapa.
+
+La etapa de una muestra es la del marco más interno cuya función esté en
+`ETAPAS` (por nombre: parse_static → parseo, normalizar_frame →
+normalizacion, to_csv → escritura…) o decorada con `@etapa("nombre")`.  La
+biblioteca es la del marco más interno que caiga en una de `BIBLIOTECAS`
+(`espera` y `asyncio` sólo cuentan si son la hoja).
+Son muestras de reloj: lo que está en `espera`/`red` es E/S, no CPU; el
+resto es CPU atribuible.  Las llamadas a patrones regex ya compilados
+corren en C y se cargan a la función que las hace.  Los procesos hijos
+(consolidar.py con `--procesos` > 1) no se muestrean: usar `--procesos 1`.
+
+Cualquier script lo activa con:
+
+    python "3. ChatGPT o3.py" --pages 2 --profile                 # perfiles/<script>-<hora>.*
+    python consolidar.py data --profile=perfiles/consolida --profile-ms 2
+    python perfilador.py --demo                                  # costo y reporte de ejemplo
+"""
+
+from __future__ import annotations
+import atexit, datetime as dt, os, sys, threading, time
+from collections import Counter, defaultdict
+from pathlib import Path
+from types import CodeType
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+INTERVALO = 0.005          # segundos entre muestras
+MAX_PROFUNDIDAD = 128
+TOP = 25
+
+# función (co_name) → etapa del pipeline; el marco más interno que coincide gana
+ETAPAS: Dict[str, str] = {
+    # red / navegador
+    "fetch": "red", "fetch_con_pool": "red", "fetch_detail": "navegador", "scrape_detail": "navegador",
+    "scrape_property_details": "navegador", "scrape_property_detail": "navegador",
+    "extract_information_after_click": "navegador", "scrape_listing_urls": "listados",
+    "scrape_listing_page_urls": "listados", "run_listings": "listados", "scrape_page_source": "listados",
+    # extracción
+    "parse_static": "parseo", "scrape_tabs": "parseo", "extraer_detalle": "parseo",
+    "extraer_listado": "parseo", "urls_detalle": "parseo", "verificar": "canario",
+    # ingesta
+    "normalizar_frame": "normalizacion", "asignar_frame": "duplicados", "ingestar": "estadisticas",
+    "firma": "duplicados", "shingles": "duplicados", "plegar": "normalizacion",
+    "agregar_frame": "indice_texto", "buscar": "busqueda", "canonizar": "consolidacion", "procesar_archivo": "consolidacion",
+    # escritura
+    "to_csv": "escritura", "save": "escritura", "save_row": "escritura", "save_data": "escritura",
+    "flush": "escritura", "guardar": "escritura",
+}
+
+# biblioteca → fragmentos de ruta; se asigna la del marco más interno que coincide
+BIBLIOTECAS: List[Tuple[str, Tuple[str, ...]]] = [
+    ("espera", ("selectors.py", "threading.py", "queue.py", "concurrent/futures")),
+    ("bs4", ("/bs4/", "/soupsieve/", "html/parser.py", "_markupbase.py", "/lxml/")),
+    ("regex", ("/re/", "/re.py", "sre_compile.py", "sre_parse.py")),
+    ("pandas", ("/pandas/", "/numpy/")),
+    ("driver", ("/selenium/", "/seleniumbase/", "/playwright/", "/urllib3/", "/websockets/")),
+    ("red", ("/http/client.py", "/urllib/request.py", "socket.py", "ssl.py")),
+    ("sqlite", ("/sqlite3/",)),
+    ("asyncio", ("/asyncio/",)),
+]
+_SIN_CPU = {"espera", "red", "driver"}
+_SOLO_HOJA = {"espera", "asyncio"}
+
+_ETAPA_CODIGO: Dict[CodeType, str] = {}
+
+
+def etapa(nombre: str) -> Callable:
+    """Decorador: las muestras dentro de la función se cargan a `nombre`."""
+    def deco(fn):
+        _ETAPA_CODIGO[fn.__code__] = nombre
+        return fn
+    return deco
+
+
+def _normpath(p: str) -> str:
+    return p.replace(os.sep, "/")
+
+
+class Perfilador:
+    def __init__(self, intervalo: float = INTERVALO):
+        self.intervalo = intervalo
+        self.pilas: Counter = Counter()          # tupla de códigos (raíz → hoja) → muestras
+        self.muestras = 0
+        self.costo = 0.0                         # segundos dentro del muestreo
+        self.t0 = self.t1 = 0.0
+        self._alto = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._bib: Dict[CodeType, Optional[str]] = {}
+
+    # ─ muestreo
+    def iniciar(self) -> "Perfilador":
+        self.t0 = time.perf_counter()
+        self._hilo = threading.Thread(target=self._bucle, name="perfilador", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self) -> "Perfilador":
+        self._alto.set()
+        if self._hilo:
+            self._hilo.join()
+        self.t1 = time.perf_counter()
+        return self
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+    def _bucle(self) -> None:
+        yo = threading.get_ident()
+        prox = time.perf_counter()
+        while not self._alto.wait(max(0.0, prox - time.perf_counter())):
+            t = time.perf_counter()
+            for tid, f in sys._current_frames().items():
+                if tid == yo:
+                    continue
+                pila = []
+                while f is not None and len(pila) < MAX_PROFUNDIDAD:
+                    pila.append(f.f_code)
+                    f = f.f_back
+                pila.reverse()
+                self.pilas[tuple(pila)] += 1
+                self.muestras += 1
+            fin = time.perf_counter()
+            self.costo += fin - t
+            prox = max(prox + self.intervalo, fin)     # sin ráfagas para recuperar atraso
+
+    # ─ clasificación (sólo al final, para no pagarla por muestra)
+    def _biblioteca(self, c: CodeType) -> Optional[str]:
+        if c not in self._bib:
+            ruta = _normpath(c.co_filename)
+            self._bib[c] = next((b for b, frags in BIBLIOTECAS if any(x in ruta for x in frags)), None)
+        return self._bib[c]
+
+    @staticmethod
+    def _etapa(pila: Tuple[CodeType, ...]) -> str:
+        for c in reversed(pila):
+            e = _ETAPA_CODIGO.get(c) or ETAPAS.get(c.co_name)
+            if e:
+                return e
+        return "otros"
+
+    def _categoria(self, pila: Tuple[CodeType, ...]) -> str:
+        # espera/asyncio sólo si el hilo está *en* ellos: todo hilo nace en threading.py
+        for i, c in enumerate(reversed(pila)):
+            b = self._biblioteca(c)
+            if b and (i == 0 or b not in _SOLO_HOJA):
+                return b
+        return "python"
+
+    @staticmethod
+    def etiqueta(c: CodeType) -> str:
+        if c.co_filename.startswith("<"):                 # <frozen importlib._bootstrap>, <string>
+            return f"{c.co_filename.strip('<>').split()[-1]}:{c.co_name}"
+        p = Path(c.co_filename)
+        mod = p.parent.name if p.stem == "__init__" else p.stem
+        return f"{mod}:{c.co_name}"
+
+    # ─ salidas
+    def colapsadas(self) -> List[str]:
+        agregadas: Counter = Counter()
+        for pila, n in self.pilas.items():
+            marcos = [self.etiqueta(c).replace(";", ",") for c in pila if c.co_name != "_bootstrap_inner"]
+            agregadas[";".join([self._etapa(pila)] + marcos)] += n
+        return [f"{k} {n}" for k, n in agregadas.most_common()]
+
+    def reporte(self, top: int = TOP) -> str:
+        total = self.muestras or 1
+        dur = (self.t1 or time.perf_counter()) - self.t0
+        por_etapa: Counter = Counter()
+        cat_etapa: Dict[str, Counter] = defaultdict(Counter)
+        propio: Counter = Counter()
+        inclusivo: Counter = Counter()
+        etapas_fn: Dict[CodeType, Counter] = defaultdict(Counter)
+        cpu = 0
+        for pila, n in self.pilas.items():
+            e, cat = self._etapa(pila), self._categoria(pila)
+            por_etapa[e] += n
+            cat_etapa[e][cat] += n
+            cpu += n if cat not in _SIN_CPU else 0
+            if pila:
+                propio[pila[-1]] += n
+            for c in set(pila):
+                inclusivo[c] += n
+                etapas_fn[c][e] += n
+        lineas = [f"duración {dur:.2f} s · {self.muestras} muestras cada {self.intervalo * 1000:g} ms · "
+                  f"costo del muestreo {self.costo / max(dur, 1e-9):.2%} · CPU atribuible {cpu / total:.1%}",
+                  "", f"{'etapa':16} {'muestras':>9} {'%':>6}  bibliotecas"]
+        for e, n in por_etapa.most_common():
+            libs = ", ".join(f"{b} {k / n:.0%}" for b, k in cat_etapa[e].most_common(4))
+            lineas.append(f"{e:16} {n:>9} {n / total:>6.1%}  {libs}")
+        for titulo, cont in (("propio", propio), ("inclusivo", inclusivo)):
+            lineas += ["", f"top {top} por tiempo {titulo}:"]
+            for c, n in cont.most_common(top):
+                e = etapas_fn[c].most_common(1)[0][0]
+                lineas.append(f"{n / total:>6.1%}  [{e}] {self.etiqueta(c)}  "
+                              f"({Path(c.co_filename).name}:{c.co_firstlineno})")
+        return "\n".join(lineas)
+
+    def escribir(self, prefijo: Union[str, Path]) -> Tuple[Path, Path]:
+        prefijo = Path(prefijo)
+        prefijo.parent.mkdir(parents=True, exist_ok=True)
+        folded, txt = prefijo.with_suffix(".folded"), prefijo.with_suffix(".txt")
+        folded.write_text("\n".join(self.colapsadas()) + "\n", encoding="utf-8")
+        txt.write_text(self.reporte() + "\n", encoding="utf-8")
+        return folded, txt
+
+
+# ───────────────────── activación desde la línea de comandos ─────────────────────
+def desde_argv(argv: Optional[List[str]] = None) -> Optional[Perfilador]:
+    """Si argv trae `--profile[=PREFIJO]` / `--profile-ms N`, los retira y arranca el perfilador.
+
+    Se llama al principio del bloque `__main__`, antes de argparse; el
+    resultado se escribe al salir del proceso (incluido Ctrl+C o SystemExit).
+    """
+    argv = sys.argv if argv is None else argv
+    prefijo: Optional[str] = None
+    intervalo = INTERVALO
+    resto = [argv[0]] if argv else []
+    i = 1
+    while i < len(argv):
+        a = argv[i]
+        if a == "--profile" or a.startswith("--profile="):
+            prefijo = a.partition("=")[2] or ""
+        elif a == "--profile-ms" and i + 1 < len(argv):
+            intervalo = float(argv[i + 1]) / 1000
+            i += 1
+        elif a.startswith("--profile-ms="):
+            intervalo = float(a.partition("=")[2]) / 1000
+        else:
+            resto.append(a)
+        i += 1
+    argv[:] = resto
+    if prefijo is None:
+        return None
+    if not prefijo:
+        script = Path(resto[0]).stem.replace(" ", "_") if resto else "python"
+        prefijo = f"perfiles/{script}-{dt.datetime.now():%Y%m%d-%H%M%S}"
+    perf = Perfilador(intervalo).iniciar()
+
+    def _al_salir():
+        perf.detener()
+        folded, txt = perf.escribir(prefijo)
+        print(f"[perfil] {perf.muestras} muestras → {folded} · {txt}", file=sys.stderr)
+        print("\n".join(perf.reporte(10).splitlines()[:14]), file=sys.stderr)
+    atexit.register(_al_salir)
+    return perf
+
+
+# ───────────────────── demo ─────────────────────
+def _carga(n: int) -> None:
+    """Pipeline de detalle en miniatura: parseo bs4 → normalización → CSV."""
+    import io
+    import pandas as pd
+    from canario import extraer_detalle
+    from normalizar import normalizar_frame
+    from servidor_local import html_detalle
+
+    filas = [dict(extraer_detalle(html_detalle(i)), url=f"https://x/propiedades/clasificado/a-{i}.html")
+             for i in range(n)]
+    df = normalizar_frame(pd.DataFrame(filas))
+    df.to_csv(io.StringIO(), index=False)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Perfilador por muestreo")
+    ap.add_argument("--demo", action="store_true", help="mide el costo sobre un pipeline de detalle sintético")
+    ap.add_argument("-n", type=int, default=1500)
+    ap.add_argument("--ms", type=float, default=INTERVALO * 1000)
+    args = ap.parse_args()
+    if args.demo:
+        _carga(50)                                  # calienta imports
+        base = con = float("inf")
+        for _ in range(5):                          # intercalado, mejor de 5 (la máquina es ruidosa)
+            t = time.perf_counter(); _carga(args.n); base = min(base, time.perf_counter() - t)
+            with Perfilador(args.ms / 1000) as perf:
+                t = time.perf_counter(); _carga(args.n); con = min(con, time.perf_counter() - t)
+        print(f"sin perfilador {base:.2f} s · con perfilador {con:.2f} s ({con / base - 1:+.1%})\n")
+        print(perf.reporte(12))
+        print("\n".join(perf.colapsadas()[:3]))
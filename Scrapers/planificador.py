@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planificador único para una matriz de búsquedas (ciudad × tipo × operación).
+
+En vez de lanzar un script por búsqueda que compite a ciegas por el mismo
+host, todas las búsquedas comparten:
+
+• Un pool de identidades (identidades.py) y un cubo de tokens por host
+  (`CuboHost`): tasa y ráfaga globales + tope de peticiones simultáneas.
+  El cubo se ajusta AIMD: un bloqueo/429 parte la tasa a la mitad y cada
+  respuesta sana la sube un poco, hasta la tasa configurada.
+• Reparto justo entre trabajos: el siguiente turno es para la búsqueda con
+  menos peticiones en vuelo y, a igualdad, con menos servidas (max-min), así
+  una búsqueda con miles de detalles pendientes no deja sin turno a las demás.
+• Cada búsqueda avanza su paginación en cuanto procesa una página (la
+  siguiente va al frente de su cola) y encola sus detalles; un anuncio que
+  aparece en varias búsquedas se descarga una sola vez.
+
+La descarga es intercambiable (`fetch`): por defecto urllib con el pool
+(fetch_http.fetch_con_pool en un hilo); `FetchNavegador` carga las páginas
+con Playwright (un contexto por identidad) para hosts que no sirven a un
+cliente HTTP pelado, sin salirse del cubo del host.  Los ganchos `al_listado` /
+`al_detalle` reciben los resultados para guardarlos o parsearlos.  Con
+`validadores` (fetch_http.CacheValidadores) y un `al_detalle` las fichas
+se piden condicionalmente y las que no cambiaron (304 o mismo hash) no
+llegan a `al_detalle`; se cuentan en `sin_cambios`.  Los validadores de
+una ficha se confirman cuando `al_detalle` terminó con ella; sin
+`al_detalle` nadie procesa las fichas y no se usan validadores.
+
+    python planificador.py busquedas.json --data data            # CSV de listados por búsqueda
+    python planificador.py busquedas.json --navegador                # páginas con Playwright
+    python planificador.py --demo
+"""
+
+from __future__ import annotations
+import asyncio, csv, re, time, datetime as dt
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Union
+
+from busquedas import Busqueda
+from fetch_http import TIMEOUT, CacheValidadores, Respuesta, fetch_con_pool, looks_blocked
+from identidades import IdentityPool
+from registros import listing_id
+
+TASA_HOST        = 1.0      # peticiones/s por host
+RAFAGA_HOST      = 3
+CONCURRENCIA_HOST = 4
+TASA_MIN         = 0.05
+PASO_TASA        = 0.05     # incremento aditivo por respuesta sana (fracción de la tasa máxima)
+REINTENTOS       = 3
+
+_RE_DETALLE = re.compile(r'href="([^"]*/propiedades/clasificado/[^"]+\.html)"')
+
+Fetch = Callable[[str], Awaitable[Optional[Respuesta]]]
+
+
+def urls_detalle(html: str, base: str) -> List[str]:
+    """Enlaces a fichas de detalle de una página de listado, sin repetir."""
+    return list(dict.fromkeys(u if u.startswith("http") else base + u for u in _RE_DETALLE.findall(html)))
+
+
+# ───────────────────── presupuesto por host ─────────────────────
+class CuboHost:
+    """Cubo de tokens con tope de concurrencia y ajuste AIMD ante bloqueos."""
+
+    def __init__(self, tasa: float = TASA_HOST, rafaga: int = RAFAGA_HOST,
+                 concurrencia: int = CONCURRENCIA_HOST, reloj: Callable[[], float] = time.monotonic):
+        self.tasa_max = self.tasa = tasa
+        self.rafaga = rafaga
+        self.tokens = float(rafaga)
+        self.reloj = reloj
+        self.t = reloj()
+        self.sem = asyncio.Semaphore(concurrencia)
+        self.peticiones = self.bloqueos = 0
+        self.espera_total = 0.0
+
+    def _rellenar(self):
+        ahora = self.reloj()
+        self.tokens = min(self.rafaga, self.tokens + (ahora - self.t) * self.tasa)
+        self.t = ahora
+
+    async def tomar(self):
+        t0 = self.reloj()
+        await self.sem.acquire()
+        while True:
+            self._rellenar()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                break
+            await asyncio.sleep((1 - self.tokens) / self.tasa)
+        self.peticiones += 1
+        self.espera_total += self.reloj() - t0
+
+    def soltar(self, bloqueado: bool):
+        self.sem.release()
+        if bloqueado:
+            self.bloqueos += 1
+            self.tasa = max(TASA_MIN, self.tasa / 2)
+        else:
+            self.tasa = min(self.tasa_max, self.tasa + PASO_TASA * self.tasa_max)
+
+
+# ───────────────────── trabajos ─────────────────────
+@dataclass
+class Tarea:
+    tipo: str                   # "listado" | "detalle"
+    url: str
+    pagina: int = 0
+    intento: int = 0
+
+
+@dataclass
+class Trabajo:
+    busqueda: Busqueda
+    cola: Deque[Tarea] = field(default_factory=deque)
+    en_vuelo: int = 0
+    servidas: int = 0
+    paginas: int = 0
+    detalles: int = 0
+    sin_cambios: int = 0
+    fallos: int = 0
+
+    def resumen(self) -> Dict[str, Any]:
+        return {"busqueda": self.busqueda.slug, "paginas": self.paginas, "detalles": self.detalles,
+                "sin_cambios": self.sin_cambios, "fallos": self.fallos, "pendientes": len(self.cola)}
+
+
+class Planificador:
+    def __init__(self, busquedas: Sequence[Busqueda], pool: IdentityPool, *,
+                 fetch: Optional[Fetch] = None, base_url: Optional[str] = None,
+                 al_listado: Optional[Callable[[Busqueda, int, List[str]], Any]] = None,
+                 al_detalle: Optional[Callable[[Busqueda, Respuesta], Any]] = None,
+                 detalles: bool = True, tasa_host: float = TASA_HOST, rafaga_host: int = RAFAGA_HOST,
+                 concurrencia_host: int = CONCURRENCIA_HOST, trabajadores: int = 8,
+                 validadores: Optional[CacheValidadores] = None):
+        self.pool = pool
+        self.base_url = base_url
+        self.validadores = validadores if al_detalle is not None else None
+        self.fetch = fetch
+        self.al_listado, self.al_detalle = al_listado, al_detalle
+        self.detalles = detalles
+        self.trabajadores = trabajadores
+        self._cubo_cfg = (tasa_host, rafaga_host, concurrencia_host)
+        self.cubos: Dict[str, CuboHost] = {}
+        self.trabajos = [Trabajo(b) for b in busquedas]
+        for t in self.trabajos:
+            t.cola.append(Tarea("listado", t.busqueda.url_listado(1, base_url), 1))
+        self.vistos: set = set()                # listing_id ya encolados (todas las búsquedas)
+        self._en_vuelo = 0
+        self._cambio: Optional[asyncio.Event] = None
+
+    def cubo(self, host: str) -> CuboHost:
+        if host not in self.cubos:
+            self.cubos[host] = CuboHost(*self._cubo_cfg)
+        return self.cubos[host]
+
+    def _descargar(self, tarea: Tarea) -> Awaitable[Optional[Respuesta]]:
+        if self.fetch is not None:
+            return self.fetch(tarea.url)
+        # un solo intento por llamada: cada petición real pasa por el cubo del host;
+        # sólo las fichas son condicionales (un listado 304 no daría sus enlaces)
+        cache = self.validadores if tarea.tipo == "detalle" else None
+        return asyncio.to_thread(fetch_con_pool, self.pool, tarea.url, 1, TIMEOUT, cache)
+
+    def _elegir(self) -> Optional[Trabajo]:
+        listos = [t for t in self.trabajos if t.cola]
+        return min(listos, key=lambda t: (t.en_vuelo, t.servidas)) if listos else None
+
+    async def _procesar(self, trabajo: Trabajo, tarea: Tarea, resp: Optional[Respuesta]):
+        b = trabajo.busqueda
+        if resp is not None and resp.sin_cambios and tarea.tipo == "detalle":
+            trabajo.sin_cambios += 1
+            return
+        if resp is None or not resp.ok:
+            if resp is not None and resp.status == 404:     # en listado = fin de la paginación
+                return
+            if tarea.intento + 1 < REINTENTOS:             # al final de su cola, con el cubo ya frenado
+                tarea.intento += 1
+                trabajo.cola.append(tarea)
+            else:
+                trabajo.fallos += 1
+            return
+        if tarea.tipo == "detalle":
+            trabajo.detalles += 1
+            if self.al_detalle:
+                await _quiza_async(self.al_detalle(b, resp))
+                if self.validadores is not None:
+                    self.validadores.confirmar(resp.url)
+            return
+        trabajo.paginas += 1
+        urls = urls_detalle(resp.html, b.base(self.base_url))
+        if self.al_listado:
+            await _quiza_async(self.al_listado(b, tarea.pagina, urls))
+        if urls and tarea.pagina < b.paginas:
+            trabajo.cola.appendleft(Tarea("listado", b.url_listado(tarea.pagina + 1, self.base_url),
+                                          tarea.pagina + 1))
+        if self.detalles:
+            for u in urls:
+                lid = listing_id(u)
+                if lid not in self.vistos:
+                    self.vistos.add(lid)
+                    trabajo.cola.append(Tarea("detalle", u))
+
+    async def _trabajador(self):
+        while True:
+            trabajo = self._elegir()
+            if trabajo is None:
+                if self._en_vuelo == 0:
+                    self._cambio.set()          # despierta al resto para que terminen
+                    return
+                self._cambio.clear()
+                await self._cambio.wait()
+                continue
+            tarea = trabajo.cola.popleft()
+            trabajo.en_vuelo += 1
+            self._en_vuelo += 1
+            cubo = self.cubo(trabajo.busqueda.host(self.base_url))
+            resp: Optional[Respuesta] = None
+            try:
+                await cubo.tomar()
+                try:
+                    resp = await self._descargar(tarea)
+                except Exception as e:
+                    print(f"⚠️  {tarea.url}: {e}")
+                cubo.soltar(bloqueado=resp is None or resp.bloqueado or resp.limitado)
+                await self._procesar(trabajo, tarea, resp)
+            finally:
+                trabajo.en_vuelo -= 1
+                trabajo.servidas += 1
+                self._en_vuelo -= 1
+                self._cambio.set()
+
+    async def correr(self) -> List[Dict[str, Any]]:
+        self._cambio = asyncio.Event()
+        await asyncio.gather(*(self._trabajador() for _ in range(self.trabajadores)))
+        return [t.resumen() for t in self.trabajos]
+
+
+async def _quiza_async(x):
+    if asyncio.iscoroutine(x):
+        await x
+
+
+# ───────────────────── descarga con navegador ─────────────────────
+class FetchNavegador:
+    """`fetch` del planificador con Chromium (Playwright): un intento por llamada.
+
+    El navegador se lanza en la primera petición, dentro del loop del
+    planificador; `cerrar()` lo apaga.  Cada identidad del pool tiene su
+    contexto (user agent y proxy) y se recrea cuando la identidad cambia de
+    sesión.  Sin validadores: el navegador no manda peticiones condicionales.
+    """
+
+    def __init__(self, pool: IdentityPool, timeout_ms: int = 45_000):
+        self.pool, self.timeout_ms = pool, timeout_ms
+        self._pw = self._browser = None
+        self._ctx: Dict[str, tuple] = {}            # ident_id → (sesión, contexto)
+        self._lanzar: Optional[asyncio.Lock] = None
+
+    async def _contexto(self, ident):
+        if self._browser is None:
+            self._lanzar = self._lanzar or asyncio.Lock()
+            async with self._lanzar:
+                if self._browser is None:
+                    from playwright.async_api import async_playwright
+                    self._pw = await async_playwright().start()
+                    extra = {"proxy": {"server": "http://per-context"}} if any(
+                        i.proxy for i in self.pool.identidades) else {}
+                    self._browser = await self._pw.chromium.launch(headless=True, args=["--no-sandbox"], **extra)
+        sesion, ctx = self._ctx.get(ident.ident_id, (None, None))
+        if ctx is None or sesion != ident.sesion:
+            if ctx is not None:
+                await ctx.close()
+            kwargs = {"user_agent": ident.user_agent}
+            if ident.proxy:
+                kwargs["proxy"] = {"server": ident.proxy}
+            ctx = await self._browser.new_context(**kwargs)
+            self._ctx[ident.ident_id] = (ident.sesion, ctx)
+        return ctx
+
+    async def __call__(self, url: str) -> Optional[Respuesta]:
+        ident = await self.pool.adquirir_async()
+        if ident is None:
+            return None
+        t0 = time.monotonic()
+        page = None
+        try:
+            page = await (await self._contexto(ident)).new_page()
+            r = await page.goto(url, timeout=self.timeout_ms)
+            html = await page.content()
+        except Exception:
+            self.pool.liberar(ident, ok=False, latencia=time.monotonic() - t0)
+            return None
+        finally:
+            if page is not None:
+                await page.close()
+        status = r.status if r is not None else 200
+        resp = Respuesta(url, status, html, time.monotonic() - t0, bloqueado=looks_blocked(html, status),
+                         identidad=ident.ident_id, bytes=len(html.encode()))
+        if resp.limitado:                       # límite del host: lo absorbe el cubo, no la identidad
+            self.pool.liberar(ident, ok=True, latencia=resp.latencia)
+        else:
+            self.pool.liberar(ident, ok=not resp.bloqueado and status < 500, latencia=resp.latencia,
+                              bloqueado=resp.bloqueado)
+        return resp
+
+    async def cerrar(self):
+        for _, ctx in self._ctx.values():
+            await ctx.close()
+        self._ctx.clear()
+        if self._browser is not None:
+            await self._browser.close()
+            await self._pw.stop()
+            self._browser = self._pw = None
+
+
+# ───────────────────── crawl de listados a CSV ─────────────────────
+def escritor_listados(data_dir: Union[str, Path]) -> Callable[[Busqueda, int, List[str]], None]:
+    """Gancho `al_listado` que agrega a `<data_dir>/<hoy>/<archivo_listado>` (columnas url, pagina)."""
+    hoy = Path(data_dir) / dt.date.today().isoformat()
+    hoy.mkdir(parents=True, exist_ok=True)
+
+    def guardar_listado(b: Busqueda, pagina: int, urls: List[str]):
+        path = hoy / b.archivo_listado
+        nuevo = not path.exists()
+        with path.open("a", encoding="utf-8", newline="") as fh:
+            w = csv.writer(fh)
+            if nuevo:
+                w.writerow(["url", "pagina"])
+            w.writerows((u, pagina) for u in urls)
+    return guardar_listado
+
+
+def crawl_listados(busquedas: Sequence[Busqueda], data_dir: Union[str, Path] = "data",
+                   pool: Optional[IdentityPool] = None, navegador: bool = False, **kwargs) -> "Planificador":
+    """Corre el planificador escribiendo los CSV de listados e imprime el resumen.
+
+    Con `navegador=True` las páginas se cargan con `FetchNavegador` (mismo
+    pool y mismo cubo por host); el navegador se cierra dentro del loop.
+    Con `detalles=True` y un `al_detalle` que procese las fichas, éstas se
+    revalidan contra `<data_dir>/validadores_http.json`; sin consumidor de
+    fichas el archivo ni se lee ni se escribe.
+    """
+    pool = pool or IdentityPool.from_env()
+    if navegador:
+        kwargs["fetch"] = FetchNavegador(pool)
+    elif kwargs.get("detalles", True) and kwargs.get("al_detalle") and "validadores" not in kwargs:
+        kwargs["validadores"] = CacheValidadores.cargar(data_dir)
+    pl = Planificador(busquedas, pool, al_listado=escritor_listados(data_dir), **kwargs)
+
+    async def correr():
+        try:
+            return await pl.correr()
+        finally:
+            if isinstance(pl.fetch, FetchNavegador):
+                await pl.fetch.cerrar()
+    try:
+        for r in asyncio.run(correr()):
+            print(f"{r['busqueda']:40} {r['paginas']:>3} listados {r['detalles']:>5} detalles "
+                  f"{r['sin_cambios']:>5} sin cambios {r['fallos']:>3} fallos")
+    finally:
+        if pl.validadores is not None:
+            pl.validadores.guardar(data_dir)
+    for host, c in pl.cubos.items():
+        print(f"{host}: {c.peticiones} peticiones, {c.bloqueos} bloqueos, tasa final {c.tasa:.2f}/s")
+    if pl.validadores is not None:
+        print("revalidación:", pl.validadores.resumen())
+    return pl
+
+
+# ─────────────────────────── DEMO ──────────────────────────
+def _demo():
+    """9 búsquedas contra un host que responde 429 por encima de 12 req/s."""
+    from busquedas import expandir
+    from identidades import Identidad, UAS_DEFAULT
+    from servidor_local import SitioSimulado, servidor_local
+
+    busq = expandir({"paginas": 3, "matriz": {"ciudades": ["guadalajara", "zapopan", "distrito-federal"],
+                                              "tipos": ["departamentos", "casas", "terrenos"]}})
+
+    def nuevo_pool() -> IdentityPool:
+        return IdentityPool([Identidad(f"id{i}", ua + f" demo{i}") for i, ua in enumerate(UAS_DEFAULT * 2)],
+                            max_en_vuelo=4, cooldown=0.5, cooldown_max=2)
+
+    async def por_separado(base: str):
+        # un "script" por búsqueda: cada uno con su pool y sin presupuesto común
+        async def script(b: Busqueda):
+            pl = Planificador([b], nuevo_pool(), base_url=base, tasa_host=1_000, rafaga_host=1_000,
+                              concurrencia_host=4, trabajadores=4)
+            return await pl.correr()
+        return [r for rs in await asyncio.gather(*(script(b) for b in busq)) for r in rs]
+
+    async def compartido(base: str):
+        pl = Planificador(busq, nuevo_pool(), base_url=base, tasa_host=10, rafaga_host=2,
+                          concurrencia_host=8, trabajadores=8)
+        res = await pl.correr()
+        return res, pl
+
+    for nombre, modo in (("scripts separados", por_separado), ("planificador único", compartido)):
+        sitio = SitioSimulado(paginas=3, latencia=0.05, limite_rps=12)
+        with servidor_local(sitio) as base:
+            t0 = time.perf_counter()
+            res = asyncio.run(modo(base))
+            dt = time.perf_counter() - t0
+        if isinstance(res, tuple):
+            res, pl = res
+        ok = sum(r["paginas"] + r["detalles"] for r in res)
+        fallos = sum(r["fallos"] for r in res)
+        print(f"{nombre:18}: {ok} páginas útiles en {dt:5.1f}s ({ok / dt:4.1f}/s) · "
+              f"{sitio.rechazos_tasa} respuestas 429 · {fallos} descargas fallidas")
+    for r in res:
+        print(f"    {r['busqueda']:34} {r['paginas']} listados · {r['detalles']:>2} detalles")
+
+
+# ─────────────────────────── MAIN ──────────────────────────
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    from busquedas import cargar_busquedas
+
+    ap = argparse.ArgumentParser(description="Crawl de una matriz de búsquedas con un solo planificador")
+    ap.add_argument("busquedas", nargs="?", help="JSON de búsquedas (ver busquedas.py)")
+    ap.add_argument("--data", default="data", help="los listados van a <data>/<fecha>/<sitio>-<búsqueda>.csv")
+    ap.add_argument("--tasa", type=float, default=TASA_HOST, help="peticiones/s por host")
+    ap.add_argument("--concurrencia", type=int, default=CONCURRENCIA_HOST)
+    ap.add_argument("--base-url", help="otro origen (p. ej. servidor_local.py)")
+    ap.add_argument("--detalles", action="store_true", help="descarga también las fichas (sin parsear)")
+    ap.add_argument("--navegador", action="store_true", help="carga las páginas con Playwright (FetchNavegador)")
+    ap.add_argument("--demo", action="store_true")
+    args = ap.parse_args()
+
+    if args.demo:
+        _demo()
+    elif args.busquedas:
+        crawl_listados(cargar_busquedas(args.busquedas), args.data, base_url=args.base_url,
+                       detalles=args.detalles, tasa_host=args.tasa, concurrencia_host=args.concurrencia,
+                       navegador=args.navegador)
+    else:
+        ap.print_help()
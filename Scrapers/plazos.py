@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plazos por URL y peticiones “hedged” para recortar la cola de latencias.
+
+• `Presupuesto`: tiempo total que una URL puede consumir entre todos sus
+  reintentos; cada timeout individual se recorta a lo que queda.
+• `LatencyTracker`: ventana móvil de latencias observadas → umbral p90.
+• `hedged()` / `hedged_sync()`: si el primer intento tarda más que el p90,
+  lanza una copia especulativa (otra identidad/worker) y gana la primera
+  respuesta completa; el resto se cancela o se abandona.  Un intento que
+  devuelve None (p. ej. `fetch_con_pool` sin identidad sana) cuenta como
+  fallido, igual que uno que lanza.
+• `con_reintentos()`: reintentos con backoff exponencial que nunca se pasan
+  del presupuesto de la URL.
+
+Demo contra el sitio simulado:  python plazos.py --demo
+"""
+
+from __future__ import annotations
+import asyncio, random, threading, time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Awaitable, Callable, Deque, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEADLINE_S   = 90.0     # presupuesto total por URL (todos los intentos)
+HEDGE_MIN_S  = 2.0      # nunca duplicar antes de esto
+HEDGE_INICIO = 15.0     # umbral mientras no haya suficientes muestras
+MIN_MUESTRAS = 20
+MAX_COPIAS   = 2        # intento original + 1 especulativo
+
+
+class PlazoAgotado(TimeoutError):
+    """Se consumió el presupuesto de tiempo de la URL."""
+
+
+# ───────────────────── presupuesto ─────────────────────
+class Presupuesto:
+    def __init__(self, total: float = DEADLINE_S, reloj: Callable[[], float] = time.monotonic):
+        self.total, self.reloj = total, reloj
+        self.limite = reloj() + total
+
+    def restante(self) -> float:
+        return max(0.0, self.limite - self.reloj())
+
+    @property
+    def agotado(self) -> bool:
+        return self.restante() <= 0
+
+    def recortar(self, timeout: float) -> float:
+        """Timeout individual acotado por lo que queda del presupuesto (s)."""
+        if self.agotado:
+            raise PlazoAgotado(f"presupuesto de {self.total:.0f}s agotado")
+        return min(timeout, self.restante())
+
+    def ms(self, timeout_ms: int) -> int:
+        """Igual que `recortar`, en milisegundos (Playwright)."""
+        return int(self.recortar(timeout_ms / 1000) * 1000)
+
+
+# ───────────────────── latencias ─────────────────────
+class LatencyTracker:
+    def __init__(self, ventana: int = 500, percentil: float = 0.9,
+                 minimo: float = HEDGE_MIN_S, inicial: float = HEDGE_INICIO):
+        self.percentil, self.minimo, self.inicial = percentil, minimo, inicial
+        self._muestras: Deque[float] = deque(maxlen=ventana)
+        self._lock = threading.Lock()
+        self.hedges = self.ganados_por_hedge = 0
+
+    def observar(self, segundos: float):
+        with self._lock:
+            self._muestras.append(segundos)
+
+    def cuantil(self) -> Optional[float]:
+        with self._lock:
+            if len(self._muestras) < MIN_MUESTRAS:
+                return None
+            orden = sorted(self._muestras)
+        return orden[min(len(orden) - 1, int(self.percentil * len(orden)))]
+
+    def umbral_hedge(self) -> float:
+        q = self.cuantil()
+        return self.inicial if q is None else max(self.minimo, q)
+
+    def resumen(self) -> str:
+        q = self.cuantil()
+        q_txt = f"{q:.2f}s" if q is not None else "n/d"
+        return (f"p{int(self.percentil * 100)}={q_txt}  hedges={self.hedges}  "
+                f"ganados_por_hedge={self.ganados_por_hedge}")
+
+
+# ───────────────────── hedging asyncio ─────────────────────
+async def hedged(intento: Callable[[], Awaitable[T]], tracker: LatencyTracker,
+                 presupuesto: Presupuesto, max_copias: int = MAX_COPIAS) -> Optional[T]:
+    """Ejecuta `intento()`; si tarda más del p90 lanza otra copia. Gana la primera OK.
+
+    `intento` debe elegir por sí mismo otra identidad/contexto en cada llamada.
+    Un resultado None es un fallo: no gana ni entra al p90.  Sólo falla si
+    fallan todas las copias (None si ninguna lanzó) o se acaba el presupuesto.
+    """
+    inicio: dict = {}
+
+    def lanzar() -> asyncio.Task:
+        t = asyncio.ensure_future(intento())
+        inicio[t] = time.monotonic()
+        return t
+
+    pendientes = {lanzar()}
+    ultimo_error: Optional[BaseException] = None
+    try:
+        while pendientes:
+            puede_duplicar = len(inicio) < max_copias
+            espera = presupuesto.restante()
+            if puede_duplicar:
+                espera = min(espera, tracker.umbral_hedge())
+            if espera <= 0:
+                raise PlazoAgotado("presupuesto agotado esperando respuesta")
+            hechos, pendientes = await asyncio.wait(pendientes, timeout=espera,
+                                                    return_when=asyncio.FIRST_COMPLETED)
+            for t in hechos:
+                if t.exception() is None and t.result() is not None:
+                    tracker.observar(time.monotonic() - inicio[t])
+                    if len(inicio) > 1 and t is not next(iter(inicio)):
+                        tracker.ganados_por_hedge += 1
+                    return t.result()
+                ultimo_error = t.exception() or ultimo_error
+            if not hechos and puede_duplicar:
+                tracker.hedges += 1
+                pendientes.add(lanzar())
+            elif not pendientes and puede_duplicar and not presupuesto.agotado:
+                pendientes.add(lanzar())          # la original falló rápido: otra copia
+        if ultimo_error is None:
+            return None                           # todas devolvieron None
+        raise ultimo_error
+    finally:
+        for t in pendientes:
+            t.cancel()
+
+
+async def con_reintentos(fn: Callable[[], Awaitable[T]], presupuesto: Presupuesto,
+                         intentos: int = 3, base: float = 2.0) -> T:
+    """Reintenta `fn` con backoff exponencial con jitter, sin exceder el presupuesto."""
+    for n in range(intentos):
+        try:
+            return await fn()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if n == intentos - 1:
+                raise
+            pausa = base * 2 ** n * random.uniform(0.5, 1.0)
+            if pausa >= presupuesto.restante():
+                raise
+            await asyncio.sleep(pausa)
+    raise PlazoAgotado("sin intentos")
+
+
+# ───────────────────── hedging con hilos ─────────────────────
+def hedged_sync(intento: Callable[[], T], executor: Executor, tracker: LatencyTracker,
+                presupuesto: Presupuesto, max_copias: int = MAX_COPIAS) -> Optional[T]:
+    """Versión para hilos (capa HTTP). Las copias perdedoras no se interrumpen,
+    sólo se ignoran; `intento` debe liberar sus recursos al terminar.  Como en
+    `hedged`, un resultado None es un fallo: se espera a la otra copia o se
+    lanza una nueva."""
+    inicio: dict = {}
+
+    def lanzar() -> Future:
+        f = executor.submit(intento)
+        inicio[f] = time.monotonic()
+        return f
+
+    primera = lanzar()
+    pendientes = {primera}
+    ultimo_error: Optional[BaseException] = None
+    while pendientes:
+        puede_duplicar = len(inicio) < max_copias
+        espera = presupuesto.restante()
+        if puede_duplicar:
+            espera = min(espera, tracker.umbral_hedge())
+        if espera <= 0:
+            raise PlazoAgotado("presupuesto agotado esperando respuesta")
+        hechos, pendientes = wait(pendientes, timeout=espera, return_when=FIRST_COMPLETED)
+        for f in hechos:
+            if f.exception() is None and f.result() is not None:
+                tracker.observar(time.monotonic() - inicio[f])
+                if f is not primera:
+                    tracker.ganados_por_hedge += 1
+                for otro in pendientes:
+                    otro.cancel()
+                return f.result()
+            ultimo_error = f.exception() or ultimo_error
+        if not hechos and puede_duplicar:
+            tracker.hedges += 1
+            pendientes.add(lanzar())
+        elif not pendientes and puede_duplicar and not presupuesto.agotado:
+            pendientes.add(lanzar())
+    if ultimo_error is None:
+        return None
+    raise ultimo_error
+
+
+# ─────────────────────────── DEMO ──────────────────────────
+def _percentil(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p * len(xs)))]
+
+
+def _demo(n: int = 200):
+    from concurrent.futures import ThreadPoolExecutor
+    from fetch_http import fetch_con_pool
+    from identidades import IdentityPool
+    from servidor_local import servidor_local
+
+    # 5 % de las peticiones se atascan 1.5 s: la cola típica de un detalle lento
+    lenta = lambda path: 1.5 if random.random() < 0.05 else 0.02
+    pool = IdentityPool.from_env(max_en_vuelo=8)
+    with servidor_local(latencia=lenta) as base, ThreadPoolExecutor(max_workers=32) as ex:
+        urls = [f"{base}/propiedades/clasificado/veclapin-depto-{k}.html" for k in range(n)]
+
+        def medir(hedge: bool) -> List[float]:
+            tracker, tiempos = LatencyTracker(minimo=0.05, inicial=0.5), []
+            for u in urls:
+                t0, pres = time.monotonic(), Presupuesto(30)
+                intento = lambda: fetch_con_pool(pool, u, timeout=pres.recortar(10))
+                if hedge:
+                    hedged_sync(intento, ex, tracker, pres)
+                else:
+                    intento()
+                tiempos.append(time.monotonic() - t0)
+            if hedge:
+                print("   ", tracker.resumen())
+            return tiempos
+
+        for etiqueta, hedge in (("sin hedge", False), ("con hedge", True)):
+            ts = medir(hedge)
+            print(f"{etiqueta:>10}: total={sum(ts):.1f}s  p50={_percentil(ts, .5):.3f}s  "
+                  f"p99={_percentil(ts, .99):.3f}s")
+
+
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    ap = argparse.ArgumentParser(description="Plazos y peticiones hedged")
+    ap.add_argument("--demo", action="store_true", help="compara colas con/sin hedge en el sitio simulado")
+    ap.add_argument("-n", type=int, default=200)
+    args = ap.parse_args()
+    if args.demo:
+        _demo(args.n)
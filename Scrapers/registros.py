@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registros de esquema fijo (dataclasses con __slots__) para tarjetas y detalles.
+
+• Un campo por columna conocida; las pestañas dinámicas van a `extra`.
+• `to_columns()` convierte miles de registros a columnas de una sola pasada
+  (una lista por campo) y `to_frame()` las entrega a pandas sin que éste
+  tenga que inspeccionar las claves de cada dict.
+
+Comparativa de memoria / velocidad frente a dicts:  python registros.py --bench
+"""
+
+from __future__ import annotations
+import hashlib, re
+from dataclasses import dataclass, fields
+from operator import attrgetter
+from typing import Any, Callable, ClassVar, Dict, List, Optional, Sequence, Tuple
+
+# columnas que algunos scripts nombran distinto
+ALIAS = {"url_fuente": "url"}
+
+_RE_ID = re.compile(r"-(\d+)\.html(?:$|[?#])")
+
+
+def listing_id(url: str) -> str:
+    """Id estable del anuncio: el número final de la URL de Inmuebles24.
+
+    Para URLs sin ese patrón se usa un hash corto de la URL sin query.
+    """
+    m = _RE_ID.search(url or "")
+    if m:
+        return m.group(1)
+    return hashlib.blake2b((url or "").split("?", 1)[0].encode(), digest_size=8).hexdigest()
+
+
+class _Registro:
+    __slots__ = ()
+    CAMPOS: ClassVar[Tuple[str, ...]] = ()
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any], extra: Optional[Dict[str, Any]] = None):
+        """Campos conocidos a su slot; cualquier otra clave (pestañas) a `extra`."""
+        conocidos = cls._CONJUNTO
+        kw: Dict[str, Any] = {}
+        extra = dict(extra or {})
+        for k, v in d.items():
+            k = ALIAS.get(k, k)
+            if k in conocidos:
+                kw[k] = v
+            elif v not in (None, ""):
+                extra[k] = v
+        if extra:
+            kw["extra"] = extra
+        return cls(**kw)
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {f: getattr(self, f) for f in self.CAMPOS}
+        d.update(self.extra or {})
+        return d
+
+
+def _esquema(cls):
+    cls.CAMPOS = tuple(f.name for f in fields(cls) if f.name != "extra")
+    cls._CONJUNTO = frozenset(cls.CAMPOS)
+    return cls
+
+
+# ───────────────────── tarjetas de listado ─────────────────────
+@_esquema
+@dataclass(slots=True)
+class ListingRecord(_Registro):
+    nombre: Optional[str] = None
+    descripcion: Optional[str] = None
+    ubicacion: Optional[str] = None
+    url: Optional[str] = None
+    precio: Optional[str] = None
+    tipo: Optional[str] = None
+    habitaciones: Optional[str] = None
+    baños: Optional[str] = None
+    extra: Optional[Dict[str, str]] = None
+
+
+# ───────────────────── detalle de propiedad ─────────────────────
+@_esquema
+@dataclass(slots=True)
+class PropertyRecord(_Registro):
+    url: Optional[str] = None
+    tipo_propiedad: Optional[str] = None
+    area_m2: Optional[str] = None
+    recamaras: Optional[str] = None
+    estacionamientos: Optional[str] = None
+    operacion: Optional[str] = None
+    precio: Optional[str] = None
+    mantenimiento: Optional[str] = None
+    direccion: Optional[str] = None
+    ubicacion_url: Optional[str] = None
+    titulo: Optional[str] = None
+    descripcion: Optional[str] = None
+    anunciante: Optional[str] = None
+    codigo_anunciante: Optional[str] = None
+    codigo_inmuebles24: Optional[str] = None
+    tiempo_publicacion: Optional[str] = None
+    area_total: Optional[str] = None
+    area_cubierta: Optional[str] = None
+    banos_icon: Optional[str] = None
+    estacionamientos_icon: Optional[str] = None
+    recamaras_icon: Optional[str] = None
+    medio_banos_icon: Optional[str] = None
+    antiguedad_icon: Optional[str] = None
+    extra: Optional[Dict[str, str]] = None      # pestañas dinámicas (#reactGeneralFeatures)
+
+
+# ───────────────────── conversión en bloque ─────────────────────
+def to_columns(records: Sequence[_Registro], incluir_extra: bool = True) -> Dict[str, List[Any]]:
+    """Registros → {columna: lista}. Las columnas de `extra` se rellenan con None."""
+    if not records:
+        return {}
+    cols = {f: list(map(attrgetter(f), records)) for f in type(records[0]).CAMPOS}
+    if incluir_extra:
+        n = len(records)
+        for i, r in enumerate(records):
+            if not r.extra:
+                continue
+            for k, v in r.extra.items():        # una sola pasada por valor presente
+                col = cols.get(k)
+                if col is None:
+                    col = cols[k] = [None] * n
+                col[i] = v
+    return cols
+
+
+def to_frame(records: Sequence[_Registro], incluir_extra: bool = True):
+    import pandas as pd
+    return pd.DataFrame(to_columns(records, incluir_extra))
+
+
+# ─────────────────────────── BENCH ──────────────────────────
+def _muestra(k: int) -> Dict[str, str]:
+    d = {f: f"{f}-{k % 997}" for f in PropertyRecord.CAMPOS}
+    d["url"] = f"https://www.inmuebles24.com/propiedades/clasificado/depto-{k}.html"
+    for j in range(k % 4):                      # etiquetas de pestaña que varían por página
+        d[f"tab_{(k + j * 7) % 40}"] = "Alberca; Gimnasio; Elevador"
+    return d
+
+
+def _bench(n: int):
+    import gc, time, tracemalloc
+
+    def medir(construir: Callable[[], list]) -> Tuple[list, int, float]:
+        gc.collect()
+        t0 = time.perf_counter()
+        construir()                             # tiempo sin la sobrecarga de tracemalloc
+        dt = time.perf_counter() - t0
+        gc.collect()
+        tracemalloc.start()
+        objs = construir()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return objs, pico, dt
+
+    fuente = [_muestra(k) for k in range(n)]
+    dicts, mem_d, t_d = medir(lambda: [dict(d) for d in fuente])
+    recs, mem_r, t_r = medir(lambda: [PropertyRecord.from_dict(d) for d in fuente])
+    print(f"{n:,} registros")
+    print(f"  dicts      : {mem_d / 2**20:8.1f} MiB  construcción {t_d:.2f}s")
+    print(f"  registros  : {mem_r / 2**20:8.1f} MiB  construcción {t_r:.2f}s "
+          f"({mem_r / mem_d:.0%} de la memoria)")
+    t0 = time.perf_counter(); to_columns(recs); t_cols = time.perf_counter() - t0
+    print(f"  registros → columnas      : {t_cols:.2f}s")
+
+    try:
+        import pandas as pd
+    except ImportError:
+        print("  (pandas no instalado: se omite la comparación de DataFrame)")
+        return
+    t0 = time.perf_counter(); pd.DataFrame(dicts); t_df_d = time.perf_counter() - t0
+    t0 = time.perf_counter(); to_frame(recs); t_df_r = time.perf_counter() - t0
+    print(f"  DataFrame desde dicts     : {t_df_d:.2f}s")
+    print(f"  DataFrame desde registros : {t_df_r:.2f}s")
+
+
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    ap = argparse.ArgumentParser(description="Registros de esquema fijo")
+    ap.add_argument("--bench", action="store_true", help="compara memoria y velocidad contra dicts")
+    ap.add_argument("-n", type=int, default=200_000)
+    args = ap.parse_args()
+    if args.bench:
+        _bench(args.n)
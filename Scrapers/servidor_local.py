@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor local que imita Inmuebles24 para pruebas sin salir a Internet.
+
+• Sirve páginas de listado (`…-pagina-N.html`) y de detalle (`/propiedades/clasificado-…-ID.html`)
+  con el mismo marcado que leen los scrapers.
+• Simula bloqueos tipo Cloudflare *por identidad* (User-Agent): cada identidad
+  configurada se bloquea al superar su número de peticiones permitidas.
+• Simula además un límite de tasa global del host (429 por encima de
+  `limite_rps` peticiones en el último segundo, sin importar la identidad).
+• Latencia artificial opcional por ruta, para ensayar timeouts y reintentos.
+• Las fichas llevan ETag y Last-Modified y responden 304 a If-None-Match /
+  If-Modified-Since; `versiones[pid] += 1` cambia una ficha y
+  `validadores=False` apaga las cabeceras (sólo queda el hash del cuerpo).
+• `variante="rediseno"` renombra las clases CSS (conserva data-qa e ids) y
+  `variante="roto"` quita también esos anclajes: para ensayar el canario.
+
+Uso rápido:
+    with servidor_local(bloqueos={"Bot": 2}) as base:
+        urllib.request.urlopen(base + "/departamentos-en-venta-en-zapopan-pagina-1.html")
+"""
+
+from __future__ import annotations
+import threading, time, zlib
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, Optional
+
+CARDS_POR_PAGINA = 5
+
+PAGINA_BLOQUEO = (
+    "<html><head><title>Attention Required! | Cloudflare</title></head>"
+    "<body><h1>Sorry, you have been blocked</h1></body></html>"
+)
+
+
+# ───────────────────── configuración ─────────────────────
+@dataclass
+class SitioSimulado:
+    """Estado compartido del sitio falso (contadores y reglas de bloqueo)."""
+    # substring del User-Agent → nº de peticiones antes de bloquear (0 = siempre)
+    bloqueos: Dict[str, int] = field(default_factory=dict)
+    # segundos de espera por petición; callable(path) → float para latencias variables
+    latencia: Callable[[str], float] | float = 0.0
+    paginas: int = 3
+    variante: str = "actual"                # "actual" | "rediseno" | "roto"
+    limite_rps: float = 0.0                 # 0 = sin límite de tasa del host
+    validadores: bool = True                # ETag / Last-Modified en las fichas
+    versiones: Dict[int, int] = field(default_factory=dict)   # pid → versión (cambia precio y fecha)
+    respuestas_304: int = 0
+    peticiones: Counter = field(default_factory=Counter)
+    rechazos_tasa: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    _recientes: deque = field(default_factory=deque)
+
+    def registrar(self, ua: str) -> int:
+        with self.lock:
+            self.peticiones[ua] += 1
+            return self.peticiones[ua]
+
+    def excede_tasa(self) -> bool:
+        if not self.limite_rps:
+            return False
+        with self.lock:
+            ahora = time.monotonic()
+            while self._recientes and ahora - self._recientes[0] > 1.0:
+                self._recientes.popleft()
+            self._recientes.append(ahora)
+            if len(self._recientes) > self.limite_rps:
+                self.rechazos_tasa += 1
+                return True
+            return False
+
+    def bloqueado(self, ua: str, n: int) -> bool:
+        return any(pat in ua and n > limite for pat, limite in self.bloqueos.items())
+
+    def espera(self, path: str) -> float:
+        return self.latencia(path) if callable(self.latencia) else float(self.latencia)
+
+
+# ───────────────────── HTML sintético ─────────────────────
+def html_listado(pagina: int, semilla: int = 0) -> str:
+    """`semilla` distingue búsquedas (ciudad/tipo) para que no compartan anuncios."""
+    cards = []
+    for k in range(CARDS_POR_PAGINA):
+        pid = semilla * 100_000 + pagina * 1000 + k
+        cards.append(
+            '<div class="postingCardLayout-module__posting-card-layout">'
+            f'<div data-qa="POSTING_CARD_PRICE">MN {1_500_000 + pid * 1000:,}</div>'
+            '<div class="postingLocations-module__location-address">Av. Patria 123</div>'
+            '<h2 data-qa="POSTING_CARD_LOCATION">Zapopan, Jalisco</h2>'
+            '<h3 data-qa="POSTING_CARD_FEATURES"><span>80 m² tot.</span><span>2 rec.</span><span>2 baños</span></h3>'
+            '<h3 data-qa="POSTING_CARD_DESCRIPTION">'
+            f'<a href="/propiedades/clasificado/veclapin-departamento-en-zapopan-{pid}.html">Depto {pid}</a></h3>'
+            "</div>"
+        )
+    return "<html><body>" + "".join(cards) + "</body></html>"
+
+
+def html_detalle(pid: int, version: int = 0) -> str:
+    lat, lon = 20.70 + (pid % 97) / 1000, -103.40 - (pid % 89) / 1000
+    return (
+        "<html><body>"
+        f'<h1 class="title-property">Departamento {pid} en Zapopan</h1>'
+        '<h2 class="title-type-sup-property">Departamento · 80 m² · 2 rec. · 1 estac.</h2>'
+        '<div class="price-container-property"><div class="price-value">venta '
+        f"<span>MN {1_500_000 + pid * 1000 + version * 25_000:,}</span></div>"
+        '<div class="price-extra"><span class="price-expenses">Mantenimiento MN 1,200</span></div></div>'
+        '<div class="section-location-property"><h4>Av. Patria 123, Zapopan, Jalisco</h4></div>'
+        '<div class="static-map-container"><img id="static-map" '
+        f'src="//maps.googleapis.com/maps/api/staticmap?center={lat:.6f},{lon:.6f}&zoom=15&size=600x300"></div>'
+        '<section class="article-section-description"><div id="longDescription">'
+        f"Departamento remodelado con roof garden, pet friendly, cerca de Andares. Ref {pid}.</div></section>"
+        '<h3 data-qa="linkMicrositioAnunciante">Inmobiliaria Demo</h3>'
+        '<section id="reactPublisherCodes"><ul>'
+        f"<li>Cód. del anunciante: A-{pid}</li><li>Cód. Inmuebles24: {pid}</li></ul></section>"
+        '<div id="user-views"><p>Publicado hace 3 días</p></div>'
+        '<ul id="section-icon-features-property">'
+        '<li class="icon-feature"><i class="icon-stotal"></i>80 m² tot.</li>'
+        '<li class="icon-feature"><i class="icon-bano"></i>2 baños</li></ul>'
+        '<div id="reactGeneralFeatures">'
+        '<button role="tab"><span>Amenidades</span></button>'
+        '<div role="tabpanel"><span>Alberca</span><span>Gimnasio</span><span>Elevador</span></div>'
+        '<button role="tab"><span>Servicios</span></button>'
+        '<div role="tabpanel"><span>Seguridad</span><span>Internet</span></div>'
+        "</div></body></html>"
+    )
+
+
+# clases que cambian en un rediseño del sitio; data-qa e ids se mantienen
+_REDISENO = {
+    "postingCardLayout-module__posting-card-layout": "postingCard-module__card-x7f2",
+    "postingLocations-module__location-address": "postingLocation-module__addr-x7f2",
+    "title-property": "property-heading-x7f2",
+    "title-type-sup-property": "property-subheading-x7f2",
+    "price-container-property": "price-box-x7f2",
+    "section-location-property": "location-box-x7f2",
+    "static-map-container": "map-box-x7f2",
+    "article-section-description": "description-box-x7f2",
+}
+_ROTO = {'data-qa="': 'data-test="', 'id="longDescription"': 'id="desc-x7f2"', 'id="static-map"': 'id="map-x7f2"',
+         "<h1": "<div", "</h1>": "</div>", "<h4>": "<p>", "</h4>": "</p>"}
+
+
+def aplicar_variante(html: str, variante: str) -> str:
+    if variante == "actual":
+        return html
+    for viejo, nuevo in _REDISENO.items():
+        html = html.replace(viejo, nuevo)
+    if variante == "roto":
+        for viejo, nuevo in _ROTO.items():
+            html = html.replace(viejo, nuevo)
+    return html
+
+
+_EPOCA = 1_735_689_600                      # 2025-01-01: Last-Modified de la versión 0
+
+
+# ───────────────────── handler HTTP ─────────────────────
+def _handler_para(sitio: SitioSimulado):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):        # silencioso
+            pass
+
+        def _responder(self, status: int, body: str, headers: Optional[Dict[str, str]] = None):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _no_modificado(self, cab: Dict[str, str]) -> bool:
+            inm = self.headers.get("If-None-Match")
+            if inm:                                 # RFC 9110: If-None-Match manda sobre la fecha
+                return cab["ETag"] in (t.strip() for t in inm.split(","))
+            ims = self.headers.get("If-Modified-Since")
+            try:
+                return bool(ims) and parsedate_to_datetime(cab["Last-Modified"]) <= parsedate_to_datetime(ims)
+            except (TypeError, ValueError):
+                return False
+
+        def do_GET(self):
+            ua = self.headers.get("User-Agent", "")
+            n = sitio.registrar(ua)
+            pausa = sitio.espera(self.path)
+            if pausa:
+                time.sleep(pausa)
+            if sitio.bloqueado(ua, n):
+                return self._responder(403, PAGINA_BLOQUEO)
+            if sitio.excede_tasa():
+                return self._responder(429, "<html><body>Too Many Requests</body></html>", {"Retry-After": "1"})
+
+            path = self.path.split("?", 1)[0]
+            if "-pagina-" in path:
+                busqueda, resto = path.rsplit("-pagina-", 1)
+                pagina = int(resto.split(".")[0])
+                if pagina > sitio.paginas:
+                    return self._responder(404, "<html><body>Sin resultados</body></html>")
+                html = html_listado(pagina, zlib.crc32(busqueda.encode()) % 1000)
+                return self._responder(200, aplicar_variante(html, sitio.variante))
+            if path.startswith("/propiedades/"):
+                pid = int(path.rsplit("-", 1)[1].split(".")[0])
+                version = sitio.versiones.get(pid, 0)
+                html = aplicar_variante(html_detalle(pid, version), sitio.variante)
+                if not sitio.validadores:
+                    return self._responder(200, html)
+                cab = {"ETag": f'"{zlib.crc32(html.encode()):08x}"',
+                       "Last-Modified": formatdate(_EPOCA + version * 86_400, usegmt=True)}
+                if self._no_modificado(cab):
+                    with sitio.lock:
+                        sitio.respuestas_304 += 1
+                    return self._responder(304, "", cab)
+                return self._responder(200, html, cab)
+            self._responder(404, "<html><body>No encontrado</body></html>")
+
+    return Handler
+
+
+@contextmanager
+def servidor_local(sitio: Optional[SitioSimulado] = None, **kwargs) -> Iterator[str]:
+    """Levanta el sitio simulado en un puerto libre y devuelve su URL base."""
+    sitio = sitio or SitioSimulado(**kwargs)
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _handler_para(sitio))
+    hilo = threading.Thread(target=srv.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        yield f"http://127.0.0.1:{srv.server_address[1]}"
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+if __name__ == "__main__":
+    from perfilador import desde_argv
+    desde_argv()                # --profile[=prefijo] [--profile-ms N]
+    import argparse
+    ap = argparse.ArgumentParser(description="Sitio Inmuebles24 simulado")
+    ap.add_argument("--port", type=int, default=8024)
+    ap.add_argument("--variante", default="actual", choices=["actual", "rediseno", "roto"])
+    args = ap.parse_args()
+    srv = ThreadingHTTPServer(("127.0.0.1", args.port), _handler_para(SitioSimulado(variante=args.variante)))
+    print(f"Sirviendo en http://127.0.0.1:{args.port}  (Ctrl+C para salir)")
+    srv.serve_forever()
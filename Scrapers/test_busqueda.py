@@ -0,0 +1,49 @@
+"""Stemmer y búsqueda de texto completo (busqueda.py).   python -m pytest -q"""
+
+import pytest
+
+from busqueda import IndiceTexto, analizar, consulta_de_argumentos, consulta_fts, raiz
+
+
+@pytest.mark.parametrize("singular, plural", [
+    ("casa", "casas"), ("baño", "baños"), ("lote", "lotes"), ("departamento", "departamentos"),
+    ("amplia", "amplias"), ("jardin", "jardines"), ("luz", "luces"), ("mes", "meses"), ("pie", "pies"),
+])
+def test_singular_y_plural_misma_raiz(singular, plural):
+    assert analizar(singular) == analizar(plural)
+
+
+def test_raiz_minima():
+    assert raiz("casa") == "casa"
+    assert raiz("casas") == "casa"
+    assert raiz("amplio") == "ampli"
+
+
+def test_frase_de_la_cli_se_conserva():
+    q = consulta_de_argumentos(["roof garden", "alberca"])
+    assert q == '"roof garden" alberca'
+    assert consulta_fts(q) == '"roof garden" "alberc"'
+    assert consulta_de_argumentos(['"pet friendly"', "OR", "jardin"]) == '"pet friendly" OR jardin'
+
+
+def test_buscar_singular_encuentra_plural(tmp_path):
+    idx = IndiceTexto.abrir(tmp_path)
+    idx.agregar([{"url": "https://www.inmuebles24.com/propiedades/clasificado/casa-1.html",
+                  "titulo": "Casas en condominio", "descripcion": "Tres baños, roof garden y lotes amplios",
+                  "precio_valor": 3_000_000.0, "moneda": "MXN"}], "2025-06-01")
+    for q in ("casa", "casas", "baño", "lote", '"roof garden"'):
+        assert len(idx.buscar(q)) == 1, q
+    assert idx.buscar('"garden roof"') == []
+    idx.cerrar()
+
+
+def test_indice_viejo_se_marca_para_reindexar(tmp_path):
+    idx = IndiceTexto.abrir(tmp_path)
+    fila = {"url": "https://x/casa-1.html", "titulo": "Casas", "descripcion": ""}
+    idx.agregar([fila], "2025-06-01")
+    idx.con.execute("PRAGMA user_version = 1")      # como lo dejó el analizador anterior
+    idx.con.commit()
+    idx.cerrar()
+    idx = IndiceTexto.abrir(tmp_path)
+    assert idx.agregar([fila], "2025-06-02") == 1   # mismo texto, pero se vuelve a analizar
+    idx.cerrar()
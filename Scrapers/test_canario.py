@@ -0,0 +1,30 @@
+"""Canario de selectores (canario.py).   python -m pytest -q"""
+
+import pytest
+
+from canario import ARCHIVO_BASE, MuestraInsuficiente, calibrar, verificar
+from servidor_local import aplicar_variante, html_detalle, html_listado
+
+LISTADOS = [html_listado(1), html_listado(2)]
+DETALLES = [html_detalle(pid) for pid in range(100, 104)]
+
+
+@pytest.mark.parametrize("listados, detalles", [([], []), ([], DETALLES), (LISTADOS, []), (LISTADOS, DETALLES[:1])])
+def test_muestra_vacia_o_corta_no_pasa(listados, detalles):
+    with pytest.raises(MuestraInsuficiente):
+        verificar(listados, detalles)
+    with pytest.raises(MuestraInsuficiente):
+        verificar(listados, detalles, abortar=False)
+
+
+def test_calibrar_no_escribe_base_en_ceros(tmp_path):
+    with pytest.raises(MuestraInsuficiente):
+        calibrar(tmp_path, [], [])
+    assert not (tmp_path / ARCHIVO_BASE).exists()
+
+
+def test_muestra_sana_usa_el_principal(tmp_path):
+    base = calibrar(tmp_path, LISTADOS, DETALLES)
+    assert verificar(LISTADOS, DETALLES, base).conjunto == "principal"
+    rediseno = [aplicar_variante(h, "rediseno") for h in DETALLES]
+    assert verificar([], rediseno, base, tipos=("detalle",)).conjunto == "respaldo"
@@ -0,0 +1,29 @@
+"""Diccionario de características compartido (caracteristicas.py).   python -m pytest -q"""
+
+import csv
+
+from caracteristicas import ARCHIVO_DIC, FeatureStore, id_texto
+
+
+def test_dos_procesos_no_comparten_id_entre_etiquetas(tmp_path):
+    a, b = FeatureStore(tmp_path), FeatureStore(tmp_path)      # abren el mismo diccionario vacío
+    a.agregar("1", {"tab_Exteriores": ["Alberca"]})
+    b.agregar("2", {"tab_Amenidades": ["Gimnasio", "Alberca"]})
+    a.flush("2025-06-01")
+    b.flush("2025-06-01")
+    with (tmp_path / ARCHIVO_DIC).open(encoding="utf-8", newline="") as fh:
+        filas = list(csv.DictReader(fh))
+    por_id = {}
+    for f in filas:
+        assert por_id.setdefault(f["id"], f["texto"]) == f["texto"]
+    assert len(por_id) == 4
+    assert FeatureStore(tmp_path).features_de() == {
+        "1": {"exteriores": ["Alberca"]}, "2": {"amenidades": ["Gimnasio", "Alberca"]}}
+    assert a.features_de()["2"] == {"amenidades": ["Gimnasio", "Alberca"]}   # recarga lo ajeno
+
+
+def test_diccionario_secuencial_se_respeta(tmp_path):
+    (tmp_path / ARCHIVO_DIC).write_text("id,texto\n0,exteriores\n1,Alberca\n", encoding="utf-8")
+    store = FeatureStore(tmp_path)
+    assert store.dic.id("Alberca") == 1
+    assert store.dic.id("Jardín") == id_texto("Jardín")
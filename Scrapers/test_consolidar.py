@@ -0,0 +1,39 @@
+"""Consolidación del histórico (consolidar.py).   python -m pytest -q"""
+
+import csv
+
+from consolidar import consolidar
+from registros import listing_id
+
+
+def test_detalle_1_2_sin_url_usa_el_codigo(tmp_path, capsys):
+    dia = tmp_path / "data" / "2024-11-05"
+    dia.mkdir(parents=True)
+    with (dia / "inmuebles24_terrenos_guadalajara_detalle.csv").open("w", encoding="utf-8", newline="") as fh:
+        w = csv.writer(fh)
+        w.writerow(["tipo_propiedad", "precio", "titulo", "codigo_inmuebles24", "area_total"])
+        w.writerow(["Terreno", "MN 1,200,000", "Terreno en Tlajomulco", "143562789", "300 m² tot."])
+        w.writerow(["Terreno", "MN 900,000", "Terreno en Tonalá", "143562790", "250 m² tot."])
+        w.writerow(["Terreno", "MN 700,000", "Sin código", "", "200 m² tot."])
+        w.writerow(["Terreno", "MN 1", "fila rota", "143562791", "1 m²", "columna de más"])
+
+    (r,) = consolidar([tmp_path / "data"], tmp_path / "consolidado", procesos=1, ingerir=False)
+    assert (r["filas"], r["sin_id"], r["malas"]) == (2, 1, 1)
+    assert "1 filas sin url" in capsys.readouterr().err
+
+    (salida,) = (tmp_path / "consolidado" / "2024-11-05").glob("detalles-*.csv")
+    with salida.open(encoding="utf-8", newline="") as fh:
+        filas = list(csv.DictReader(fh))
+    assert [f["listing_id"] for f in filas] == ["143562789", "143562790"]
+    assert all(listing_id(f["url"]) == f["listing_id"] for f in filas)
+
+
+def test_csv_limpio_no_reporta_descartes(tmp_path, capsys):
+    dia = tmp_path / "data" / "2025-06-01"
+    dia.mkdir(parents=True)
+    (dia / "detalles_completos.csv").write_text(
+        "url,titulo,precio\nhttps://www.inmuebles24.com/propiedades/clasificado/depto-7.html,Depto,MN 1\n",
+        encoding="utf-8")
+    (r,) = consolidar([tmp_path / "data"], tmp_path / "consolidado", procesos=1, ingerir=False)
+    assert (r["filas"], r["sin_id"], r["malas"]) == (1, 0, 0)
+    assert capsys.readouterr().err == ""
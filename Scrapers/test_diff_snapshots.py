@@ -0,0 +1,49 @@
+"""Diff de snapshots con varios CSV por día (diff_snapshots.py).   python -m pytest -q"""
+
+import csv
+
+from diff_snapshots import ARCHIVO_HUELLAS, archivo_huellas, diff_rango
+
+URL = "https://www.inmuebles24.com/propiedades/clasificado/veclapin-departamento-{}.html"
+
+
+def escribir(path, filas):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8", newline="") as fh:
+        w = csv.DictWriter(fh, fieldnames=list(filas[0]))
+        w.writeheader()
+        w.writerows(filas)
+
+
+def dia(base, fecha, precios):
+    """Un día como lo deja o3: listings (sólo url) + detalles_completos."""
+    escribir(base / fecha / "listings_zapopan.csv", [{"url": URL.format(i)} for i in precios])
+    escribir(base / fecha / "detalles_completos.csv",
+             [{"url": URL.format(i), "titulo": f"Depto {i}", "precio": p} for i, p in precios.items()])
+
+
+def test_gana_la_fila_con_huella(tmp_path):
+    dia(tmp_path, "2025-06-01", {1: "MN 1,000,000", 2: "MN 2,000,000"})
+    dia(tmp_path, "2025-06-02", {1: "MN 900,000", 2: "MN 2,000,000", 3: "MN 3,000,000"})
+    (d,) = diff_rango(tmp_path)
+    assert [h.lid for h in d.nuevos] == ["3"]
+    assert [(a.precio, b.precio) for a, b in d.cambiados] == [("MN 1,000,000", "MN 900,000")]
+    assert d.eliminados == []
+
+
+def test_filas_sin_los_mismos_campos_no_son_cambio(tmp_path):
+    dia(tmp_path, "2025-06-01", {1: "MN 1,000,000"})
+    escribir(tmp_path / "2025-06-02" / "listings_zapopan.csv", [{"url": URL.format(1)}])
+    (d,) = diff_rango(tmp_path)
+    assert not d.nuevos and not d.eliminados and not d.cambiados
+
+
+def test_cache_por_patron(tmp_path):
+    dia(tmp_path, "2025-06-01", {1: "MN 1,000,000"})
+    dia(tmp_path, "2025-06-02", {1: "MN 900,000"})
+    assert len(list(diff_rango(tmp_path))[0].cambiados) == 1
+    (d,) = diff_rango(tmp_path, patron="listings_*.csv")        # sólo url: nada que comparar
+    assert not d.cambiados
+    assert (tmp_path / "2025-06-02" / ARCHIVO_HUELLAS).exists()
+    assert (tmp_path / "2025-06-02" / archivo_huellas("listings_*.csv")).exists()
+    assert len(list(diff_rango(tmp_path))[0].cambiados) == 1     # la caché de *.csv no se pisó
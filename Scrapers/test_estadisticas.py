@@ -0,0 +1,42 @@
+"""Agregados por zona y deal score (estadisticas.py).   python -m pytest -q"""
+
+import json
+
+import pandas as pd
+
+from estadisticas import ARCHIVO_ESTADO, StatsEngine
+
+
+def lote(desde, recamaras):
+    return pd.DataFrame({
+        "url": [f"https://www.inmuebles24.com/propiedades/clasificado/depto-{desde + i}.html" for i in range(len(recamaras))],
+        "precio_valor": [3_000_000.0] * len(recamaras), "moneda": "MXN", "superficie_m2": 100.0,
+        "tipo_propiedad": "Departamento", "recamaras_n": recamaras, "lat": 20.67, "lon": -103.39,
+    })
+
+
+def test_recamaras_int_y_float_mismo_segmento(tmp_path):
+    eng = StatsEngine()
+    enteros = lote(0, [2, 2, 2, 2])
+    flotantes = lote(10, [2.0, 2.0, 2.0, 2.0, float("nan")])
+    assert enteros["recamaras_n"].dtype.kind == "i" and flotantes["recamaras_n"].dtype.kind == "f"
+    eng.ingestar(enteros)
+    eng.ingestar(flotantes)
+    por_rec = {k.rsplit("|", 1)[1]: z.n for k, z in eng.stats.items() if k.count("|") == 2 and not k.endswith("|*")}
+    assert por_rec == {"2": 8}
+    out = eng.ingestar(lote(20, [2.0]))
+    assert out["ref_nivel"].tolist() == ["zona_tipo_rec"] and out["ref_n"].tolist() == [8]
+
+    eng.guardar(tmp_path)
+    assert all(not k.endswith(".0") for k in json.loads((tmp_path / ARCHIVO_ESTADO).read_text())["stats"])
+
+
+def test_estado_viejo_con_clave_float_se_unifica(tmp_path):
+    eng = StatsEngine()
+    eng.ingestar(lote(0, [3] * 9))
+    eng.guardar(tmp_path)
+    d = json.loads((tmp_path / ARCHIVO_ESTADO).read_text())
+    d["stats"] = {(k + ".0" if k.endswith("|3") else k): v for k, v in d["stats"].items()}
+    (tmp_path / ARCHIVO_ESTADO).write_text(json.dumps(d))
+    out = StatsEngine.cargar(tmp_path).ingestar(lote(50, [3]))
+    assert out["ref_nivel"].tolist() == ["zona_tipo_rec"] and out["ref_n"].tolist() == [9]
@@ -0,0 +1,61 @@
+"""Planificador compartido con descarga por navegador (planificador.FetchNavegador).   python -m pytest -q"""
+
+import asyncio, urllib.error, urllib.request
+
+from busquedas import Busqueda
+from identidades import IdentityPool
+from planificador import FetchNavegador, Planificador
+from servidor_local import SitioSimulado, servidor_local
+
+
+class Pagina:
+    """Lo mínimo de una página de Playwright, servida por urllib."""
+
+    def __init__(self, ua):
+        self.ua, self.html = ua, ""
+
+    async def goto(self, url, timeout=None):
+        req = urllib.request.Request(url, headers={"User-Agent": self.ua})
+        try:
+            with urllib.request.urlopen(req) as r:
+                status, self.html = r.status, r.read().decode()
+        except urllib.error.HTTPError as e:
+            status, self.html = e.code, e.read().decode()
+        return type("R", (), {"status": status})()
+
+    async def content(self):
+        return self.html
+
+    async def close(self):
+        pass
+
+
+class Navegador:
+    def __init__(self):
+        self.contextos = []
+
+    async def new_context(self, user_agent, **_):
+        self.contextos.append(user_agent)
+        ctx = type("Ctx", (), {})()
+        ctx.new_page = lambda: asyncio.sleep(0, Pagina(user_agent))
+        ctx.close = lambda: asyncio.sleep(0)
+        return ctx
+
+    async def close(self):
+        pass
+
+
+def test_busquedas_con_navegador_comparten_cubo():
+    sitio = SitioSimulado(paginas=2)
+    busquedas = [Busqueda("zapopan", paginas=2), Busqueda("guadalajara", paginas=2)]
+    with servidor_local(sitio) as base:
+        pool = IdentityPool.from_env()
+        fetch = FetchNavegador(pool)
+        fetch._browser = Navegador()
+        pl = Planificador(busquedas, pool, fetch=fetch, base_url=base, tasa_host=50, rafaga_host=50)
+        res = asyncio.run(pl.correr())
+    assert [r["paginas"] for r in res] == [2, 2]
+    assert sum(r["detalles"] for r in res) == len(pl.vistos) > 0
+    (cubo,) = pl.cubos.values()                     # un solo presupuesto para todo el host
+    assert cubo.peticiones == 4 + len(pl.vistos)
+    assert len(fetch._browser.contextos) <= len(pool.identidades)
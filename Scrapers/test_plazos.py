@@ -0,0 +1,57 @@
+"""Peticiones hedged (plazos.py).   python -m pytest -q"""
+
+import asyncio, itertools, time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from plazos import LatencyTracker, Presupuesto, hedged, hedged_sync
+
+
+def intentos(*resultados):
+    """Cada llamada devuelve el siguiente resultado."""
+    cola = iter(resultados)
+    return lambda: next(cola)
+
+
+@pytest.fixture
+def ex():
+    with ThreadPoolExecutor(max_workers=4) as e:
+        yield e
+
+
+def test_sync_none_no_gana_y_lanza_otra_copia(ex):
+    tracker = LatencyTracker(inicial=5)
+    assert hedged_sync(intentos(None, "html"), ex, tracker, Presupuesto(5)) == "html"
+    assert len(tracker._muestras) == 1          # sólo la copia que respondió
+
+
+def test_sync_none_espera_al_hedge(ex):
+    tracker = LatencyTracker(minimo=0.05, inicial=0.05)
+    n = itertools.count()
+
+    def intento():
+        if next(n) == 0:
+            time.sleep(0.2)
+            return None                 # la original falla tarde, con el hedge ya en vuelo
+        time.sleep(0.3)
+        return "html"
+    assert hedged_sync(intento, ex, tracker, Presupuesto(5)) == "html"
+    assert tracker.hedges == 1 and tracker.ganados_por_hedge == 1
+    assert list(tracker._muestras) == [pytest.approx(0.35, abs=0.1)]
+
+
+def test_sync_todas_none_devuelve_none(ex):
+    tracker = LatencyTracker(inicial=5)
+    assert hedged_sync(intentos(None, None), ex, tracker, Presupuesto(5)) is None
+    assert len(tracker._muestras) == 0
+
+
+def test_async_none_cuenta_como_fallo():
+    tracker = LatencyTracker(inicial=5)
+    resultados = iter([None, "html"])
+
+    async def intento():
+        return next(resultados)
+    assert asyncio.run(hedged(intento, tracker, Presupuesto(5))) == "html"
+    assert len(tracker._muestras) == 1
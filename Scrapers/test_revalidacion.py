@@ -0,0 +1,127 @@
+"""Revalidación condicional (fetch_http.CacheValidadores) contra servidor_local.   python -m pytest -q"""
+
+import asyncio, csv
+
+import pytest
+
+from busquedas import Busqueda
+from fetch_http import ARCHIVO_VALIDADORES, CacheValidadores, fetch
+from inmuebles24 import DescargaHTTP, aiter_details, iter_details
+from identidades import IdentityPool
+from planificador import Planificador, crawl_listados
+from servidor_local import SitioSimulado, servidor_local
+
+
+@pytest.fixture
+def sitio():
+    s = SitioSimulado(paginas=1)
+    with servidor_local(s) as base:
+        s.base = base
+        yield s
+
+
+def fichas(base, pids):
+    return [f"{base}/propiedades/clasificado/veclapin-departamento-en-zapopan-{p}.html" for p in pids]
+
+
+def test_sin_confirmar_no_cuenta_como_visto(sitio):
+    cache = CacheValidadores()
+    url = fichas(sitio.base, [1])[0]
+    assert not fetch(url, validadores=cache).sin_cambios
+    assert len(cache) == 0                          # sólo pendiente
+    r = fetch(url, validadores=cache)
+    assert r.ok and not r.sin_cambios and r.html    # nadie la procesó: vuelve a entregarse
+    cache.confirmar(url)
+    r = fetch(url, validadores=cache)
+    assert r.status == 304 and r.sin_cambios
+
+
+def test_persistencia_solo_de_lo_confirmado(sitio, tmp_path):
+    cache = CacheValidadores()
+    a, b = fichas(sitio.base, [1, 2])
+    fetch(a, validadores=cache)
+    fetch(b, validadores=cache)
+    cache.confirmar(a)
+    cache.guardar(tmp_path)
+    otra = CacheValidadores.cargar(tmp_path)
+    assert fetch(a, validadores=otra).sin_cambios
+    assert not fetch(b, validadores=otra).sin_cambios
+
+
+@pytest.mark.parametrize("servidor_con_etag", [True, False])
+def test_iter_details_revalida_y_detecta_cambios(sitio, servidor_con_etag):
+    sitio.validadores = servidor_con_etag
+    urls = fichas(sitio.base, range(10, 16))
+    descarga = DescargaHTTP(validadores=CacheValidadores())
+    assert len(list(iter_details(urls, descarga))) == 6
+    assert list(iter_details(urls, descarga)) == []
+    sitio.versiones[12] = 1
+    assert [r.url for r in iter_details(urls, descarga)] == [urls[2]]
+    assert descarga.stats["sin_cambios"] == 6 + 5
+
+
+def test_consumidor_que_abandona_no_confirma(sitio):
+    urls = fichas(sitio.base, range(20, 25))
+    descarga = DescargaHTTP(validadores=CacheValidadores())
+    it = iter_details(urls, descarga)
+    next(it)
+    next(it)                                        # confirma la 1ª al pedir la 2ª
+    it.close()
+    assert len(list(iter_details(urls, descarga))) == 4
+
+
+def test_aiter_details_confirma_lo_entregado(sitio):
+    urls = fichas(sitio.base, range(30, 38))
+    descarga = DescargaHTTP(validadores=CacheValidadores())
+
+    async def todas():
+        return [r async for r in aiter_details(urls, descarga, concurrencia=3)]
+    assert len(asyncio.run(todas())) == 8
+    assert asyncio.run(todas()) == []
+
+
+def test_crawl_sin_consumidor_de_fichas_no_toca_validadores(sitio, tmp_path):
+    b = Busqueda("zapopan", paginas=1)
+    crawl_listados([b], tmp_path, base_url=sitio.base, detalles=True, tasa_host=50, rafaga_host=50)
+    assert not (tmp_path / ARCHIVO_VALIDADORES).exists()
+    # las fichas que bajó el planificador siguen entregándose a quien sí las parsea
+    with next(tmp_path.glob(f"*/{b.archivo_listado}")).open(newline="") as fh:
+        urls = [f["url"] for f in csv.DictReader(fh)]
+    cache = CacheValidadores.cargar(tmp_path)
+    assert len(list(iter_details(urls, DescargaHTTP(validadores=cache)))) == len(urls) > 0
+
+
+def test_planificador_confirma_tras_al_detalle(sitio):
+    b = Busqueda("zapopan", paginas=1)
+    cache = CacheValidadores()
+    procesadas = []
+
+    def correr():
+        pl = Planificador([b], IdentityPool.from_env(), base_url=sitio.base, validadores=cache,
+                          al_detalle=lambda _b, r: procesadas.append(r.url), tasa_host=50, rafaga_host=50)
+        return asyncio.run(pl.correr())[0]
+    primera = correr()
+    assert primera["detalles"] == len(procesadas) > 0 and len(cache) == len(procesadas)
+    segunda = correr()
+    assert segunda["detalles"] == 0 and segunda["sin_cambios"] == primera["detalles"]
+
+
+def test_aiter_details_consumidor_que_corta_cierra_destinos(sitio, tmp_path):
+    urls = fichas(sitio.base, range(100, 160))     # más que la cola (concurrencia × 2)
+    cerrados = []
+
+    class Destino:
+        def escribir(self, rec):
+            pass
+
+        def cerrar(self):
+            cerrados.append(True)
+
+    async def primera():
+        it = aiter_details(urls, DescargaHTTP(), concurrencia=2, destinos=[Destino()])
+        async for rec in it:
+            break
+        await asyncio.wait_for(it.aclose(), timeout=5)
+        return rec
+    assert asyncio.run(primera()).url in urls
+    assert cerrados == [True]